@@ -0,0 +1,81 @@
+"""
+Benchmark de agregación: groupby de pandas vs índice factorizado (bincount/reduceat).
+Uso:
+  python scripts/benchmark_agrupacion.py [--filas 100000,1000000,10000000] [--grupos 1000] [--repeticiones 3]
+Opciones:
+  --filas         Tamaños del DataFrame sintético (por defecto: 1e5, 1e6, 1e7)
+  --grupos        Cardinalidad de la columna X (por defecto: 1000)
+  --repeticiones  Veces que se mide cada caso; se reporta el mejor tiempo
+
+Para cada tamaño y agregación muestra el tiempo del groupby actual, el del
+índice factorizado ya cacheado y el coste único de construir el índice.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.core.services.group_index import factorizar
+
+AGREGACIONES = {
+    "suma": "sum",
+    "promedio": "mean",
+    "conteo": "count",
+    "minimo": "min",
+    "maximo": "max",
+}
+
+
+def generar_dataframe(filas, grupos):
+    """DataFrame con una clave de texto de `grupos` valores y una columna numérica con nulos"""
+    rng = np.random.default_rng(42)
+    claves = np.array([f"categoria_{i}" for i in range(grupos)], dtype=object)
+    valores = rng.normal(1000, 250, filas)
+    valores[rng.random(filas) < 0.01] = np.nan
+    return pd.DataFrame({"x": claves[rng.integers(0, grupos, filas)], "y": valores})
+
+
+def medir(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de agregación (groupby vs índice factorizado).")
+    parser.add_argument("--filas", default="100000,1000000,10000000", help="Tamaños separados por comas")
+    parser.add_argument("--grupos", type=int, default=1000, help="Valores distintos en la columna X")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Mediciones por caso")
+    args = parser.parse_args()
+
+    print(f"{'filas':>12} {'agregación':>10} {'groupby (ms)':>13} {'índice (ms)':>12} {'aceleración':>12}")
+    for filas in [int(f) for f in args.filas.split(",")]:
+        df = generar_dataframe(filas, args.grupos)
+        valores = df["y"].to_numpy()
+
+        tiempo_indice = medir(lambda: factorizar(df["x"]), args.repeticiones)
+        indice = factorizar(df["x"])
+
+        for agregacion, metodo in AGREGACIONES.items():
+            tiempo_groupby = medir(
+                lambda: getattr(df["y"].groupby(df["x"]), metodo)(), args.repeticiones
+            )
+            tiempo_factorizado = medir(lambda: indice.agregar(valores, agregacion), args.repeticiones)
+            print(
+                f"{filas:>12,} {agregacion:>10} {tiempo_groupby * 1000:>13.1f} "
+                f"{tiempo_factorizado * 1000:>12.1f} {tiempo_groupby / tiempo_factorizado:>11.1f}x"
+            )
+        print(f"{filas:>12,} {'(índice)':>10} {'':>13} {tiempo_indice * 1000:>12.1f}   construcción única")
+
+
+if __name__ == '__main__':
+    main()
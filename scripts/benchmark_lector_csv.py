@@ -0,0 +1,90 @@
+"""
+Benchmark del lector de CSV: Arrow (multihilo) vs motor C de pandas.
+Uso:
+  python scripts/benchmark_lector_csv.py [--tamanos 1,10,100,500] [--repeticiones 3]
+Opciones:
+  --tamanos       Tamaños de archivo a generar, en MB (por defecto: 1,10,100,500)
+  --repeticiones  Veces que se lee cada archivo; se reporta el mejor tiempo
+
+Genera CSVs sintéticos (numéricos, texto y fechas) en un directorio temporal
+y muestra el throughput de parseo en MB/s para cada motor.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.core.services.dataframe_reader import LectorDataFrame, PYARROW_DISPONIBLE
+
+
+def generar_csv(ruta, tamano_mb):
+    """Escribe un CSV de aproximadamente `tamano_mb` MB repitiendo un bloque sintético"""
+    rng = np.random.default_rng(42)
+    filas = 20_000
+    bloque = pd.DataFrame({
+        "id": np.arange(filas),
+        "region": rng.choice(["Norte", "Sur", "Este", "Oeste", "Centro"], filas),
+        "producto": rng.choice([f"producto_{i}" for i in range(200)], filas),
+        "ventas": rng.normal(1000, 250, filas).round(2),
+        "unidades": rng.integers(1, 100, filas),
+        "fecha": pd.date_range("2020-01-01", periods=filas, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+    }).to_csv(index=False)
+    cabecera, cuerpo = bloque.split("\n", 1)
+
+    objetivo = tamano_mb * 1024 * 1024
+    with open(ruta, "w") as destino:
+        destino.write(cabecera + "\n")
+        escrito = len(cabecera) + 1
+        while escrito < objetivo:
+            destino.write(cuerpo)
+            escrito += len(cuerpo)
+
+
+def medir(funcion, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo CSV (Arrow vs pandas C).")
+    parser.add_argument("--tamanos", default="1,10,100,500", help="Tamaños en MB separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Lecturas por archivo")
+    args = parser.parse_args()
+
+    if not PYARROW_DISPONIBLE:
+        print("pyarrow no está instalado: solo se puede medir el motor C de pandas.")
+
+    lector_arrow = LectorDataFrame(usar_arrow=True)
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+
+    print(f"{'MB':>6} {'filas':>12} {'pandas C (MB/s)':>16} {'arrow (MB/s)':>14} {'aceleración':>12}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano_mb in tamanos:
+            ruta = os.path.join(directorio, f"bench_{tamano_mb}mb.csv")
+            generar_csv(ruta, tamano_mb)
+            tamano_real = os.path.getsize(ruta) / (1024 * 1024)
+
+            filas = len(lector_arrow.leer_csv(ruta))
+            tiempo_c = medir(lambda: pd.read_csv(ruta, engine="c"), args.repeticiones)
+            tiempo_arrow = medir(lambda: lector_arrow.leer_csv(ruta), args.repeticiones)
+
+            print(
+                f"{tamano_real:>6.0f} {filas:>12,} {tamano_real / tiempo_c:>16.1f} "
+                f"{tamano_real / tiempo_arrow:>14.1f} {tiempo_c / tiempo_arrow:>11.1f}x"
+            )
+            os.remove(ruta)
+
+
+if __name__ == '__main__':
+    main()
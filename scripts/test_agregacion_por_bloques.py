@@ -0,0 +1,83 @@
+"""
+Test de la agregación por bloques: leer el parquet un row group cada vez debe
+dar exactamente el mismo gráfico que agregar el DataFrame en memoria, también
+cuando Y es dispersa (mayoría de nulos) o numérica guardada como texto.
+Uso:
+  python scripts/test_agregacion_por_bloques.py
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.core.domain.value_objects import OpcionesGrafico
+from src.core.services.chart_data_generator import GeneradorDatosGrafico, PYARROW_DISPONIBLE
+
+FILAS = 2_000
+FILAS_POR_GRUPO = 100
+TIPOS = ("barras", "lineas", "pastel", "area")
+AGREGACIONES = ("suma", "promedio", "conteo", "minimo", "maximo")
+
+
+def generar_dataframe():
+    rng = np.random.default_rng(42)
+    valores = rng.normal(100, 25, FILAS).round(2)
+    dispersa = valores.copy()
+    dispersa[rng.random(FILAS) < 0.7] = np.nan
+    mixta = valores.astype(str).astype(object)
+    mixta[rng.random(FILAS) < 0.6] = "n/d"
+    return pd.DataFrame({
+        "categoria": rng.choice([f"cat_{i}" for i in range(30)], FILAS),
+        "fecha": pd.date_range("2024-01-01", periods=FILAS, freq="h"),
+        "numerica": valores,
+        "entera": rng.integers(0, 50, FILAS),
+        "dispersa": dispersa,
+        "texto_numerico": valores.astype(str),
+        "mixta": mixta,
+    })
+
+
+def test_bloques_igual_que_memoria():
+    print("🔍 Agregación por bloques vs en memoria")
+    if not PYARROW_DISPONIBLE:
+        print("⚠️ pyarrow no está instalado: no hay agregación por bloques")
+        return
+
+    df = generar_dataframe()
+    generador = GeneradorDatosGrafico()
+    diferencias = []
+    casos = 0
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "datos.parquet")
+        df.to_parquet(ruta, index=False, row_group_size=FILAS_POR_GRUPO)
+
+        for eje_x, opciones in (("categoria", OpcionesGrafico()), ("fecha", OpcionesGrafico(remuestreo="dia"))):
+            for eje_y in ("numerica", "entera", "dispersa", "texto_numerico", "mixta", "conteo"):
+                for tipo in TIPOS:
+                    for agregacion in AGREGACIONES:
+                        args = (tipo, eje_x, eje_y, None, agregacion, opciones)
+                        memoria = generador.construir_desde_dataframe(df, *args)
+                        bloques = generador.construir_desde_parquet(ruta, *args)
+                        casos += 1
+                        try:
+                            pd.testing.assert_frame_equal(
+                                memoria.tabla.reset_index(drop=True),
+                                bloques.tabla.reset_index(drop=True),
+                                check_dtype=False
+                            )
+                        except AssertionError:
+                            diferencias.append(args[:3] + (agregacion,))
+
+    print(f"Casos comparados: {casos}, diferencias: {len(diferencias)}")
+    for diferencia in diferencias[:10]:
+        print(f"   ❌ {diferencia}")
+    assert not diferencias, "La agregación por bloques no coincide con la de memoria"
+    print("✅ Mismos resultados en memoria y por bloques")
+
+
+if __name__ == "__main__":
+    test_bloques_igual_que_memoria()
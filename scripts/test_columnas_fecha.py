@@ -0,0 +1,96 @@
+"""
+Test de /upload con un CSV con columna de fecha: las fechas se convierten a
+datetime al ingerir y el contexto enviado al LLM debe seguir siendo
+serializable, así que el análisis no cae a las sugerencias básicas
+(estado "parcial") y una segunda subida del mismo archivo lo reutiliza.
+Uso:
+  python scripts/test_columnas_fecha.py
+No necesita el servidor ni claves de API: el LLM se sustituye por un cliente fijo.
+"""
+import json
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+# Caches y subidas en un directorio temporal (las rutas de la app son relativas)
+os.chdir(tempfile.mkdtemp())
+
+from fastapi.testclient import TestClient
+
+from src.core.use_cases.file_analysis import CasoUsoAnalisisArchivo
+from src.infrastructure.external.interfaces import AIClientInterface
+from src.presentation.api.dependencies import almacenamiento_compartido
+from src.presentation.api.routes import analysis
+from src.presentation.fastapi_app import crear_app
+
+CSV_CON_FECHAS = (
+    "fecha,region,ventas\n"
+    "2024-01-05,Norte,10.5\n"
+    "2024-01-06,Sur,7.25\n"
+    "2024-02-10,Norte,3.0\n"
+    "2024-03-15,Este,12.0\n"
+    "2024-03-16,Sur,1.5\n"
+    "2024-04-01,Norte,8.0\n"
+)
+
+
+class ClienteFijo(AIClientInterface):
+    """Responde sugerencias de gráficos o un resumen según el prompt, y cuenta las consultas"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.prompts = []
+
+    @property
+    def modelo(self) -> str:
+        return "fijo"
+
+    @property
+    def prompt_sistema(self) -> str:
+        return ""
+
+    async def generar_analisis(self, prompt: str) -> str:
+        self.consultas += 1
+        self.prompts.append(prompt)
+        if "visualizaciones" in prompt:
+            return json.dumps([{
+                "titulo": "Ventas por fecha",
+                "tipo_grafico": "lineas",
+                "parametros": {"eje_x": "fecha", "eje_y": "ventas", "agregacion": "suma"},
+                "insight": "Evolución de las ventas"
+            }])
+        return json.dumps({"resumen": "Ventas de ejemplo", "insights": ["Norte lidera"]})
+
+    async def generar_sugerencias_grafico(self, contexto_datos):
+        return []
+
+
+def test_subida_con_fechas():
+    print("🔍 /upload con columna de fecha")
+    cliente = ClienteFijo()
+    analysis.caso_uso_analisis_archivo = CasoUsoAnalisisArchivo(cliente, None, almacenamiento_compartido)
+
+    with TestClient(crear_app()) as app:
+        respuestas = []
+        for _ in range(2):
+            response = app.post("/upload", files={"file": ("fechas.csv", CSV_CON_FECHAS, "text/csv")})
+            assert response.status_code == 200, response.text
+            respuestas.append(response.json())
+
+    primera, segunda = respuestas
+    assert primera["metadatos"]["tipos_columnas"]["fecha"].startswith("datetime64"), "fecha no se convirtió"
+    print(f"Estado del análisis: {primera['analisis']['estado']}")
+    assert primera["analisis"]["estado"] != "parcial", "el LLM no recibió un prompt válido"
+    assert "2024-01-05T00:00:00" in cliente.prompts[0] + cliente.prompts[1], "la muestra no llegó al prompt"
+    assert primera["analisis"]["sugerencias_graficos"][0]["titulo"] == "Ventas por fecha"
+
+    assert segunda["reutilizado"] and segunda["id_archivo"] == primera["id_archivo"]
+    print(f"Consultas al LLM tras dos subidas: {cliente.consultas}")
+    assert cliente.consultas == 2, "la segunda subida volvió a consultar al LLM"
+    print("✅ Sugerencias del LLM con fechas y análisis reutilizado")
+
+
+if __name__ == "__main__":
+    test_subida_con_fechas()
@@ -0,0 +1,77 @@
+"""
+Test del grupo "Otros" de barras y pastel: los grupos fuera del top K se
+resumen en metadatos["grupo_otros"], no como una fila más, así que una
+categoría real llamada "Otros" no se duplica y X conserva su tipo.
+Uso:
+  python scripts/test_grupo_otros.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.core.domain.value_objects import OpcionesGrafico
+from src.core.services.chart_data_generator import GeneradorDatosGrafico
+
+FILAS = 1_000
+
+
+def generar_dataframe():
+    rng = np.random.default_rng(7)
+    categorias = [f"cat_{i}" for i in range(29)] + ["Otros"]
+    # "Otros" es la categoría más frecuente: siempre entra en el top K
+    pesos = np.ones(len(categorias))
+    pesos[-1] = 20
+    return pd.DataFrame({
+        "categoria": rng.choice(categorias, FILAS, p=pesos / pesos.sum()),
+        "codigo": rng.integers(0, 40, FILAS),
+        "fecha": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 40, FILAS), unit="D"),
+        "ventas": rng.normal(100, 20, FILAS).round(2)
+    })
+
+
+def test_categoria_otros_real():
+    print("🔍 Dataset con una categoría real llamada \"Otros\"")
+    df = generar_dataframe()
+    generador = GeneradorDatosGrafico()
+    opciones = OpcionesGrafico(top_barras=5, top_pastel=5)
+
+    for tipo in ("barras", "pastel"):
+        grafico = generador.construir_desde_dataframe(df, tipo, "categoria", "ventas", None, "suma", opciones)
+        etiquetas = list(grafico.tabla["categoria"])
+        assert etiquetas.count("Otros") == 1, f"{tipo}: 'Otros' aparece {etiquetas.count('Otros')} veces"
+
+        otros = grafico.metadatos["grupo_otros"]
+        print(f"{tipo}: top {etiquetas}, grupo_otros {otros}")
+        assert otros["grupos"] == df["categoria"].nunique() - 5
+        total = df["ventas"].sum()
+        assert np.isclose(grafico.tabla["ventas"].sum() + otros["valor"], total)
+        if tipo == "pastel":
+            assert np.isclose(grafico.tabla["porcentaje"].sum() + otros["porcentaje"], 100, atol=0.1)
+    print("✅ Una sola fila \"Otros\" (la real) y el resto en metadatos")
+
+
+def test_x_numerica_y_fecha_conservan_tipo():
+    print("🔍 X numérica y de fecha con top K")
+    df = generar_dataframe()
+    generador = GeneradorDatosGrafico()
+    opciones = OpcionesGrafico(top_barras=5)
+
+    for columna, tipo_esperado in (("codigo", "i"), ("fecha", "M")):
+        grafico = generador.construir_desde_dataframe(df, "barras", columna, "ventas", None, "suma", opciones)
+        print(f"{columna}: dtype {grafico.tabla[columna].dtype}, grupo_otros {grafico.metadatos['grupo_otros']['grupos']}")
+        assert grafico.tabla[columna].dtype.kind == tipo_esperado, f"{columna} cambió a {grafico.tabla[columna].dtype}"
+
+    sin_otros = generador.construir_desde_dataframe(
+        df, "barras", "codigo", "ventas", None, "suma", OpcionesGrafico(top_barras=5, incluir_otros=False)
+    )
+    assert "grupo_otros" not in sin_otros.metadatos
+    print("✅ X conserva su tipo y incluir_otros=False omite el grupo")
+
+
+if __name__ == "__main__":
+    test_categoria_otros_real()
+    test_x_numerica_y_fecha_conservan_tipo()
@@ -0,0 +1,51 @@
+"""
+Test del lector de CSV: Arrow debe producir los mismos valores, nulos y
+tipos que pd.read_csv, incluidas celdas vacías y marcadores como "NA" o "null".
+Uso:
+  python scripts/test_lector_csv.py
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from src.core.services.dataframe_reader import LectorDataFrame, PYARROW_DISPONIBLE
+
+CSV_CON_NULOS = (
+    "region,producto,ventas,unidades,vacia\n"
+    "Norte,A,10.5,1,\n"
+    ",B,,2,\n"
+    "NA,C,7.25,,\n"
+    "null,\"\",3.0,4,\n"
+    "Sur,N/A,1.0,5,\n"
+    "Este,D,NaN,6,\n"
+).encode()
+
+
+def test_nulos_como_pandas():
+    print("🔍 Lector CSV: Arrow vs pd.read_csv con celdas vacías y marcadores de nulo")
+    if not PYARROW_DISPONIBLE:
+        print("⚠️ pyarrow no está instalado: solo existe el motor C de pandas")
+        return
+
+    # Sin detectar fechas para comparar solo el parseo
+    lector = LectorDataFrame(usar_arrow=True, detectar_fechas=False)
+    arrow = lector._leer_csv_arrow(CSV_CON_NULOS)
+    pandas = pd.read_csv(lector._abrir(CSV_CON_NULOS), engine="c")
+
+    nulos_arrow = arrow.isna().sum().to_dict()
+    nulos_pandas = pandas.isna().sum().to_dict()
+    print(f"Nulos Arrow:  {nulos_arrow}")
+    print(f"Nulos pandas: {nulos_pandas}")
+    assert nulos_arrow == nulos_pandas, "El número de nulos por columna no coincide"
+
+    for columna in pandas.columns:
+        assert arrow[columna].dtype.kind == pandas[columna].dtype.kind, f"Tipo distinto en {columna}"
+    pd.testing.assert_frame_equal(arrow.astype(object), pandas.astype(object))
+    print("✅ Arrow y pandas coinciden")
+
+
+if __name__ == "__main__":
+    test_nulos_como_pandas()
@@ -0,0 +1,69 @@
+"""
+Test del desalojo con escrituras pendientes: un DataFrame que aún no está en
+disco no se desaloja por presión de memoria, aunque su archivo subido
+conserve los bytes crudos; solo se liberan esos bytes.
+Uso:
+  python scripts/test_persistencia_pendiente.py
+"""
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# El cache de disco usa una ruta relativa
+os.chdir(tempfile.mkdtemp())
+
+from src.core.domain.entities import DatosArchivo
+from src.infrastructure.persistence.in_memory_storage import AlmacenamientoMemoria
+from src.infrastructure.persistence.write_behind import ESTADO_PENDIENTE, ESTADO_PERSISTIDO
+
+
+def guardar(almacenamiento, id_archivo, filas):
+    contenido = os.urandom(200_000)
+    almacenamiento.guardar_archivo(id_archivo, DatosArchivo.crear(f"{id_archivo}.csv", contenido, "csv"))
+    dataframe = pd.DataFrame({"valor": np.arange(filas, dtype="float64")})
+    almacenamiento.guardar_dataframe(id_archivo, dataframe)
+    return dataframe
+
+
+def test_pendiente_no_se_desaloja():
+    print("🔍 Desalojo con la escritura a disco retenida")
+    almacenamiento = AlmacenamientoMemoria(presupuesto_memoria_bytes=400_000, persistencia_asincrona=True)
+
+    # Retener la escritura del primer DataFrame hasta el final del test
+    liberar = threading.Event()
+    escribir = almacenamiento._escribir_cache_disco
+
+    def escribir_retenido(id_archivo, dataframe, perfil):
+        if id_archivo == "primero":
+            liberar.wait(10)
+        escribir(id_archivo, dataframe, perfil)
+
+    almacenamiento._escribir_cache_disco = escribir_retenido
+
+    try:
+        primero = guardar(almacenamiento, "primero", 20_000)
+        guardar(almacenamiento, "segundo", 20_000)
+
+        estado = almacenamiento.estado_persistencia("primero")
+        print(f"Estado del primero: {estado}")
+        assert estado == ESTADO_PENDIENTE
+        recuperado = almacenamiento.obtener_dataframe("primero")
+        assert recuperado is not None, "el DataFrame pendiente se desalojó"
+        pd.testing.assert_frame_equal(recuperado, primero)
+        assert almacenamiento.obtener_archivo("primero").contenido == b"", "los bytes crudos no se liberaron"
+    finally:
+        liberar.set()
+
+    assert almacenamiento.vaciar_persistencia(10)
+    assert almacenamiento.estado_persistencia("primero") == ESTADO_PERSISTIDO
+    almacenamiento.cerrar(10)
+    print("✅ El DataFrame pendiente sigue en memoria y solo se liberaron los bytes crudos")
+
+
+if __name__ == "__main__":
+    test_pendiente_no_se_desaloja()
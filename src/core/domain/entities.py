@@ -1,8 +1,8 @@
 """
 Entidades de dominio para el dashboard IA
 """
-from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
 import uuid
 
@@ -15,6 +15,7 @@ class DatosArchivo:
     contenido: bytes
     subido_en: datetime
     tamano: int
+    huella_contenido: Optional[str] = None
     
     @classmethod
     def crear(cls, nombre_archivo: str, contenido: bytes, tipo_archivo: str) -> 'DatosArchivo':
@@ -26,6 +27,20 @@ class DatosArchivo:
             subido_en=datetime.now(),
             tamano=len(contenido)
         )
+    
+    @classmethod
+    def crear_desde_disco(cls, nombre_archivo: str, tamano: int, tipo_archivo: str,
+                          huella_contenido: Optional[str] = None) -> 'DatosArchivo':
+        """Crea la entidad para un archivo volcado a disco, sin retener sus bytes en memoria"""
+        return cls(
+            id_archivo=str(uuid.uuid4()),
+            nombre_archivo=nombre_archivo,
+            tipo_archivo=tipo_archivo,
+            contenido=b"",
+            subido_en=datetime.now(),
+            tamano=tamano,
+            huella_contenido=huella_contenido
+        )
 
 @dataclass
 class ResultadoAnalisis:
@@ -56,19 +71,22 @@ class DatosGrafico:
     """Entidad para datos de gráfico"""
     id_grafico: str
     tipo_grafico: str
-    datos: List[Dict[str, Any]]
+    datos: Optional[Union[List[Dict[str, Any]], Dict[str, List[Any]]]]  # registros o columnar (None: solo tabla)
     configuracion: Dict[str, Any]
     metadatos: Dict[str, Any]
     creado_en: datetime
+    tabla: Optional[Any] = field(default=None, repr=False)  # DataFrame resultado, para salidas binarias
     
     @classmethod
-    def crear(cls, tipo_grafico: str, datos: List[Dict[str, Any]], 
-               configuracion: Dict[str, Any], metadatos: Dict[str, Any]) -> 'DatosGrafico':
+    def crear(cls, tipo_grafico: str, datos: Optional[Union[List[Dict[str, Any]], Dict[str, List[Any]]]], 
+               configuracion: Dict[str, Any], metadatos: Dict[str, Any],
+               tabla: Optional[Any] = None) -> 'DatosGrafico':
         return cls(
             id_grafico=str(uuid.uuid4()),
             tipo_grafico=tipo_grafico,
             datos=datos,
             configuracion=configuracion,
             metadatos=metadatos,
-            creado_en=datetime.now()
+            creado_en=datetime.now(),
+            tabla=tabla
         )
\ No newline at end of file
@@ -28,4 +28,8 @@ class ErrorDatosInvalidos(ExcepcionDominio):
 
 class ErrorServicioIA(ExcepcionDominio):
     """Error en servicio de IA"""
+    pass
+
+class ErrorCapacidadExcedida(ExcepcionDominio):
+    """No hay capacidad para aceptar más trabajo en este momento"""
     pass
\ No newline at end of file
@@ -1,8 +1,8 @@
 """
 Value Objects del dominio
 """
-from dataclasses import dataclass
-from typing import List, Any
+from dataclasses import dataclass, field
+from typing import List, Any, Dict, Optional, Tuple
 from enum import Enum
 
 class TipoArchivo(Enum):
@@ -67,6 +67,39 @@ class ParametrosGrafico:
         if self.agregacion not in agregaciones_validas:
             raise ValueError(f"Agregación debe ser una de: {agregaciones_validas}")
 
+@dataclass(frozen=True)
+class OpcionesGrafico:
+    """Opciones de salida de /chart-data que no cambian la agregación"""
+    formato: str = "registros"  # registros: [{x, y}, ...] | columnar: {"x": [...], "y": [...]}
+    max_puntos: Optional[int] = None  # LTTB en líneas/área (None = serie completa); muestra en dispersión (None = 1000)
+    modo_dispersion: str = "muestra"  # muestra: estratificada con atípicos | densidad: conteos por celda 2D
+    celdas_densidad: int = 50  # celdas por eje en modo densidad
+    top_barras: int = 20  # grupos mostrados en barras
+    top_pastel: int = 10  # grupos mostrados en pastel
+    incluir_otros: bool = True  # resumir el resto en metadatos["grupo_otros"] (barras y pastel)
+    remuestreo: str = "ninguno"  # X de fecha en líneas/área: ninguno, auto, dia, semana, mes, trimestre
+    
+    FORMATOS_VALIDOS = ("registros", "columnar")
+    MODOS_DISPERSION_VALIDOS = ("muestra", "densidad")
+    REMUESTREOS_VALIDOS = ("ninguno", "auto", "dia", "semana", "mes", "trimestre")
+    # Alias en inglés: se normalizan para que compartan entrada de cache
+    ALIAS_REMUESTREO = {"none": "ninguno", "day": "dia", "week": "semana", "month": "mes", "quarter": "trimestre"}
+    
+    def __post_init__(self):
+        object.__setattr__(self, "remuestreo", self.ALIAS_REMUESTREO.get(self.remuestreo, self.remuestreo))
+        if self.remuestreo not in self.REMUESTREOS_VALIDOS:
+            raise ValueError(f"Remuestreo debe ser uno de: {list(self.REMUESTREOS_VALIDOS)}")
+        if self.formato not in self.FORMATOS_VALIDOS:
+            raise ValueError(f"Formato debe ser uno de: {list(self.FORMATOS_VALIDOS)}")
+        if self.modo_dispersion not in self.MODOS_DISPERSION_VALIDOS:
+            raise ValueError(f"Modo de dispersión debe ser uno de: {list(self.MODOS_DISPERSION_VALIDOS)}")
+        if not 1 <= self.celdas_densidad <= 1000:
+            raise ValueError("celdas_densidad debe estar entre 1 y 1000")
+        if self.top_barras < 1 or self.top_pastel < 1:
+            raise ValueError("top_barras y top_pastel deben ser al menos 1")
+        if self.max_puntos is not None and self.max_puntos < 3:
+            raise ValueError("max_puntos debe ser al menos 3")
+
 @dataclass(frozen=True)
 class SolicitudAnalisis:
     """Solicitud para análisis de datos"""
@@ -80,4 +113,63 @@ class SolicitudAnalisis:
         
         tipos_validos = ["general", "statistical", "predictive"]
         if self.tipo_analisis not in tipos_validos:
-            raise ValueError(f"Tipo de análisis debe ser uno de: {tipos_validos}")
\ No newline at end of file
+            raise ValueError(f"Tipo de análisis debe ser uno de: {tipos_validos}")
+
+@dataclass(frozen=True)
+class PerfilColumna:
+    """Perfil estadístico de una columna, calculado una sola vez al ingerir"""
+    nombre: str
+    tipo_dato: str
+    categoria: str  # numerica, booleana, fecha, categorica
+    conteo: int
+    conteo_nulos: int
+    cardinalidad: int
+    uso_memoria: int
+    minimo: Optional[Any] = None
+    maximo: Optional[Any] = None
+    media: Optional[float] = None
+    desviacion: Optional[float] = None
+    cuartiles: Dict[str, float] = field(default_factory=dict)
+    valores_frecuentes: Tuple[Tuple[Any, int], ...] = ()
+    
+    @property
+    def es_numerica(self) -> bool:
+        return self.categoria == "numerica"
+
+@dataclass(frozen=True)
+class PerfilDatos:
+    """Perfil de un DataFrame: lo comparten la subida, el contexto de IA y los metadatos"""
+    filas: int
+    columnas: Tuple[PerfilColumna, ...]
+    uso_memoria: int
+    
+    @property
+    def forma(self) -> Tuple[int, int]:
+        return (self.filas, len(self.columnas))
+    
+    @property
+    def nombres_columnas(self) -> List[str]:
+        return [columna.nombre for columna in self.columnas]
+    
+    def columnas_por_categoria(self, categoria: str) -> List[str]:
+        return [columna.nombre for columna in self.columnas if columna.categoria == categoria]
+    
+    def tipos_datos(self) -> Dict[str, str]:
+        return {columna.nombre: columna.tipo_dato for columna in self.columnas}
+    
+    def conteo_nulos(self) -> Dict[str, int]:
+        return {columna.nombre: columna.conteo_nulos for columna in self.columnas}
+    
+    def estadisticas(self) -> Dict[str, Dict[str, Any]]:
+        """Estadísticas de las columnas numéricas con el mismo formato que describe().to_dict()"""
+        return {
+            columna.nombre: {
+                "count": float(columna.conteo),
+                "mean": columna.media,
+                "std": columna.desviacion,
+                "min": columna.minimo,
+                **columna.cuartiles,
+                "max": columna.maximo
+            }
+            for columna in self.columnas if columna.es_numerica
+        }
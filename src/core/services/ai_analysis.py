@@ -1,60 +1,147 @@
 """
 Servicio de análisis con IA
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import pandas as pd
 import json
 from src.core.domain.entities import ResultadoAnalisis
-from src.core.domain.exceptions import ErrorAnalisis, ErrorServicioIA
+from src.core.domain.value_objects import PerfilDatos
+from src.core.services.data_profiler import PerfiladorDatos
+from src.core.domain.exceptions import ErrorAnalisis, ErrorServicioIA, ErrorCapacidadExcedida
 from src.infrastructure.external.interfaces import AIClientInterface
+from src.infrastructure.concurrency.worker_pool import PoolTrabajadores, ejecutar_o_directo
 
 class ServicioAnalisisIA:
     """Servicio para análisis de datos usando IA"""
     
-    def __init__(self, cliente_ia: AIClientInterface):
+    def __init__(
+        self,
+        cliente_ia: AIClientInterface,
+        pool_trabajadores: Optional[PoolTrabajadores] = None,
+        timeout_llm_segundos: Optional[float] = None
+    ):
         self.cliente_ia = cliente_ia
+        self.pool_trabajadores = pool_trabajadores
+        self.timeout_llm_segundos = timeout_llm_segundos
+        self.perfilador = PerfiladorDatos()
     
-    async def analizar_datos(self, data: pd.DataFrame, tipo_analisis: str = "general") -> ResultadoAnalisis:
+    async def analizar_datos(
+        self,
+        data: pd.DataFrame,
+        tipo_analisis: str = "general",
+        perfil: Optional[PerfilDatos] = None
+    ) -> ResultadoAnalisis:
         """
-        Analiza datos usando IA y retorna insights
+        Analiza datos usando IA y retorna insights.
+        
+        El contexto de los datos se calcula una sola vez y las dos consultas
+        al LLM (resumen e insights, sugerencias de gráficos) se lanzan en
+        paralelo, cada una con su propio timeout. Si solo una falla el
+        resultado se marca como "parcial"; si fallan ambas se lanza ErrorAnalisis.
         """
         try:
-            # Preparar contexto de los datos
-            contexto_datos = self._preparar_contexto_datos(data)
+            # Preparar contexto de los datos (una sola vez para ambos prompts)
+            if perfil is None:
+                perfil = await ejecutar_o_directo(self.pool_trabajadores, self.perfilador.perfilar, data)
+            contexto_datos = self._preparar_contexto_datos(data, perfil)
             
-            # Generar prompt según tipo de análisis
-            prompt = self._generar_prompt_analisis(contexto_datos, tipo_analisis)
+            # Obtener análisis y sugerencias de IA en paralelo
+            datos_analisis, sugerencias_graficos = await asyncio.gather(
+                self._generar_resumen(contexto_datos, tipo_analisis),
+                self._generar_sugerencias_graficos(contexto_datos, data)
+            )
             
-            # Obtener análisis de IA
-            respuesta_ia = await self.cliente_ia.generar_analisis(prompt)
+            if datos_analisis is None and sugerencias_graficos is None:
+                raise ErrorServicioIA("El servicio de IA no respondió a ninguna de las consultas")
             
-            # Procesar respuesta
-            datos_analisis = self._procesar_respuesta_ia(respuesta_ia)
+            parcial = datos_analisis is None or sugerencias_graficos is None
+            
+            if datos_analisis is None:
+                datos_analisis = {
+                    "resumen": "No se pudo generar el resumen con IA",
+                    "insights": []
+                }
             
-            # Generar sugerencias de gráficos
-            sugerencias_graficos = await self._generar_sugerencias_graficos(data, datos_analisis)
+            if sugerencias_graficos is None:
+                # Fallback a sugerencias básicas si falla la IA
+                sugerencias_graficos = self._generar_sugerencias_graficos_basicas(data)
             
-            return ResultadoAnalisis.crear(
+            resultado = ResultadoAnalisis.crear(
                 id_archivo="",  # Se asignará en el use case
-                resumen=datos_analisis["resumen"],
-                insights=datos_analisis["insights"],
+                resumen=datos_analisis.get("resumen", ""),
+                insights=datos_analisis.get("insights", []),
                 sugerencias_graficos=sugerencias_graficos
             )
+            if parcial:
+                resultado.estado = "parcial"
             
+            return resultado
+            
+        except ErrorCapacidadExcedida:
+            raise
         except Exception as e:
             raise ErrorAnalisis(f"Error en análisis IA: {str(e)}")
     
-    def _preparar_contexto_datos(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Prepara contexto de los datos para IA"""
+    async def _consultar_ia(self, prompt: str) -> str:
+        """Consulta al LLM aplicando el timeout configurado"""
+        if self.timeout_llm_segundos is None:
+            return await self.cliente_ia.generar_analisis(prompt)
+        return await asyncio.wait_for(
+            self.cliente_ia.generar_analisis(prompt),
+            timeout=self.timeout_llm_segundos
+        )
+    
+    async def _generar_resumen(self, contexto_datos: Dict[str, Any], tipo_analisis: str) -> Optional[Dict[str, Any]]:
+        """Obtiene resumen e insights del LLM; retorna None si la consulta falla"""
+        try:
+            # Generar prompt según tipo de análisis
+            prompt = self._generar_prompt_analisis(contexto_datos, tipo_analisis)
+            
+            # Obtener análisis de IA
+            respuesta_ia = await self._consultar_ia(prompt)
+            
+            # Procesar respuesta
+            resumen = self._procesar_respuesta_ia(respuesta_ia)
+            if resumen is None:
+                # JSON inválido: que la respuesta no quede cacheada y resumir sin formato
+                self.cliente_ia.invalidar_respuesta(prompt)
+                resumen = {
+                    "resumen": "Análisis completado",
+                    "insights": [respuesta_ia],
+                    "patrones": [],
+                    "recomendaciones": []
+                }
+            return resumen
+            
+        except Exception as e:
+            print(f"[!] Falló la consulta de resumen a la IA: {type(e).__name__} - {str(e)[:100]}")
+            return None
+    
+    def _preparar_contexto_datos(self, data: pd.DataFrame, perfil: PerfilDatos) -> Dict[str, Any]:
+        """Prepara contexto de los datos para IA a partir del perfil de columnas"""
         return {
-            "forma": data.shape,
-            "columnas": list(data.columns),
-            "tipos_datos": data.dtypes.to_dict(),
-            "muestra": data.head().to_dict(),
-            "estadisticas": data.describe().to_dict() if len(data.select_dtypes(include='number').columns) > 0 else {},
-            "conteo_nulos": data.isnull().sum().to_dict()
+            "forma": perfil.forma,
+            "columnas": perfil.nombres_columnas,
+            "tipos_datos": perfil.tipos_datos(),
+            "muestra": self._muestra_datos(data),
+            "estadisticas": perfil.estadisticas(),
+            "conteo_nulos": perfil.conteo_nulos(),
+            "columnas_numericas": perfil.columnas_por_categoria("numerica"),
+            "columnas_categoricas": perfil.columnas_por_categoria("categorica"),
+            "columnas_fecha": perfil.columnas_por_categoria("fecha")
         }
     
+    def _muestra_datos(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Primeras filas para el prompt, con las fechas como texto ISO (Timestamp no es serializable a JSON)"""
+        muestra = data.head()
+        columnas_fecha = muestra.select_dtypes(include=["datetime", "datetimetz"]).columns
+        if len(columnas_fecha):
+            muestra = muestra.copy()
+            for columna in columnas_fecha:
+                muestra[columna] = [None if pd.isna(valor) else valor.isoformat() for valor in muestra[columna]]
+        return muestra.to_dict()
+    
     def _generar_prompt_analisis(self, contexto_datos: Dict[str, Any], tipo_analisis: str) -> str:
         """Genera prompt para análisis según tipo"""
         prompt_base = f"""
@@ -82,8 +169,8 @@ class ServicioAnalisisIA:
         
         return prompt_base
     
-    def _procesar_respuesta_ia(self, respuesta_ia: str) -> Dict[str, Any]:
-        """Procesa respuesta de IA"""
+    def _procesar_respuesta_ia(self, respuesta_ia: str) -> Optional[Dict[str, Any]]:
+        """Procesa respuesta de IA; retorna None si parece JSON pero no se puede parsear"""
         try:
             # Intentar parsear como JSON
             if respuesta_ia.strip().startswith('{'):
@@ -98,39 +185,39 @@ class ServicioAnalisisIA:
             }
             
         except json.JSONDecodeError:
-            return {
-                "resumen": "Análisis completado",
-                "insights": [respuesta_ia],
-                "patrones": [],
-                "recomendaciones": []
-            }
+            return None
     
-    async def _generar_sugerencias_graficos(self, data: pd.DataFrame, analisis: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Genera sugerencias de gráficos basado en los datos usando IA"""
+    async def _generar_sugerencias_graficos(
+        self,
+        contexto_datos: Dict[str, Any],
+        data: pd.DataFrame
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Genera sugerencias de gráficos usando IA; retorna None si la consulta falla"""
         try:
-            # Preparar contexto de datos para IA
-            contexto_datos = self._preparar_contexto_datos(data)
-            
             # Crear prompt para sugerencias de gráficos
             prompt = self._crear_prompt_sugerencia_graficos(contexto_datos, data)
             
             # Obtener sugerencias de IA
-            respuesta_ia = await self.cliente_ia.generar_analisis(prompt)
+            respuesta_ia = await self._consultar_ia(prompt)
             
             # Parsear respuesta JSON
             sugerencias = self._parsear_sugerencias_graficos(respuesta_ia, data)
+            if sugerencias is None:
+                # Respuesta inutilizable: que no quede cacheada y usar las sugerencias básicas
+                self.cliente_ia.invalidar_respuesta(prompt)
+                sugerencias = self._generar_sugerencias_graficos_basicas(data)
             
             return sugerencias[:5]  # Máximo 5 sugerencias
             
         except Exception as e:
-            # Fallback a sugerencias básicas si falla la IA
-            return self._generar_sugerencias_graficos_basicas(data)
+            print(f"[!] Falló la consulta de sugerencias a la IA: {type(e).__name__} - {str(e)[:100]}")
+            return None
     
     def _crear_prompt_sugerencia_graficos(self, contexto_datos: Dict[str, Any], data: pd.DataFrame) -> str:
         """Crea prompt para que la IA sugiera gráficos"""
-        cols_numericas = data.select_dtypes(include=['number']).columns.tolist()
-        cols_categoricas = data.select_dtypes(include=['object', 'category']).columns.tolist()
-        cols_fecha = data.select_dtypes(include=['datetime']).columns.tolist()
+        cols_numericas = contexto_datos['columnas_numericas']
+        cols_categoricas = contexto_datos['columnas_categoricas']
+        cols_fecha = contexto_datos['columnas_fecha']
         
         prompt = f"""
         Actúa como un analista de datos experto. Analiza la siguiente estructura de datos y sugiere de 3 a 5 visualizaciones específicas que destaquen los patrones o relaciones más interesantes.
@@ -142,10 +229,10 @@ class ServicioAnalisisIA:
         - Columnas de fecha/hora: {', '.join(cols_fecha) if cols_fecha else 'Ninguna'}
         
         ESTADÍSTICAS:
-        {json.dumps(contexto_datos.get('estadisticas', {}), indent=2)}
+        {json.dumps(contexto_datos.get('estadisticas', {}), indent=2, default=str)}
         
         MUESTRA DE DATOS:
-        {json.dumps(contexto_datos.get('muestra', {}), indent=2)[:500]}
+        {json.dumps(contexto_datos.get('muestra', {}), indent=2, default=str)[:500]}
         
         INSTRUCCIONES:
         1. Identifica los patrones, tendencias o relaciones más interesantes en los datos
@@ -177,8 +264,8 @@ class ServicioAnalisisIA:
         
         return prompt
     
-    def _parsear_sugerencias_graficos(self, respuesta_ia: str, data: pd.DataFrame) -> List[Dict[str, Any]]:
-        """Parsea las sugerencias de gráficos de la respuesta de IA"""
+    def _parsear_sugerencias_graficos(self, respuesta_ia: str, data: pd.DataFrame) -> Optional[List[Dict[str, Any]]]:
+        """Parsea las sugerencias de gráficos de la respuesta de IA; retorna None si no hay ninguna válida"""
         try:
             # Limpiar respuesta y extraer JSON
             respuesta_limpia = respuesta_ia.strip()
@@ -197,12 +284,12 @@ class ServicioAnalisisIA:
                     if self._validar_sugerencia_grafico(sugerencia, data):
                         sugerencias_validas.append(sugerencia)
                 
-                return sugerencias_validas if sugerencias_validas else self._generar_sugerencias_graficos_basicas(data)
+                return sugerencias_validas or None
             else:
-                return self._generar_sugerencias_graficos_basicas(data)
+                return None
                 
         except json.JSONDecodeError:
-            return self._generar_sugerencias_graficos_basicas(data)
+            return None
     
     def _validar_sugerencia_grafico(self, sugerencia: Dict[str, Any], data: pd.DataFrame) -> bool:
         """Valida que una sugerencia de gráfico sea válida"""
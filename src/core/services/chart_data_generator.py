@@ -1,14 +1,34 @@
 """
 Generador de datos para gráficos
 """
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Union
 from src.core.domain.entities import DatosGrafico
+from src.core.domain.value_objects import OpcionesGrafico
 from src.core.domain.exceptions import ErrorGeneracionGrafico
+from src.core.services.serialization import dataframe_a_registros, dataframe_a_columnas
+from src.core.services.downsampling import reducir_lttb
+from src.core.services.scatter_sampling import muestrear_dispersion, densidad_dispersion
+from src.core.services.group_index import IndiceAgrupacion, factorizar
+from src.core.services.datetime_inference import elegir_unidad_tiempo, truncar_fechas
+
+# pyarrow es opcional: sin él no hay agregación por bloques y se carga el DataFrame completo
+PYARROW_DISPONIBLE = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIBLE = True
+except Exception:
+    pa = None
+    pq = None
 
 class GeneradorDatosGrafico:
     """Servicio para generar datos de gráficos"""
     
+    # Con remuestreo "auto": unidad más fina que no supere estos buckets (o max_puntos)
+    BUCKETS_REMUESTREO_AUTO = 500
+    
     def __init__(self, almacenamiento=None):
         self.almacenamiento = almacenamiento
     
@@ -19,7 +39,9 @@ class GeneradorDatosGrafico:
         eje_x: str,
         eje_y: str,
         titulo: str = None,
-        agregacion: str = "suma"
+        agregacion: str = "suma",
+        opciones: Optional[OpcionesGrafico] = None,
+        id_archivo: Optional[str] = None
     ) -> DatosGrafico:
         """
         Genera datos de gráfico desde un DataFrame.
@@ -27,6 +49,30 @@ class GeneradorDatosGrafico:
         Los datos son agregados y formateados según el tipo de gráfico,
         evitando enviar datos crudos completos al cliente.
         """
+        return self.construir_desde_dataframe(
+            dataframe, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones, id_archivo
+        )
+    
+    def construir_desde_dataframe(
+        self,
+        dataframe: pd.DataFrame,
+        tipo_grafico: str,
+        eje_x: str,
+        eje_y: str,
+        titulo: str = None,
+        agregacion: str = "suma",
+        opciones: Optional[OpcionesGrafico] = None,
+        id_archivo: Optional[str] = None,
+        serializar: bool = True
+    ) -> DatosGrafico:
+        """
+        Versión síncrona de generar_desde_dataframe, para ejecutarla en el
+        pool de trabajadores. Con `id_archivo` los índices de agrupación y
+        las tablas de agregados se reutilizan desde el almacenamiento. Sin
+        `serializar` solo se devuelve la tabla resultado (`datos` queda en
+        None), para salidas binarias que no pasan por diccionarios.
+        """
+        opciones = opciones or OpcionesGrafico()
         try:
             # Validar columnas
             if eje_x not in dataframe.columns:
@@ -35,41 +81,160 @@ class GeneradorDatosGrafico:
             if eje_y not in dataframe.columns and eje_y != "conteo":
                 raise ErrorGeneracionGrafico(f"Columna {eje_y} no encontrada en los datos")
             
-            # Crear copia del dataframe para no modificar el original
-            df_trabajo = dataframe.copy()
+            # Proyectar solo las columnas del gráfico (nunca se modifica el original)
+            df_trabajo = self._proyectar_columnas(dataframe, eje_x, eje_y)
+            
+            # Series temporales: X truncada a día/semana/mes/trimestre antes de agrupar
+            unidad_tiempo = self._unidad_remuestreo(dataframe[eje_x], tipo_grafico, opciones)
+            
+            # Todas las agregaciones de (eje_x, eje_y) en una pasada, cacheadas
+            # por archivo: cambiar la agregación no vuelve a recorrer los datos
+            agregados = None
+            if tipo_grafico != "dispersion":
+                agregados = self._obtener_tabla_agregada(dataframe, eje_x, eje_y, id_archivo, unidad_tiempo)
             
             # Procesar datos según tipo de gráfico y agregación
-            datos_procesados = self._procesar_datos_por_tipo_grafico(
+            tabla = self._procesar_datos_por_tipo_grafico(
                 df_trabajo, 
                 tipo_grafico, 
                 eje_x, 
                 eje_y,
-                agregacion
+                agregacion,
+                opciones,
+                agregados
             )
+            # Dispersión no agrega: los puntos originales son las filas; en el
+            # resto, los grupos antes de top K / LTTB
+            puntos_originales = len(df_trabajo) if agregados is None else len(agregados)
             
-            # Generar configuración del gráfico
-            configuracion = self._generar_configuracion_grafico(tipo_grafico, eje_x, eje_y, titulo)
+            return self._armar_grafico(
+                tabla, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones,
+                len(dataframe), puntos_originales, unidad_tiempo, serializar
+            )
             
-            # Metadata
-            metadatos = {
-                "total_registros": len(dataframe),
-                "registros_procesados": len(datos_procesados),
-                "eje_x": eje_x,
-                "eje_y": eje_y,
-                "tipo_grafico": tipo_grafico,
-                "agregacion": agregacion
-            }
+        except Exception as e:
+            raise ErrorGeneracionGrafico(f"Error generando gráfico: {str(e)}")
+    
+    def construir_desde_parquet(
+        self,
+        ruta_parquet: str,
+        tipo_grafico: str,
+        eje_x: str,
+        eje_y: str,
+        titulo: str = None,
+        agregacion: str = "suma",
+        opciones: Optional[OpcionesGrafico] = None,
+        id_archivo: Optional[str] = None,
+        serializar: bool = True
+    ) -> DatosGrafico:
+        """
+        Igual que construir_desde_dataframe pero sin cargar el DataFrame:
+        lee del parquet solo las columnas del gráfico, un row group cada vez,
+        y combina los agregados parciales (suma, conteos, mínimo, máximo) de
+        cada bloque. Dispersión no agrega y lee únicamente sus dos columnas.
+        """
+        if not PYARROW_DISPONIBLE:
+            raise ErrorGeneracionGrafico("La agregación por bloques requiere pyarrow")
+        opciones = opciones or OpcionesGrafico()
+        try:
+            archivo = pq.ParquetFile(ruta_parquet)
+            esquema = archivo.schema_arrow
             
-            return DatosGrafico.crear(
-                tipo_grafico=tipo_grafico,
-                datos=datos_procesados,
-                configuracion=configuracion,
-                metadatos=metadatos
+            if eje_x not in esquema.names:
+                raise ErrorGeneracionGrafico(f"Columna {eje_x} no encontrada en los datos")
+            
+            if eje_y not in esquema.names and eje_y != "conteo":
+                raise ErrorGeneracionGrafico(f"Columna {eje_y} no encontrada en los datos")
+            
+            columnas = [eje_x] + ([eje_y] if eje_y != eje_x and eje_y in esquema.names else [])
+            total_registros = archivo.metadata.num_rows
+            
+            if tipo_grafico == "dispersion":
+                df_trabajo = archivo.read(columns=columnas).to_pandas()
+                tabla = self._procesar_grafico_dispersion(df_trabajo, eje_x, eje_y, opciones)
+                return self._armar_grafico(
+                    tabla, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones,
+                    total_registros, len(df_trabajo), None, serializar
+                )
+            
+            unidad_tiempo = self._unidad_remuestreo(
+                self._extremos_columna(archivo, eje_x), tipo_grafico, opciones
+            )
+            
+            clave = (id_archivo, eje_x, eje_y, unidad_tiempo)
+            agregados = None
+            if self.almacenamiento is not None and id_archivo is not None:
+                agregados = self.almacenamiento.obtener_tabla_agregada(clave)
+            if agregados is None:
+                agregados = self._agregar_por_bloques(archivo, columnas, eje_x, eje_y, unidad_tiempo)
+                if self.almacenamiento is not None and id_archivo is not None:
+                    self.almacenamiento.guardar_tabla_agregada(clave, agregados)
+            
+            tabla = self._procesar_datos_por_tipo_grafico(
+                None, tipo_grafico, eje_x, eje_y, agregacion, opciones, agregados
+            )
+            return self._armar_grafico(
+                tabla, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones,
+                total_registros, len(agregados), unidad_tiempo, serializar
             )
             
         except Exception as e:
             raise ErrorGeneracionGrafico(f"Error generando gráfico: {str(e)}")
     
+    def _armar_grafico(
+        self,
+        tabla: pd.DataFrame,
+        tipo_grafico: str,
+        eje_x: str,
+        eje_y: str,
+        titulo: Optional[str],
+        agregacion: str,
+        opciones: OpcionesGrafico,
+        total_registros: int,
+        puntos_originales: int,
+        unidad_tiempo: Optional[str],
+        serializar: bool = True
+    ) -> DatosGrafico:
+        """Reduce, formatea y empaqueta la tabla resultado con su configuración y metadatos"""
+        # Series largas de líneas/área se reducen con LTTB al presupuesto pedido
+        if opciones.max_puntos and tipo_grafico in ("lineas", "area"):
+            tabla = reducir_lttb(tabla, opciones.max_puntos)
+        
+        datos_procesados = self.formatear_datos(tabla, opciones) if serializar else None
+        
+        # Generar configuración del gráfico
+        configuracion = self._generar_configuracion_grafico(tipo_grafico, eje_x, eje_y, titulo)
+        
+        # Metadata
+        metadatos = {
+            "total_registros": total_registros,
+            "registros_procesados": len(tabla),
+            "eje_x": eje_x,
+            "eje_y": eje_y,
+            "tipo_grafico": tipo_grafico,
+            "agregacion": agregacion,
+            "formato": opciones.formato,
+            "puntos_originales": puntos_originales,
+            "puntos_retornados": len(tabla)
+        }
+        if unidad_tiempo is not None:
+            metadatos["remuestreo"] = unidad_tiempo
+        if "grupo_otros" in tabla.attrs:
+            # Grupos fuera del top K de barras y pastel, fuera de las filas de datos
+            metadatos["grupo_otros"] = tabla.attrs["grupo_otros"]
+        if tipo_grafico == "dispersion":
+            metadatos["modo_dispersion"] = opciones.modo_dispersion
+            if opciones.modo_dispersion == "densidad":
+                metadatos["celdas_densidad"] = opciones.celdas_densidad
+        
+        return DatosGrafico.crear(
+            tipo_grafico=tipo_grafico,
+            datos=datos_procesados,
+            configuracion=configuracion,
+            metadatos=metadatos,
+            tabla=tabla
+        )
+    
     async def generar_datos_grafico(
         self, 
         datos: List[Dict[str, Any]], 
@@ -89,13 +254,14 @@ class GeneradorDatosGrafico:
                 raise ErrorGeneracionGrafico(f"Columnas {columna_x} o {columna_y} no encontradas")
             
             # Procesar datos según tipo de gráfico
-            datos_procesados = self._procesar_datos_por_tipo_grafico(
+            tabla = self._procesar_datos_por_tipo_grafico(
                 df, 
                 tipo_grafico, 
                 columna_x, 
                 columna_y,
                 "suma"
             )
+            datos_procesados = dataframe_a_registros(tabla)
             
             # Generar configuración del gráfico
             configuracion = self._generar_configuracion_grafico(tipo_grafico, columna_x, columna_y, titulo)
@@ -107,6 +273,8 @@ class GeneradorDatosGrafico:
                 "columna_y": columna_y,
                 "tipo_grafico": tipo_grafico
             }
+            if "grupo_otros" in tabla.attrs:
+                metadatos["grupo_otros"] = tabla.attrs["grupo_otros"]
             
             return DatosGrafico.crear(
                 tipo_grafico=tipo_grafico,
@@ -124,144 +292,473 @@ class GeneradorDatosGrafico:
         tipo_grafico: str, 
         columna_x: str, 
         columna_y: str,
-        agregacion: str = "suma"
-    ) -> List[Dict[str, Any]]:
-        """Procesa datos según el tipo de gráfico"""
+        agregacion: str = "suma",
+        opciones: Optional[OpcionesGrafico] = None,
+        agregados: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """Procesa datos según el tipo de gráfico (tabla resultado: X primero, valor después)"""
+        opciones = opciones or OpcionesGrafico()
         
         if tipo_grafico == "barras":
-            return self._procesar_grafico_barras(df, columna_x, columna_y, agregacion)
+            return self._procesar_grafico_barras(df, columna_x, columna_y, agregacion, agregados, opciones)
         elif tipo_grafico == "lineas":
-            return self._procesar_grafico_lineas(df, columna_x, columna_y, agregacion)
+            return self._procesar_grafico_lineas(df, columna_x, columna_y, agregacion, agregados)
         elif tipo_grafico == "pastel":
-            return self._procesar_grafico_pastel(df, columna_x, columna_y, agregacion)
+            return self._procesar_grafico_pastel(df, columna_x, columna_y, agregacion, agregados, opciones)
         elif tipo_grafico == "dispersion":
-            return self._procesar_grafico_dispersion(df, columna_x, columna_y)
+            return self._procesar_grafico_dispersion(df, columna_x, columna_y, opciones)
         elif tipo_grafico == "area":
-            return self._procesar_grafico_area(df, columna_x, columna_y, agregacion)
+            return self._procesar_grafico_area(df, columna_x, columna_y, agregacion, agregados)
         else:
             raise ErrorGeneracionGrafico(f"Tipo de gráfico no soportado: {tipo_grafico}")
     
-    def _agregar_datos(self, df: pd.DataFrame, columna_x: str, columna_y: str, agregacion: str) -> pd.DataFrame:
-        """Agrega datos según el tipo de agregación especificado"""
+    def formatear_datos(
+        self,
+        tabla: pd.DataFrame,
+        opciones: OpcionesGrafico
+    ) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+        """Convierte la tabla resultado al formato de salida pedido"""
+        if opciones.formato == "columnar":
+            # La primera columna es siempre X y la segunda el valor (Y/conteo);
+            # columnas extra como 'porcentaje' conservan su nombre
+            nombres = {tabla.columns[0]: "x"}
+            if len(tabla.columns) > 1:
+                nombres[tabla.columns[1]] = "y"
+            return dataframe_a_columnas(tabla, nombres)
+        return dataframe_a_registros(tabla)
+    
+    def _proyectar_columnas(self, dataframe: pd.DataFrame, eje_x: str, eje_y: str) -> pd.DataFrame:
+        """Selecciona únicamente las columnas usadas por el gráfico"""
+        columnas = [eje_x]
+        if eje_y != eje_x and eje_y in dataframe.columns:
+            columnas.append(eje_y)
+        return dataframe[columnas]
+    
+    def _unidad_remuestreo(
+        self,
+        serie_x: pd.Series,
+        tipo_grafico: str,
+        opciones: OpcionesGrafico
+    ) -> Optional[str]:
+        """Unidad de tiempo a la que se trunca X, o None si no se remuestrea"""
+        if opciones.remuestreo == "ninguno" or tipo_grafico not in ("lineas", "area"):
+            return None
+        if not pd.api.types.is_datetime64_any_dtype(serie_x):
+            if opciones.remuestreo == "auto":
+                return None
+            raise ErrorGeneracionGrafico(f"El remuestreo requiere una columna de fechas en X ({serie_x.name})")
+        if opciones.remuestreo == "auto":
+            return elegir_unidad_tiempo(serie_x, opciones.max_puntos or self.BUCKETS_REMUESTREO_AUTO)
+        return opciones.remuestreo
+    
+    def _claves_agrupacion(self, dataframe: pd.DataFrame, columna_x: str, unidad_tiempo: Optional[str]) -> pd.Series:
+        """Columna X tal cual o truncada a la unidad de tiempo"""
+        if unidad_tiempo is None:
+            return dataframe[columna_x]
+        return truncar_fechas(dataframe[columna_x], unidad_tiempo)
+    
+    def preparar_indice_agrupacion(
+        self,
+        dataframe: pd.DataFrame,
+        columna_x: str,
+        id_archivo: Optional[str] = None,
+        unidad_tiempo: Optional[str] = None
+    ) -> IndiceAgrupacion:
+        """
+        Índice factorizado de la columna X (truncada si hay `unidad_tiempo`):
+        del almacenamiento o calculado y guardado
+        """
+        if self.almacenamiento is None or id_archivo is None:
+            return factorizar(self._claves_agrupacion(dataframe, columna_x, unidad_tiempo))
+        
+        clave_columna = columna_x if unidad_tiempo is None else f"{columna_x}@{unidad_tiempo}"
+        indice = self.almacenamiento.obtener_indice_agrupacion(id_archivo, clave_columna)
+        if indice is None or len(indice.codigos) != len(dataframe):
+            indice = factorizar(self._claves_agrupacion(dataframe, columna_x, unidad_tiempo))
+            self.almacenamiento.guardar_indice_agrupacion(id_archivo, clave_columna, indice)
+        return indice
+    
+    def _obtener_tabla_agregada(
+        self,
+        dataframe: pd.DataFrame,
+        columna_x: str,
+        columna_y: str,
+        id_archivo: Optional[str] = None,
+        unidad_tiempo: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Tabla de agregaciones de (X, Y): del almacenamiento o calculada y guardada"""
+        if self.almacenamiento is None or id_archivo is None:
+            indice = factorizar(self._claves_agrupacion(dataframe, columna_x, unidad_tiempo))
+            return self._calcular_agregados(dataframe, columna_x, columna_y, indice)
+        
+        clave = (id_archivo, columna_x, columna_y, unidad_tiempo)
+        agregados = self.almacenamiento.obtener_tabla_agregada(clave)
+        if agregados is None:
+            indice = self.preparar_indice_agrupacion(dataframe, columna_x, id_archivo, unidad_tiempo)
+            agregados = self._calcular_agregados(dataframe, columna_x, columna_y, indice)
+            self.almacenamiento.guardar_tabla_agregada(clave, agregados)
+        return agregados
+    
+    def _extremos_columna(self, archivo: "pq.ParquetFile", columna: str) -> pd.Series:
+        """
+        Mínimo y máximo de una columna del parquet (para elegir la unidad de
+        remuestreo): de las estadísticas de cada row group o, si faltan,
+        leyendo la columna bloque a bloque.
+        """
+        posicion = archivo.schema_arrow.get_field_index(columna)
+        tipo = archivo.schema_arrow.field(posicion).type
+        extremos = []
+        for grupo in range(archivo.num_row_groups):
+            estadisticas = archivo.metadata.row_group(grupo).column(posicion).statistics
+            if estadisticas is not None and estadisticas.has_min_max:
+                extremos.extend([estadisticas.min, estadisticas.max])
+            else:
+                serie = archivo.read_row_group(grupo, columns=[columna]).column(0).to_pandas()
+                extremos.extend([serie.min(), serie.max()])
+        
+        # Vacía pero con el tipo de la columna para que _unidad_remuestreo la reconozca
+        vacia = pa.array([], type=tipo).to_pandas()
+        extremos = [valor for valor in extremos if not pd.isna(valor)]
+        if not extremos:
+            return vacia.rename(columna)
+        return pd.Series(extremos, name=columna).astype(vacia.dtype)
+    
+    def _agregar_por_bloques(
+        self,
+        archivo: "pq.ParquetFile",
+        columnas: List[str],
+        columna_x: str,
+        columna_y: str,
+        unidad_tiempo: Optional[str]
+    ) -> pd.DataFrame:
+        """
+        Tabla de agregados de (X, Y) recorriendo el parquet un row group cada
+        vez: en memoria solo hay un bloque de las columnas pedidas y las
+        tablas parciales (una fila por grupo).
+        
+        Si Y es numérica se decide con la misma regla que en memoria
+        (_y_es_numerica) sobre el total del archivo: cada bloque se agrega
+        como numérico mientras se acumulan sus nulos tras la conversión, y al
+        final se descartan las columnas numéricas si la regla no se cumple.
+        Así la tabla no depende de si el DataFrame estaba en memoria.
+        """
+        bloques = (archivo.read_row_group(grupo, columns=columnas) for grupo in range(archivo.num_row_groups))
+        if archivo.num_row_groups == 0:
+            bloques = [archivo.schema_arrow.empty_table().select(columnas)]
+        
+        parciales = []
+        filas = nulos = 0
+        convertible = True
+        for bloque in bloques:
+            bloque = bloque.to_pandas()
+            indice = factorizar(self._claves_agrupacion(bloque, columna_x, unidad_tiempo))
+            if columna_y != "conteo":
+                valores_y = self._convertir_a_numerico(bloque[columna_y])
+                convertible = convertible and valores_y.dtype != 'object'
+                filas += len(bloque)
+                nulos += int(valores_y.isna().sum())
+            # El bloque se pasa sin convertir: el conteo cuenta los valores originales no nulos
+            parciales.append(self._calcular_agregados(bloque, columna_x, columna_y, indice, convertible))
+        
+        tabla = self._combinar_agregados(parciales, columna_x)
+        if columna_y != "conteo" and not self._y_es_numerica(convertible, nulos, filas):
+            tabla = tabla[[columna for columna in ("filas", "conteo") if columna in tabla.columns]]
+        return tabla
+    
+    def _combinar_agregados(self, parciales: List[pd.DataFrame], columna_x: str) -> pd.DataFrame:
+        """
+        Une tablas de agregados parciales: sumas y conteos se suman, mínimo y
+        máximo se reducen y el promedio se recalcula como suma / conteo_valores.
+        """
+        combinado = pd.concat(parciales)
+        reglas = {
+            "filas": "sum", "conteo": "sum", "suma": "sum",
+            "minimo": "min", "maximo": "max", "conteo_valores": "sum"
+        }
+        tabla = combinado.groupby(level=0, sort=True).agg(
+            {columna: regla for columna, regla in reglas.items() if columna in combinado.columns}
+        )
+        tabla.index.name = columna_x
+        if "suma" in tabla.columns:
+            suma = tabla["suma"].to_numpy()
+            conteo = tabla["conteo_valores"].to_numpy()
+            with np.errstate(invalid="ignore", divide="ignore"):
+                promedio = np.where(conteo > 0, suma / np.maximum(conteo, 1), np.nan)
+            tabla.insert(tabla.columns.get_loc("suma") + 1, "promedio", promedio)
+        return tabla
+    
+    def _calcular_agregados(
+        self,
+        df: pd.DataFrame,
+        columna_x: str,
+        columna_y: str,
+        indice: IndiceAgrupacion,
+        numerico: Optional[bool] = None
+    ) -> pd.DataFrame:
+        """
+        Calcula en una sola pasada todo lo que puede pedir _agregar_datos.
+        
+        Devuelve una tabla indexada por los grupos de columna_x con:
+        - filas: tamaño del grupo (para eje_y "conteo" o Y no numérica)
+        - conteo: valores no nulos de Y, de cualquier tipo
+        - suma, promedio, minimo, maximo, conteo_valores: solo si Y es
+          mayormente numérica
+        
+        Las reducciones usan el índice factorizado (bincount/reduceat sobre
+        los códigos) en lugar de un groupby por cada agregación. `numerico`
+        fuerza la decisión sobre Y (la agregación por bloques la toma al
+        final, para todo el archivo); con None se aplica _y_es_numerica.
+        """
+        grupos = pd.Index(indice.unicos, name=columna_x)
+        columnas = {"filas": indice.tamanos()}
         if columna_y == "conteo":
-            return df.groupby(columna_x).size().reset_index(name='conteo')
-        
-        # Validar que la columna Y sea numérica (excepto para conteo)
-        if agregacion != "conteo":
-            # Intentar convertir a numérico, si falla usar conteo
-            try:
-                df[columna_y] = pd.to_numeric(df[columna_y], errors='coerce')
-            except Exception:
-                pass
-            
-            # Si la columna no es numérica o tiene muchos valores no numéricos, usar conteo
-            if df[columna_y].dtype == 'object' or df[columna_y].isna().sum() > len(df) * 0.5:
-                return df.groupby(columna_x).size().reset_index(name='conteo')
-        
-        if agregacion == "suma":
-            return df.groupby(columna_x)[columna_y].sum().reset_index()
-        elif agregacion == "promedio" or agregacion == "media":
-            return df.groupby(columna_x)[columna_y].mean().reset_index()
-        elif agregacion == "conteo":
-            return df.groupby(columna_x)[columna_y].count().reset_index()
-        elif agregacion == "minimo":
-            return df.groupby(columna_x)[columna_y].min().reset_index()
-        elif agregacion == "maximo":
-            return df.groupby(columna_x)[columna_y].max().reset_index()
+            return pd.DataFrame(columnas, index=grupos)
+        
+        valores_y = df[columna_y]
+        
+        # conteo cuenta valores no nulos de cualquier tipo: basta la máscara de nulos
+        columnas["conteo"] = indice.agregar(np.where(valores_y.isna().to_numpy(), np.nan, 0.0), "conteo")
+        
+        if numerico is False:
+            return pd.DataFrame(columnas, index=grupos)
+        
+        # Convertir a numérico sin tocar el DataFrame
+        valores_y = self._convertir_a_numerico(valores_y)
+        
+        # Si la columna no es numérica o tiene muchos valores no numéricos, solo hay conteos
+        if numerico is None and not self._y_es_numerica(
+            valores_y.dtype != 'object', int(valores_y.isna().sum()), len(df)
+        ):
+            return pd.DataFrame(columnas, index=grupos)
+        
+        if isinstance(valores_y.dtype, np.dtype) and valores_y.dtype.kind in "iub":
+            valores = valores_y.to_numpy()
         else:
-            return df.groupby(columna_x)[columna_y].sum().reset_index()
+            valores = valores_y.to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        reducciones = indice.agregar_todas(valores)
+        for agregacion in ("suma", "promedio", "minimo", "maximo"):
+            columnas[agregacion] = reducciones[agregacion]
+        # Valores numéricos por grupo: para promedios ponderados (grupo "Otros")
+        columnas["conteo_valores"] = reducciones["conteo"]
+        return pd.DataFrame(columnas, index=grupos)
+    
+    def _convertir_a_numerico(self, serie: pd.Series) -> pd.Series:
+        """Y como numérica (lo no convertible queda en NaN); si no se puede convertir, sin cambios"""
+        try:
+            return pd.to_numeric(serie, errors='coerce')
+        except Exception:
+            return serie
+    
+    def _y_es_numerica(self, convertible: bool, nulos: int, filas: int) -> bool:
+        """
+        Regla única para memoria y bloques: Y se agrega como número si se pudo
+        convertir y tras la conversión no quedan nulos en más de la mitad de
+        las filas; si no, solo se ofrecen conteos.
+        """
+        return convertible and nulos <= filas * 0.5
+    
+    def _agregar_datos(
+        self,
+        df: pd.DataFrame,
+        columna_x: str,
+        columna_y: str,
+        agregacion: str,
+        agregados: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
+        """
+        Agrega datos según el tipo de agregación especificado.
+        
+        Con la tabla de agregados ya calculada solo se selecciona la columna
+        pedida; si no se pasa, se calcula para este DataFrame.
+        """
+        if agregados is None:
+            agregados = self._calcular_agregados(df, columna_x, columna_y, factorizar(df[columna_x]))
+        
+        if columna_y == "conteo":
+            return self._tabla_agrupada(agregados, columna_x, 'conteo', "filas")
+        
+        if agregacion == "conteo":
+            return self._tabla_agrupada(agregados, columna_x, columna_y, "conteo")
+        
+        # Y no numérica (validada al calcular los agregados): usar conteo de filas
+        if "suma" not in agregados.columns:
+            return self._tabla_agrupada(agregados, columna_x, 'conteo', "filas")
+        
+        if agregacion == "media":
+            agregacion = "promedio"
+        elif agregacion not in ("suma", "promedio", "minimo", "maximo"):
+            agregacion = "suma"
+        return self._tabla_agrupada(agregados, columna_x, columna_y, agregacion)
+    
+    def _tabla_agrupada(
+        self,
+        agregados: pd.DataFrame,
+        columna_x: str,
+        columna_valor: str,
+        agregacion: str
+    ) -> pd.DataFrame:
+        """Tabla resultado (X, valor) como la de groupby().reset_index()"""
+        return pd.DataFrame({
+            columna_x: agregados.index,
+            columna_valor: agregados[agregacion].to_numpy()
+        })
     
     def _procesar_grafico_barras(
         self, 
         df: pd.DataFrame, 
         columna_x: str, 
         columna_y: str,
-        agregacion: str
-    ) -> List[Dict[str, Any]]:
+        agregacion: str,
+        agregados: Optional[pd.DataFrame] = None,
+        opciones: Optional[OpcionesGrafico] = None
+    ) -> pd.DataFrame:
         """Procesa datos para gráfico de barras con agregación"""
-        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion)
-        
-        # Limitar a top 20 para evitar sobrecarga visual
-        if len(agrupado) > 20:
-            columna_valor = agrupado.columns[-1]
-            # Asegurar que la columna es numérica antes de usar nlargest
-            try:
-                agrupado[columna_valor] = pd.to_numeric(agrupado[columna_valor], errors='coerce').fillna(0)
-                agrupado = agrupado.nlargest(20, columna_valor)
-            except Exception:
-                # Si falla, tomar las primeras 20
-                agrupado = agrupado.head(20)
-        
-        return agrupado.to_dict('records')
+        opciones = opciones or OpcionesGrafico()
+        if agregados is None:
+            agregados = self._calcular_agregados(df, columna_x, columna_y, factorizar(df[columna_x]))
+        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion, agregados)
+        
+        # Limitar a top K (20 por defecto) para evitar sobrecarga visual
+        return self._seleccionar_top(agrupado, agregados, agregacion, opciones.top_barras, opciones.incluir_otros)
     
     def _procesar_grafico_lineas(
         self, 
         df: pd.DataFrame, 
         columna_x: str, 
         columna_y: str,
-        agregacion: str
-    ) -> List[Dict[str, Any]]:
+        agregacion: str,
+        agregados: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
         """Procesa datos para gráfico de líneas"""
-        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion)
+        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion, agregados)
         df_ordenado = agrupado.sort_values(columna_x)
-        return df_ordenado.to_dict('records')
+        return df_ordenado
     
     def _procesar_grafico_pastel(
         self, 
         df: pd.DataFrame, 
         columna_x: str, 
         columna_y: str,
-        agregacion: str
-    ) -> List[Dict[str, Any]]:
+        agregacion: str,
+        agregados: Optional[pd.DataFrame] = None,
+        opciones: Optional[OpcionesGrafico] = None
+    ) -> pd.DataFrame:
         """Procesa datos para gráfico circular"""
-        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion)
+        opciones = opciones or OpcionesGrafico()
+        if agregados is None:
+            agregados = self._calcular_agregados(df, columna_x, columna_y, factorizar(df[columna_x]))
+        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion, agregados)
+        
+        # Limitar a top K (10 por defecto); los porcentajes son sobre el total de todos los grupos
+        return self._seleccionar_top(
+            agrupado, agregados, agregacion, opciones.top_pastel, opciones.incluir_otros, con_porcentaje=True
+        )
+    
+    def _seleccionar_top(
+        self,
+        agrupado: pd.DataFrame,
+        agregados: pd.DataFrame,
+        agregacion: str,
+        k: int,
+        incluir_otros: bool = True,
+        con_porcentaje: bool = False
+    ) -> pd.DataFrame:
+        """
+        Los K grupos de mayor valor (np.argpartition, O(n) en alta cardinalidad)
+        ordenados de mayor a menor. El resto se resume en un grupo "Otros" que
+        no se añade como fila (chocaría con una categoría real llamada así y
+        cambiaría el tipo de X si es numérica o fecha): va en
+        `tabla.attrs["grupo_otros"]` y _armar_grafico lo pasa a los metadatos.
         
-        # Limitar a top 10 para gráficos circulares
-        if len(agrupado) > 10:
-            agrupado = agrupado.nlargest(10, agrupado.columns[-1])
+        El valor de "Otros" respeta la agregación: suma/conteo suman el resto,
+        promedio se pondera con las sumas y conteos del resto, minimo/maximo
+        toman el extremo. El porcentaje se calcula sobre el total de todos
+        los grupos, así que top K + "Otros" suman 100.
+        """
+        columna_x, columna_valor = agrupado.columns[0], agrupado.columns[1]
+        valores = pd.to_numeric(agrupado[columna_valor], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        total = valores.sum()
         
-        # Calcular total y porcentajes (asegurar tipo numérico)
-        columna_valor = agrupado.columns[-1]
-        try:
-            # Convertir a numérico si no lo es
-            agrupado[columna_valor] = pd.to_numeric(agrupado[columna_valor], errors='coerce').fillna(0)
-            total = agrupado[columna_valor].sum()
-            
+        def porcentajes(parte: np.ndarray) -> np.ndarray:
             if total > 0:
-                agrupado['porcentaje'] = (agrupado[columna_valor] / total * 100).round(2)
-            else:
-                agrupado['porcentaje'] = 0
-        except Exception as e:
-            # Si falla el cálculo de porcentaje, usar valores absolutos
-            agrupado['porcentaje'] = 0
+                return np.round(parte / total * 100, 2)
+            return np.zeros(len(parte))
+        
+        if len(agrupado) <= k:
+            tabla = agrupado.reset_index(drop=True)
+            if con_porcentaje:
+                tabla['porcentaje'] = porcentajes(valores)
+            return tabla
+        
+        top = np.argpartition(-valores, k - 1)[:k]
+        top = top[np.argsort(-valores[top], kind="stable")]
+        tabla = agrupado.iloc[top].reset_index(drop=True)
+        if con_porcentaje:
+            tabla['porcentaje'] = porcentajes(valores[top])
+        if not incluir_otros:
+            return tabla
         
-        return agrupado.to_dict('records')
+        resto = np.ones(len(agrupado), dtype=bool)
+        resto[top] = False
+        otros = {
+            "grupos": int(resto.sum()),
+            "valor": self._valor_otros(agrupado[columna_valor], agregados, agregacion, resto, valores)
+        }
+        if con_porcentaje:
+            otros["porcentaje"] = float(porcentajes(np.array([valores[resto].sum()]))[0])
+        tabla.attrs["grupo_otros"] = otros
+        return tabla
+    
+    def _valor_otros(
+        self,
+        valores_grupo: pd.Series,
+        agregados: pd.DataFrame,
+        agregacion: str,
+        resto: np.ndarray,
+        valores: np.ndarray
+    ) -> Union[int, float]:
+        """Valor del grupo "Otros" combinando los grupos fuera del top K"""
+        numerico = "suma" in agregados.columns and valores_grupo.name != "conteo"
+        if numerico and agregacion in ("promedio", "media"):
+            conteo = agregados["conteo_valores"].to_numpy()[resto].sum()
+            return float(agregados["suma"].to_numpy()[resto].sum() / conteo) if conteo else float("nan")
+        if numerico and agregacion in ("minimo", "maximo"):
+            reduccion = np.fmin if agregacion == "minimo" else np.fmax
+            return float(reduccion.reduce(valores_grupo.to_numpy(dtype=np.float64, na_value=np.nan)[resto]))
+        if isinstance(valores_grupo.dtype, np.dtype) and valores_grupo.dtype.kind in "iu":
+            # Conteos y sumas enteras siguen siendo enteros
+            return int(valores_grupo.to_numpy()[resto].sum())
+        return float(valores[resto].sum())
     
     def _procesar_grafico_dispersion(
         self, 
         df: pd.DataFrame, 
         columna_x: str, 
-        columna_y: str
-    ) -> List[Dict[str, Any]]:
+        columna_y: str,
+        opciones: OpcionesGrafico
+    ) -> pd.DataFrame:
         """Procesa datos para gráfico de dispersión"""
-        # Para scatter no agregamos, mostramos puntos individuales
-        # Pero limitamos a 1000 puntos para performance
-        df_dispersion = df[[columna_x, columna_y]].dropna()
-        if len(df_dispersion) > 1000:
-            df_dispersion = df_dispersion.sample(n=1000, random_state=42)
-        return df_dispersion.to_dict('records')
+        if opciones.modo_dispersion == "densidad":
+            # Millones de puntos: conteos por celda 2D en lugar de puntos individuales
+            return densidad_dispersion(df, columna_x, columna_y, opciones.celdas_densidad)
+        
+        # Para scatter no agregamos, mostramos puntos individuales limitados al
+        # presupuesto (1000 por defecto), conservando atípicos y zonas poco densas
+        return muestrear_dispersion(df, columna_x, columna_y, opciones.max_puntos or 1000)
     
     def _procesar_grafico_area(
         self, 
         df: pd.DataFrame, 
         columna_x: str, 
         columna_y: str,
-        agregacion: str
-    ) -> List[Dict[str, Any]]:
+        agregacion: str,
+        agregados: Optional[pd.DataFrame] = None
+    ) -> pd.DataFrame:
         """Procesa datos para gráfico de área"""
-        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion)
+        agrupado = self._agregar_datos(df, columna_x, columna_y, agregacion, agregados)
         df_ordenado = agrupado.sort_values(columna_x)
-        return df_ordenado.to_dict('records')
+        return df_ordenado
     
     def _generar_configuracion_grafico(
         self, 
@@ -0,0 +1,102 @@
+"""
+Perfilado de columnas de un DataFrame en una sola pasada
+"""
+from typing import Any
+import numpy as np
+import pandas as pd
+from pandas.api import types as tipos_pd
+from src.core.domain.value_objects import PerfilColumna, PerfilDatos
+
+class PerfiladorDatos:
+    """
+    Calcula el perfil de cada columna (tipo, nulos, cardinalidad, min/max,
+    media/desviación/cuartiles y valores más frecuentes).
+    
+    Reemplaza las llamadas repetidas a isnull().sum(), describe(), dtypes y
+    memory_usage(deep=True): el perfil se calcula al ingerir el archivo y
+    todos los consumidores leen de él.
+    """
+    
+    CUANTILES = (0.25, 0.5, 0.75)
+    
+    def __init__(self, max_valores_frecuentes: int = 5):
+        self.max_valores_frecuentes = max_valores_frecuentes
+    
+    def perfilar(self, df: pd.DataFrame) -> PerfilDatos:
+        """Perfila todas las columnas del DataFrame"""
+        # memory_usage(deep=True) con el índice en la posición 0
+        uso_memoria = df.memory_usage(deep=True, index=True)
+        columnas = tuple(
+            self._perfilar_columna(str(nombre), df.iloc[:, posicion], int(uso_memoria.iloc[posicion + 1]))
+            for posicion, nombre in enumerate(df.columns)
+        )
+        return PerfilDatos(
+            filas=len(df),
+            columnas=columnas,
+            uso_memoria=int(uso_memoria.sum())
+        )
+    
+    def _perfilar_columna(self, nombre: str, serie: pd.Series, uso_memoria: int) -> PerfilColumna:
+        categoria = self._categoria(serie)
+        
+        # Un solo recorrido de hash da la cardinalidad y los valores más frecuentes
+        frecuencias = serie.value_counts(dropna=True, sort=True)
+        conteo = int(frecuencias.sum())
+        valores_frecuentes = tuple(
+            (self._a_nativo(valor), int(veces))
+            for valor, veces in frecuencias.head(self.max_valores_frecuentes).items()
+        )
+        
+        perfil = {
+            "nombre": nombre,
+            "tipo_dato": str(serie.dtype),
+            "categoria": categoria,
+            "conteo": conteo,
+            "conteo_nulos": len(serie) - conteo,
+            "cardinalidad": len(frecuencias),
+            "uso_memoria": uso_memoria,
+            "valores_frecuentes": valores_frecuentes
+        }
+        
+        if categoria == "numerica":
+            perfil.update(self._estadisticas_numericas(serie))
+        elif categoria == "fecha" and conteo > 0:
+            perfil["minimo"] = self._a_nativo(serie.min())
+            perfil["maximo"] = self._a_nativo(serie.max())
+        
+        return PerfilColumna(**perfil)
+    
+    def _estadisticas_numericas(self, serie: pd.Series) -> dict:
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        valores = valores[~np.isnan(valores)]
+        
+        if len(valores) == 0:
+            return {"cuartiles": {f"{int(q * 100)}%": None for q in self.CUANTILES}}
+        
+        cuartiles = np.quantile(valores, self.CUANTILES)
+        return {
+            "minimo": float(valores.min()),
+            "maximo": float(valores.max()),
+            "media": float(valores.mean()),
+            "desviacion": float(valores.std(ddof=1)) if len(valores) > 1 else None,
+            "cuartiles": {f"{int(q * 100)}%": float(v) for q, v in zip(self.CUANTILES, cuartiles)}
+        }
+    
+    @staticmethod
+    def _categoria(serie: pd.Series) -> str:
+        if tipos_pd.is_bool_dtype(serie):
+            return "booleana"
+        if tipos_pd.is_numeric_dtype(serie):
+            return "numerica"
+        if tipos_pd.is_datetime64_any_dtype(serie):
+            return "fecha"
+        return "categorica"
+    
+    @staticmethod
+    def _a_nativo(valor: Any) -> Any:
+        """Convierte escalares de numpy/pandas a tipos serializables"""
+        if isinstance(valor, pd.Timestamp):
+            return valor.isoformat()
+        if isinstance(valor, np.generic):
+            return valor.item()
+        return valor
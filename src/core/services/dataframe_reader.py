@@ -0,0 +1,132 @@
+"""
+Lector compartido de archivos (CSV, Excel, JSON) a DataFrame
+"""
+import io
+from typing import Union
+import pandas as pd
+from src.core.domain.exceptions import ErrorTipoArchivoNoSoportado
+from src.core.services.datetime_inference import convertir_columnas_fecha
+
+# pyarrow es opcional: sin él se usa siempre el motor C de pandas
+PYARROW_DISPONIBLE = False
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    PYARROW_DISPONIBLE = True
+except Exception:
+    pa = None
+    pa_csv = None
+
+# Mismos marcadores de nulo que pd.read_csv ("", "NA", "null", "N/A", ...)
+try:
+    from pandas._libs.parsers import STR_NA_VALUES as VALORES_NULOS
+except Exception:
+    VALORES_NULOS = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+                     "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+# Ruta a un archivo en disco o su contenido en memoria
+OrigenDatos = Union[str, bytes]
+
+class LectorDataFrame:
+    """
+    Convierte archivos a DataFrame usando el lector más rápido disponible.
+    
+    Los CSV se leen con el lector de Arrow (multihilo, por bloques) y, si
+    Arrow no puede parsear el archivo (tipos inconsistentes entre bloques,
+    columnas duplicadas, etc.), se reintenta con el motor C de pandas.
+    Los tipos resultantes se alinean con los de `pd.read_csv` (las columnas
+    vacías quedan como float) y después, con `detectar_fechas`, las columnas
+    de texto que son fechas se convierten a datetime64 con un formato
+    inferido una vez por columna, igual para CSV, Excel y JSON.
+    """
+    
+    TIPOS_CSV = ('csv',)
+    TIPOS_EXCEL = ('xlsx', 'xls', 'excel')
+    TIPOS_JSON = ('json',)
+    
+    def __init__(
+        self,
+        usar_arrow: bool = True,
+        tamano_bloque: int = 16 * 1024 * 1024,
+        detectar_fechas: bool = True
+    ):
+        self.usar_arrow = usar_arrow and PYARROW_DISPONIBLE
+        self.tamano_bloque = tamano_bloque
+        self.detectar_fechas = detectar_fechas
+    
+    def leer(self, origen: OrigenDatos, tipo_archivo: str) -> pd.DataFrame:
+        """Lee el origen según su tipo de archivo"""
+        if tipo_archivo in self.TIPOS_CSV:
+            df = self.leer_csv(origen)
+        elif tipo_archivo in self.TIPOS_EXCEL:
+            df = pd.read_excel(self._abrir(origen))
+        elif tipo_archivo in self.TIPOS_JSON:
+            df = pd.read_json(self._abrir(origen))
+        else:
+            raise ErrorTipoArchivoNoSoportado(f"Tipo de archivo no soportado: {tipo_archivo}")
+        
+        if self.detectar_fechas:
+            convertir_columnas_fecha(df)
+        return df
+    
+    def leer_csv(self, origen: OrigenDatos) -> pd.DataFrame:
+        """Lee un CSV con Arrow y cae al motor C de pandas si falla"""
+        if self.usar_arrow:
+            try:
+                return self._leer_csv_arrow(origen)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+                pass
+        return pd.read_csv(self._abrir(origen), engine="c")
+    
+    def _leer_csv_arrow(self, origen: OrigenDatos) -> pd.DataFrame:
+        opciones_lectura = pa_csv.ReadOptions(use_threads=True, block_size=self.tamano_bloque)
+        
+        # Arrow infiere fechas y pandas no: se detectan con el primer bloque
+        # y se fuerzan a texto para conservar los valores originales
+        columnas_texto = self._columnas_temporales(origen, opciones_lectura)
+        # Las celdas vacías y los marcadores de nulo de pandas también son nulos en
+        # columnas de texto (por defecto Arrow los conserva como cadenas literales)
+        opciones_conversion = pa_csv.ConvertOptions(
+            column_types={columna: pa.string() for columna in columnas_texto},
+            null_values=sorted(VALORES_NULOS),
+            strings_can_be_null=True
+        )
+        
+        tabla = pa_csv.read_csv(
+            self._abrir_arrow(origen),
+            read_options=opciones_lectura,
+            convert_options=opciones_conversion
+        )
+        
+        if len(set(tabla.column_names)) != len(tabla.column_names):
+            raise ValueError("Columnas duplicadas: se delega en pandas para renombrarlas")
+        
+        # Columnas completamente vacías: pandas las lee como float64 (NaN)
+        for indice, campo in enumerate(tabla.schema):
+            if pa.types.is_null(campo.type):
+                tabla = tabla.set_column(indice, campo.name, tabla.column(indice).cast(pa.float64()))
+        
+        return tabla.to_pandas()
+    
+    def _columnas_temporales(self, origen: OrigenDatos, opciones_lectura) -> list:
+        lector = pa_csv.open_csv(self._abrir_arrow(origen), read_options=opciones_lectura)
+        try:
+            return [
+                campo.name for campo in lector.schema
+                if pa.types.is_temporal(campo.type)
+            ]
+        finally:
+            lector.close()
+    
+    @staticmethod
+    def _abrir(origen: OrigenDatos):
+        return io.BytesIO(origen) if isinstance(origen, (bytes, bytearray)) else origen
+    
+    @staticmethod
+    def _abrir_arrow(origen: OrigenDatos):
+        return pa.BufferReader(origen) if isinstance(origen, (bytes, bytearray)) else origen
+    
+    @staticmethod
+    def tipo_desde_nombre(nombre_archivo: str) -> str:
+        """Obtiene el tipo de archivo a partir de la extensión"""
+        return nombre_archivo.lower().split('.')[-1]
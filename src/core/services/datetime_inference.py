@@ -0,0 +1,160 @@
+"""
+Detección de columnas de fecha al ingerir y truncado vectorizado a
+día/semana/mes/trimestre para remuestrear series temporales
+"""
+import re
+import threading
+import warnings
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from pandas.api import types as tipos_pd
+from pandas.tseries.api import guess_datetime_format
+
+# Valores de muestra usados para adivinar y validar el formato de cada columna
+TAMANO_MUESTRA = 50
+
+# Unidades de remuestreo de la más fina a la más gruesa, con su duración aproximada en días
+UNIDADES_TIEMPO = (("dia", 1), ("semana", 7), ("mes", 30.44), ("trimestre", 91.31))
+
+# Formatos candidatos por patrón de texto, compartidos entre columnas y archivos
+MAX_PATRONES_CACHEADOS = 256
+_formatos_por_patron: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+_bloqueo_patrones = threading.Lock()
+
+# El 1970-01-01 fue jueves: desplazamiento para que las semanas empiecen en lunes
+_DESPLAZAMIENTO_LUNES = 3
+
+
+def _intercambiar_dia_mes(formato: str) -> str:
+    return formato.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
+
+
+def _formatos_candidatos(patron: str, ejemplo: str) -> Tuple[str, ...]:
+    """
+    Formatos posibles para los valores con la forma `patron` (dígitos
+    normalizados): mes antes que día y, si el orden es ambiguo, día antes que
+    mes. Se adivinan con el ejemplo la primera vez y quedan cacheados por el
+    patrón, así que columnas con la misma forma no vuelven a adivinarlos.
+    Los patrones sin formato no se cachean: el ejemplo pudo ser un valor inválido.
+    """
+    with _bloqueo_patrones:
+        candidatos = _formatos_por_patron.get(patron)
+        if candidatos is not None:
+            _formatos_por_patron.move_to_end(patron)
+            return candidatos
+
+    with warnings.catch_warnings():
+        # pandas avisa cuando el valor solo encaja con el día primero; se valida después
+        warnings.simplefilter("ignore", UserWarning)
+        formato = guess_datetime_format(ejemplo) or guess_datetime_format(ejemplo, dayfirst=True)
+    # Exigir año y mes evita tomar por fechas códigos o números sueltos ("2020", "12")
+    if formato is None or not re.search(r"%[Yy]", formato) or not re.search(r"%[mbB]", formato):
+        return ()
+
+    posibles = [formato]
+    if "%d" in formato and "%m" in formato:
+        # Orden ambiguo: primero mes/día (como pandas por defecto) y después día/mes
+        posibles = sorted(
+            [formato, _intercambiar_dia_mes(formato)],
+            key=lambda posible: posible.index("%d") < posible.index("%m")
+        )
+    candidatos = tuple(dict.fromkeys(
+        # ISO 8601 admite mezclar fechas con y sin hora en la misma columna sin perder velocidad
+        "ISO8601" if posible.startswith(("%Y-%m-%d", "%Y%m%d")) else posible
+        for posible in posibles
+    ))
+    with _bloqueo_patrones:
+        _formatos_por_patron[patron] = candidatos
+        while len(_formatos_por_patron) > MAX_PATRONES_CACHEADOS:
+            _formatos_por_patron.popitem(last=False)
+    return candidatos
+
+
+def inferir_formato_fecha(serie: pd.Series) -> Optional[str]:
+    """Formato común de una columna de texto, o None si no parece de fechas"""
+    muestra = serie.dropna().head(TAMANO_MUESTRA)
+    if len(muestra) == 0 or not all(isinstance(valor, str) for valor in muestra):
+        return None
+
+    ejemplo = muestra.iloc[0].strip()
+    patron = re.sub(r"\d", "0", ejemplo)
+    # Fechas ambiguas (01/02/2024): si mes/día no encaja con la muestra, se prueba día/mes
+    for formato in _formatos_candidatos(patron, ejemplo):
+        if not pd.to_datetime(muestra, format=formato, errors="coerce").isna().any():
+            return formato
+    return None
+
+
+def convertir_columnas_fecha(df: pd.DataFrame) -> List[str]:
+    """
+    Convierte in situ las columnas de texto que son fechas a datetime64.
+
+    El formato se infiere una vez por columna sobre una muestra y se aplica
+    a toda la columna con `pd.to_datetime(format=...)`, que parsea vectorizado
+    en lugar de adivinar valor a valor. Solo se convierte si todos los valores
+    no nulos parsean: una columna mixta queda como texto sin perder datos.
+    Devuelve los nombres de las columnas convertidas.
+    """
+    convertidas = []
+    for columna in df.columns:
+        serie = df[columna]
+        if not (tipos_pd.is_object_dtype(serie) or tipos_pd.is_string_dtype(serie)):
+            continue
+        formato = inferir_formato_fecha(serie)
+        if formato is None:
+            continue
+        fechas = pd.to_datetime(serie, format=formato, errors="coerce")
+        if fechas.isna().sum() != serie.isna().sum():
+            continue
+        df[columna] = fechas
+        convertidas.append(columna)
+    return convertidas
+
+
+def elegir_unidad_tiempo(serie: pd.Series, max_buckets: int) -> str:
+    """Unidad más fina cuyo número de buckets en el rango de la serie no excede max_buckets"""
+    minimo, maximo = serie.min(), serie.max()
+    if pd.isna(minimo):
+        return UNIDADES_TIEMPO[0][0]
+    dias = (maximo - minimo) / pd.Timedelta(days=1)
+    for unidad, duracion in UNIDADES_TIEMPO:
+        if dias / duracion < max_buckets:
+            return unidad
+    return UNIDADES_TIEMPO[-1][0]
+
+
+def truncar_fechas(serie: pd.Series, unidad: str) -> pd.Series:
+    """
+    Lleva cada fecha al inicio de su día, semana (lunes), mes o trimestre.
+
+    Trabaja sobre datetime64 de numpy (astype a 'D'/'M' y aritmética entera),
+    sin to_period ni objetos Python por fila. Las fechas con zona horaria se
+    truncan en hora local y conservan su zona.
+    """
+    zona = getattr(serie.dt, "tz", None)
+    locales = serie.dt.tz_localize(None) if zona is not None else serie
+    valores = locales.to_numpy(dtype="datetime64[ns]")
+
+    if unidad == "dia":
+        truncadas = valores.astype("datetime64[D]")
+    elif unidad == "semana":
+        dias = valores.astype("datetime64[D]").astype(np.int64)
+        lunes = (dias + _DESPLAZAMIENTO_LUNES) // 7 * 7 - _DESPLAZAMIENTO_LUNES
+        truncadas = lunes.astype("datetime64[D]")
+    elif unidad == "mes":
+        truncadas = valores.astype("datetime64[M]")
+    elif unidad == "trimestre":
+        meses = valores.astype("datetime64[M]").astype(np.int64)
+        truncadas = (meses // 3 * 3).astype("datetime64[M]")
+    else:
+        raise ValueError(f"Unidad de tiempo no soportada: {unidad}")
+
+    # NaT se conserva: astype mantiene el valor centinela y la aritmética entera lo desplaza
+    truncadas = truncadas.astype("datetime64[ns]")
+    truncadas[np.isnat(valores)] = np.datetime64("NaT")
+    resultado = pd.Series(truncadas, index=serie.index, name=serie.name)
+    if zona is None:
+        return resultado
+    return resultado.dt.tz_localize(zona, ambiguous="NaT", nonexistent="shift_forward")
@@ -0,0 +1,68 @@
+"""
+Reducción de series para gráficos de líneas y área (Largest-Triangle-Three-Buckets)
+"""
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_puntos: int) -> np.ndarray:
+    """
+    Índices de los puntos elegidos por LTTB, conservando primero y último.
+
+    Los promedios de cada bucket se calculan de una vez con np.add.reduceat y
+    el área de los triángulos de cada bucket se evalúa vectorizada; solo se
+    itera sobre los buckets (max_puntos), nunca sobre los puntos.
+    """
+    n = len(x)
+    if max_puntos >= n or max_puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # max_puntos - 2 buckets entre el primer y el último punto
+    bordes = np.linspace(1, n - 1, max_puntos - 1).astype(np.int64)
+    tamanos = np.diff(bordes)
+    medias_x = np.add.reduceat(x[:n - 1], bordes[:-1]) / tamanos
+    medias_y = np.add.reduceat(np.nan_to_num(y[:n - 1]), bordes[:-1]) / tamanos
+
+    # El tercer vértice de cada triángulo es el promedio del bucket siguiente
+    siguiente_x = np.append(medias_x[1:], x[-1])
+    siguiente_y = np.append(medias_y[1:], y[-1])
+
+    seleccion = np.empty(max_puntos, dtype=np.int64)
+    seleccion[0] = 0
+    seleccion[-1] = n - 1
+
+    anterior = 0
+    for i in range(max_puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        xa, ya = x[anterior], y[anterior]
+        areas = np.abs(
+            (xa - siguiente_x[i]) * (y[inicio:fin] - ya)
+            - (xa - x[inicio:fin]) * (siguiente_y[i] - ya)
+        )
+        anterior = inicio + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        seleccion[i + 1] = anterior
+
+    return seleccion
+
+
+def valores_eje_x(serie: pd.Series) -> np.ndarray:
+    """Eje X como números: valores numéricos, fechas en nanosegundos o la posición"""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+    # Categorías/texto ya ordenados: se asume espaciado uniforme
+    return np.arange(len(serie), dtype=np.float64)
+
+
+def reducir_lttb(tabla: pd.DataFrame, max_puntos: int) -> pd.DataFrame:
+    """Reduce una tabla ordenada por X (primera columna) usando la segunda como Y"""
+    if len(tabla) <= max_puntos:
+        return tabla
+
+    x = valores_eje_x(tabla.iloc[:, 0])
+    y = pd.to_numeric(tabla.iloc[:, 1], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return tabla.iloc[lttb_indices(x, y, max_puntos)]
@@ -2,16 +2,20 @@
 Servicio de procesamiento de archivos
 """
 import pandas as pd
-import io
 from typing import Dict, Any
 from src.core.domain.entities import DatosArchivo
 from src.core.domain.exceptions import ErrorProcesarArchivo, ErrorTipoArchivoNoSoportado
+from src.core.services.dataframe_reader import LectorDataFrame
+from src.core.services.data_profiler import PerfiladorDatos
+from src.core.services.serialization import dataframe_a_registros
 
 class ServicioProcesarArchivo:
     """Servicio para procesamiento de archivos"""
     
     def __init__(self):
         self.tipos_soportados = ['csv', 'xlsx', 'xls', 'json']
+        self.lector = LectorDataFrame()
+        self.perfilador = PerfiladorDatos()
     
     def procesar_archivo(self, datos_archivo: DatosArchivo) -> Dict[str, Any]:
         """Procesa archivo y extrae información"""
@@ -19,20 +23,23 @@ class ServicioProcesarArchivo:
             # Convertir a DataFrame
             df = self._contenido_a_dataframe(datos_archivo.contenido, datos_archivo.tipo_archivo)
             
+            # Perfil de columnas en una sola pasada
+            perfil = self.perfilador.perfilar(df)
+            
             # Generar información del archivo
             info = {
-                "forma": df.shape,
-                "columnas": list(df.columns),
-                "tipos_datos": df.dtypes.to_dict(),
-                "conteo_nulos": df.isnull().sum().to_dict(),
-                "datos_muestra": df.head(5).to_dict('records'),
-                "uso_memoria": df.memory_usage(deep=True).sum()
+                "forma": perfil.forma,
+                "columnas": perfil.nombres_columnas,
+                "tipos_datos": perfil.tipos_datos(),
+                "conteo_nulos": perfil.conteo_nulos(),
+                "datos_muestra": dataframe_a_registros(df.head(5)),
+                "uso_memoria": perfil.uso_memoria
             }
             
             # Estadísticas numéricas si las hay
-            columnas_numericas = df.select_dtypes(include=['number']).columns
-            if len(columnas_numericas) > 0:
-                info["estadisticas"] = df[columnas_numericas].describe().to_dict()
+            estadisticas = perfil.estadisticas()
+            if estadisticas:
+                info["estadisticas"] = estadisticas
             
             return info
             
@@ -42,14 +49,7 @@ class ServicioProcesarArchivo:
     def _contenido_a_dataframe(self, contenido: bytes, tipo_archivo: str) -> pd.DataFrame:
         """Convierte contenido a DataFrame"""
         try:
-            if tipo_archivo == 'csv':
-                return pd.read_csv(io.BytesIO(contenido))
-            elif tipo_archivo in ['xlsx', 'xls']:
-                return pd.read_excel(io.BytesIO(contenido))
-            elif tipo_archivo == 'json':
-                return pd.read_json(io.BytesIO(contenido))
-            else:
-                raise ErrorTipoArchivoNoSoportado(f"Tipo no soportado: {tipo_archivo}")
+            return self.lector.leer(contenido, tipo_archivo)
                 
         except Exception as e:
             raise ErrorProcesarArchivo(f"Error leyendo archivo: {str(e)}")
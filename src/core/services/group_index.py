@@ -0,0 +1,127 @@
+"""
+Índice de agrupación factorizado: la columna X se factoriza una sola vez
+(códigos + valores únicos + orden por grupo) y las agregaciones se calculan
+con np.bincount / ufunc.reduceat sobre los códigos, sin volver a hashear.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class IndiceAgrupacion:
+    """Factorización de una columna para agrupar por ella"""
+    codigos: np.ndarray  # código de grupo por fila, int32 (-1 = nulo, se excluye como en groupby)
+    unicos: Any  # valores únicos ordenados (etiquetas de grupo)
+    orden: np.ndarray  # filas no nulas ordenadas por código (estable)
+    inicios: np.ndarray  # posición en `orden` donde empieza cada grupo
+    codigos_desplazados: np.ndarray  # codigos + 1 (0 = nulo), para np.bincount
+
+    @property
+    def n_grupos(self) -> int:
+        return len(self.unicos)
+
+    @property
+    def uso_memoria(self) -> int:
+        return int(
+            self.codigos.nbytes + self.codigos_desplazados.nbytes
+            + self.orden.nbytes + self.inicios.nbytes
+        )
+
+    def tamanos(self) -> np.ndarray:
+        """Filas por grupo (equivalente a groupby().size())"""
+        return np.diff(np.append(self.inicios, len(self.orden)))
+
+    def agregar(self, valores: np.ndarray, agregacion: str) -> np.ndarray:
+        """
+        Reduce `valores` (alineados con las filas) por grupo ignorando NaN,
+        igual que groupby: suma 0 y promedio/mínimo/máximo NaN en grupos sin datos.
+        """
+        if self.n_grupos == 0:
+            return np.empty(0, dtype=np.float64)
+        entero = valores.dtype.kind in "iub"
+        if agregacion == "suma" and entero:
+            # reduceat sobre enteros es exacto (bincount con pesos pasa por float64)
+            return np.add.reduceat(valores[self.orden].astype(np.int64), self.inicios)
+        if agregacion in ("minimo", "maximo"):
+            reduccion = np.fmin if agregacion == "minimo" else np.fmax
+            # fmin/fmax ignoran NaN salvo que todo el grupo sea NaN
+            return reduccion.reduceat(valores[self.orden], self.inicios)
+
+        # bincount sobre códigos desplazados (+1): los nulos de X caen en la
+        # casilla 0, que se descarta, sin filtrar filas con máscaras
+        nulos = None if entero else np.isnan(valores)
+        if nulos is None or not nulos.any():
+            conteo = self.tamanos()
+            pesos = valores
+        else:
+            conteo = np.bincount(self.codigos_desplazados, weights=~nulos, minlength=self.n_grupos + 1)[1:].astype(np.int64)
+            pesos = np.where(nulos, 0.0, valores)
+        if agregacion == "conteo":
+            return conteo
+
+        suma = np.bincount(self.codigos_desplazados, weights=pesos, minlength=self.n_grupos + 1)[1:]
+        if agregacion == "suma":
+            return suma
+        return _promedio(suma, conteo)
+
+    def agregar_todas(self, valores: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Las cinco reducciones (suma, promedio, conteo, minimo, maximo) en una
+        sola pasada: la máscara de nulos y la reordenación por grupo se
+        calculan una vez y se comparten entre todas.
+        """
+        if self.n_grupos == 0:
+            vacio = np.empty(0, dtype=np.float64)
+            return {agregacion: vacio for agregacion in ("suma", "promedio", "conteo", "minimo", "maximo")}
+
+        ordenados = valores[self.orden]
+        if valores.dtype.kind in "iub":
+            ordenados = ordenados.astype(np.int64)
+            conteo = self.tamanos()
+            suma = np.add.reduceat(ordenados, self.inicios)
+        else:
+            nulos = np.isnan(valores)
+            if nulos.any():
+                conteo = np.bincount(self.codigos_desplazados, weights=~nulos, minlength=self.n_grupos + 1)[1:].astype(np.int64)
+                pesos = np.where(nulos, 0.0, valores)
+            else:
+                conteo = self.tamanos()
+                pesos = valores
+            suma = np.bincount(self.codigos_desplazados, weights=pesos, minlength=self.n_grupos + 1)[1:]
+
+        return {
+            "suma": suma,
+            "promedio": _promedio(suma, conteo),
+            "conteo": conteo,
+            "minimo": np.fmin.reduceat(ordenados, self.inicios),
+            "maximo": np.fmax.reduceat(ordenados, self.inicios)
+        }
+
+
+def _promedio(suma: np.ndarray, conteo: np.ndarray) -> np.ndarray:
+    """suma / conteo, con NaN en grupos sin valores (como groupby().mean())"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(conteo > 0, suma / np.maximum(conteo, 1), np.nan)
+
+
+def factorizar(serie: pd.Series) -> IndiceAgrupacion:
+    """Factoriza la columna (orden ascendente de claves, como groupby)"""
+    codigos, unicos = pd.factorize(serie, sort=True)
+    codigos = codigos.astype(np.int32 if len(unicos) < 2**31 else np.int64, copy=False)
+
+    # Con claves de 16 bits numpy usa radix sort: mucho más rápido que timsort
+    clave_orden = codigos.astype(np.int16) if len(unicos) < 2**15 else codigos
+    orden = np.argsort(clave_orden, kind="stable")
+    codigos_ordenados = codigos[orden]
+    primero_no_nulo = np.searchsorted(codigos_ordenados, 0)  # descartar nulos (-1)
+    orden = orden[primero_no_nulo:].astype(np.int32 if len(codigos) < 2**31 else np.int64, copy=False)
+    inicios = np.searchsorted(codigos_ordenados[primero_no_nulo:], np.arange(len(unicos)))
+    return IndiceAgrupacion(
+        codigos=codigos,
+        unicos=unicos,
+        orden=orden,
+        inicios=inicios,
+        codigos_desplazados=codigos + 1
+    )
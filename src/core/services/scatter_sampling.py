@@ -0,0 +1,126 @@
+"""
+Motor de gráficos de dispersión: muestreo estratificado que conserva atípicos
+y modo de densidad por celdas 2D para conjuntos muy grandes
+"""
+import numpy as np
+import pandas as pd
+
+SEMILLA = 42
+
+
+def _indices_atipicos(x: np.ndarray, y: np.ndarray, limite: int) -> np.ndarray:
+    """
+    Puntos fuera del rango intercuartílico (1.5 IQR) en X o Y, más los extremos
+    de cada eje. Si hay más que `limite` se quedan los más alejados.
+    """
+    puntuacion = np.zeros(len(x))
+    for valores in (x, y):
+        q1, q3 = np.percentile(valores, [25, 75])
+        iqr = q3 - q1
+        if iqr > 0:
+            distancia = np.maximum(q1 - 1.5 * iqr - valores, valores - q3 - 1.5 * iqr) / iqr
+            puntuacion = np.maximum(puntuacion, distancia)
+
+    atipicos = np.flatnonzero(puntuacion > 0)
+    if len(atipicos) > limite:
+        atipicos = atipicos[np.argpartition(-puntuacion[atipicos], limite - 1)[:limite]]
+
+    extremos = [np.argmin(x), np.argmax(x), np.argmin(y), np.argmax(y)]
+    return np.union1d(atipicos, extremos)
+
+
+def _celdas(x: np.ndarray, y: np.ndarray, por_eje: int) -> np.ndarray:
+    """Identificador de celda de una grilla por_eje x por_eje para cada punto"""
+    def posicion(valores):
+        minimo, maximo = valores.min(), valores.max()
+        if maximo == minimo:
+            return np.zeros(len(valores), dtype=np.int64)
+        return np.minimum(((valores - minimo) / (maximo - minimo) * por_eje).astype(np.int64), por_eje - 1)
+    return posicion(x) * por_eje + posicion(y)
+
+
+def indices_muestra_estratificada(x: np.ndarray, y: np.ndarray, presupuesto: int) -> np.ndarray:
+    """
+    Índices (ordenados) de una muestra de `presupuesto` puntos que:
+
+    - incluye siempre los atípicos y extremos (hasta una quinta parte del presupuesto)
+    - reparte el resto proporcionalmente entre celdas de una grilla 2D, con al
+      menos un punto por celda ocupada, para conservar las zonas poco densas
+    """
+    n = len(x)
+    if n <= presupuesto:
+        return np.arange(n)
+
+    rng = np.random.default_rng(SEMILLA)
+    atipicos = _indices_atipicos(x, y, max(presupuesto // 5, 1))
+    restante = presupuesto - len(atipicos)
+    if restante <= 0:
+        return np.sort(atipicos[:presupuesto])
+
+    candidatos = np.setdiff1d(np.arange(n), atipicos, assume_unique=True)
+    candidatos = candidatos[rng.permutation(len(candidatos))]
+
+    # Rango de cada candidato dentro de su celda (orden aleatorio por la permutación)
+    celdas = _celdas(x[candidatos], y[candidatos], max(int(np.sqrt(restante)), 1))
+    orden = np.argsort(celdas, kind="stable")
+    celdas_ordenadas = celdas[orden]
+    unicas, inicios, conteos = np.unique(celdas_ordenadas, return_index=True, return_counts=True)
+    rango = np.arange(len(orden)) - np.repeat(inicios, conteos)
+
+    cuotas = np.maximum(1, np.floor(conteos * restante / len(candidatos))).astype(np.int64)
+    elegidos = orden[rango < np.repeat(cuotas, conteos)]
+    if len(elegidos) > restante:
+        elegidos = rng.choice(elegidos, restante, replace=False)
+    elif len(elegidos) < restante:
+        # El redondeo de cuotas deja huecos: se completan al azar (candidatos ya permutados)
+        libres = np.ones(len(candidatos), dtype=bool)
+        libres[elegidos] = False
+        elegidos = np.concatenate([elegidos, np.flatnonzero(libres)[:restante - len(elegidos)]])
+
+    return np.sort(np.concatenate([atipicos, candidatos[elegidos]]))
+
+
+def muestrear_dispersion(df: pd.DataFrame, columna_x: str, columna_y: str, presupuesto: int) -> pd.DataFrame:
+    """Muestra de puntos para dispersión que conserva atípicos y densidad relativa"""
+    # Con el mismo eje en X e Y la columna se selecciona una sola vez
+    columnas = [columna_x] if columna_x == columna_y else [columna_x, columna_y]
+    puntos = df[columnas].dropna()
+    if len(puntos) <= presupuesto:
+        return puntos
+
+    x = pd.to_numeric(puntos[columna_x], errors='coerce')
+    y = pd.to_numeric(puntos[columna_y], errors='coerce')
+    if x.isna().any() or y.isna().any():
+        # Ejes no numéricos: no hay geometría que estratificar
+        return puntos.sample(n=presupuesto, random_state=SEMILLA)
+
+    x = x.to_numpy(dtype=np.float64)
+    y = y.to_numpy(dtype=np.float64)
+    finitos = np.isfinite(x) & np.isfinite(y)
+    if not finitos.all():
+        puntos, x, y = puntos[finitos], x[finitos], y[finitos]
+
+    return puntos.iloc[indices_muestra_estratificada(x, y, presupuesto)]
+
+
+def densidad_dispersion(df: pd.DataFrame, columna_x: str, columna_y: str, celdas: int) -> pd.DataFrame:
+    """
+    Conteos por celda de una grilla 2D (np.histogram2d). Devuelve solo las
+    celdas ocupadas, con el centro de la celda en X/Y y la columna 'conteo'.
+    """
+    x = pd.to_numeric(df[columna_x], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    y = pd.to_numeric(df[columna_y], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    if len(x) == 0:
+        return pd.DataFrame({columna_x: [], columna_y: [], "conteo": []})
+
+    conteos, bordes_x, bordes_y = np.histogram2d(x, y, bins=celdas)
+    centros_x = (bordes_x[:-1] + bordes_x[1:]) / 2
+    centros_y = (bordes_y[:-1] + bordes_y[1:]) / 2
+    ix, iy = np.nonzero(conteos)
+    return pd.DataFrame({
+        columna_x: centros_x[ix],
+        columna_y: centros_y[iy],
+        "conteo": conteos[ix, iy].astype(np.int64)
+    })
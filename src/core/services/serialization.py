@@ -0,0 +1,68 @@
+"""
+Serialización vectorizada de DataFrames a estructuras listas para JSON
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+
+def _columna_a_lista(serie: pd.Series) -> List[Any]:
+    """Convierte una columna a lista de valores nativos, con None en lugar de NaN/Inf/NaT"""
+    tipo = serie.dtype
+
+    if tipo.kind == 'f':
+        valores = serie.to_numpy(dtype=np.float64)
+        invalidos = ~np.isfinite(valores)
+        if not invalidos.any():
+            return valores.tolist()
+        objetos = valores.astype(object)
+        objetos[invalidos] = None
+        return objetos.tolist()
+
+    if isinstance(tipo, np.dtype) and tipo.kind in 'iub':
+        # Enteros y booleanos numpy no admiten nulos: tolist() da tipos nativos
+        return serie.to_numpy().tolist()
+
+    # Resto de tipos (texto, categorías, fechas, nullable de pandas):
+    # nulos (NaN/NA/NaT) a None con una sola máscara vectorizada
+    objetos = serie.to_numpy(dtype=object)
+    nulos = serie.isna().to_numpy()
+    if nulos.any():
+        objetos[nulos] = None
+    resultado = objetos.tolist()
+    if tipo != object:
+        return resultado
+
+    # Columnas objeto pueden mezclar escalares numpy o floats no finitos
+    for i, valor in enumerate(resultado):
+        if isinstance(valor, np.generic):
+            valor = valor.item()
+            resultado[i] = valor
+        if isinstance(valor, float) and not np.isfinite(valor):
+            resultado[i] = None
+    return resultado
+
+
+def dataframe_a_registros(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Equivalente a df.to_dict('records') pero limpiando NaN/Inf y tipos numpy
+    columna a columna, sin recorrer cada valor con sanitize_for_json.
+    """
+    if len(df) == 0:
+        return []
+
+    columnas = list(df.columns)
+    valores = [_columna_a_lista(df.iloc[:, i]) for i in range(len(columnas))]
+    return [dict(zip(columnas, fila)) for fila in zip(*valores)]
+
+
+def dataframe_a_columnas(df: pd.DataFrame, nombres: Optional[Dict[str, str]] = None) -> Dict[str, List[Any]]:
+    """
+    Formato columnar: una lista por columna ({"x": [...], "y": [...]}),
+    sin construir un diccionario por fila. `nombres` permite renombrar columnas.
+    """
+    nombres = nombres or {}
+    return {
+        nombres.get(columna, columna): _columna_a_lista(df.iloc[:, i])
+        for i, columna in enumerate(df.columns)
+    }
@@ -1,21 +1,40 @@
 """
 Caso de uso para datos de gráficos
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
+from dataclasses import replace
+import asyncio
 from src.core.domain.entities import DatosGrafico
-from src.core.services.chart_data_generator import GeneradorDatosGrafico
+from src.core.domain.value_objects import OpcionesGrafico
+from src.core.services.chart_data_generator import GeneradorDatosGrafico, PYARROW_DISPONIBLE
+from src.infrastructure.concurrency.worker_pool import PoolTrabajadores, ejecutar_o_directo
 from src.infrastructure.persistence.in_memory_storage import AlmacenamientoMemoria
+from src.infrastructure.config.settings import obtener_configuracion
 
 class CasoUsoDatosGrafico:
     """Caso de uso para generar datos de gráficos"""
     
+    TIPOS_GRAFICO = ("barras", "lineas", "pastel", "dispersion", "area")
+    
     def __init__(
         self, 
         generador_graficos: GeneradorDatosGrafico,
-        almacenamiento: Optional[AlmacenamientoMemoria] = None
+        almacenamiento: Optional[AlmacenamientoMemoria] = None,
+        pool_trabajadores: Optional[PoolTrabajadores] = None
     ):
         self.generador_graficos = generador_graficos
         self.almacenamiento = almacenamiento or AlmacenamientoMemoria()
+        self.pool_trabajadores = pool_trabajadores
+        # Gráficos en cálculo por clave de cache: las peticiones idénticas simultáneas esperan el mismo resultado
+        self._en_vuelo: Dict[Tuple, asyncio.Future] = {}
+        self.umbral_por_bloques_bytes = obtener_configuracion().umbral_agregacion_por_bloques_mb * 1024 * 1024
+    
+    def _ruta_por_bloques(self, id_archivo: str) -> Optional[str]:
+        """Parquet a agregar por bloques si el DataFrame es grande y no está en memoria"""
+        if not PYARROW_DISPONIBLE:
+            return None
+        ruta = self.almacenamiento.ruta_lectura_por_bloques(id_archivo, self.umbral_por_bloques_bytes)
+        return str(ruta) if ruta is not None else None
     
     async def generar_datos_grafico_desde_archivo(
         self,
@@ -24,7 +43,9 @@ class CasoUsoDatosGrafico:
         eje_x: str,
         eje_y: str,
         titulo: str = None,
-        agregacion: str = "suma"
+        agregacion: str = "suma",
+        opciones: Optional[OpcionesGrafico] = None,
+        serializar: bool = True
     ) -> DatosGrafico:
         """
         Genera datos de gráfico desde un archivo almacenado.
@@ -32,27 +53,223 @@ class CasoUsoDatosGrafico:
         Este método recibe los parámetros del gráfico sugerido por la IA
         y retorna los datos ya agregados y formateados, listos para visualizar.
         Evita enviar todo el conjunto de datos crudos al cliente.
+        
+        Los resultados se memorizan por (id_archivo, tipo_grafico, eje_x, eje_y,
+        agregacion, opciones): una petición repetida se sirve desde el cache sin
+        volver a agregar los datos, y si llega mientras el mismo gráfico se
+        está calculando espera ese cálculo en lugar de repetirlo.
+        
+        Con `serializar=False` (salidas Arrow) solo se arma la tabla resultado
+        y `datos` queda en None; si después se pide el mismo gráfico en JSON,
+        los datos se formatean una vez sobre la entrada cacheada.
         """
-        # Recuperar DataFrame del storage
-        df = self.almacenamiento.obtener_dataframe(id_archivo)
+        opciones = opciones or OpcionesGrafico()
+        clave_cache = (id_archivo, tipo_grafico, eje_x, eje_y, agregacion, opciones)
+        en_cache = self.almacenamiento.obtener_grafico_cacheado(clave_cache)
+        if en_cache is None and clave_cache in self._en_vuelo:
+            # El mismo gráfico ya se está calculando (p. ej. el precálculo tras /upload): esperar su resultado
+            en_cache = await asyncio.shield(self._en_vuelo[clave_cache])
+        if en_cache is not None:
+            if serializar and en_cache.datos is None:
+                await ejecutar_o_directo(self.pool_trabajadores, self._completar_datos, en_cache, opciones)
+                # Los datos formateados ocupan memoria: actualizar la contabilidad
+                self.almacenamiento.guardar_grafico_cacheado(clave_cache, en_cache)
+            return self._con_titulo(en_cache, titulo or f"{eje_y} por {eje_x}")
         
-        if df is None:
-            raise ValueError(f"Archivo con ID {id_archivo} no encontrado")
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave_cache] = futuro
+        try:
+            datos_grafico = await self._calcular_grafico(
+                id_archivo, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones, serializar
+            )
+            self.almacenamiento.guardar_grafico_cacheado(clave_cache, datos_grafico)
+            futuro.set_result(datos_grafico)
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Evita el aviso de "excepción nunca recuperada" si nadie más esperaba
+            futuro.exception()
+            raise
+        finally:
+            self._en_vuelo.pop(clave_cache, None)
+        return datos_grafico
+    
+    async def _calcular_grafico(
+        self,
+        id_archivo: str,
+        tipo_grafico: str,
+        eje_x: str,
+        eje_y: str,
+        titulo: Optional[str],
+        agregacion: str,
+        opciones: OpcionesGrafico,
+        serializar: bool
+    ) -> DatosGrafico:
+        """Agrega los datos del gráfico (por bloques o sobre las columnas en memoria)"""
+        # DataFrames grandes fuera de memoria se agregan leyendo el parquet por
+        # bloques, sin cargarlos (cargarlos desalojaría al resto del LRU)
+        ruta_por_bloques = self._ruta_por_bloques(id_archivo)
+        if ruta_por_bloques is not None:
+            datos_grafico = await ejecutar_o_directo(
+                self.pool_trabajadores,
+                self.generador_graficos.construir_desde_parquet,
+                ruta_por_bloques, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones, id_archivo,
+                serializar
+            )
+        else:
+            # Recuperar del storage solo las columnas del gráfico (si no está en memoria)
+            df = self.almacenamiento.obtener_dataframe(id_archivo, columnas=[eje_x, eje_y])
+            
+            if df is None:
+                raise ValueError(f"Archivo con ID {id_archivo} no encontrado")
+            
+            # Generar datos del gráfico (en el pool de trabajadores si hay)
+            datos_grafico = await ejecutar_o_directo(
+                self.pool_trabajadores,
+                self.generador_graficos.construir_desde_dataframe,
+                df, tipo_grafico, eje_x, eje_y, titulo, agregacion, opciones, id_archivo, serializar
+            )
         
-        # Generar datos del gráfico
-        datos_grafico = await self.generador_graficos.generar_desde_dataframe(
-            dataframe=df,
-            tipo_grafico=tipo_grafico,
-            eje_x=eje_x,
-            eje_y=eje_y,
-            titulo=titulo,
-            agregacion=agregacion
+        self.almacenamiento.guardar_grafico(datos_grafico.id_grafico, datos_grafico)
+        return datos_grafico
+    
+    async def generar_lote(
+        self,
+        id_archivo: str,
+        especificaciones: List[Dict[str, Any]]
+    ) -> List[Union[DatosGrafico, Exception]]:
+        """
+        Genera varios gráficos de un mismo archivo (p. ej. un dashboard completo).
+        
+        Cada especificación es un dict con tipo_grafico, eje_x, eje_y y
+        opcionalmente titulo, agregacion y opciones. Primero se prepara un
+        índice de agrupación por cada eje_x distinto (una factorización
+        compartida por todos los gráficos que agrupan por esa columna) y
+        después se calculan los gráficos.
+        
+        Las especificaciones idénticas salvo el título se calculan una sola
+        vez, y las que comparten ejes (misma tabla de agregados) van en serie:
+        la primera calcula la tabla y el resto la reutiliza. Los grupos corren
+        en paralelo con como mucho `max_trabajadores` tareas en el pool a la
+        vez, así que un lote grande no agota la cola acotada del pool.
+        
+        Devuelve un resultado por especificación, en el mismo orden; los
+        errores de un gráfico se devuelven como excepción sin afectar al resto.
+        Los archivos que se agregan por bloques no se cargan ni se indexan.
+        """
+        limite = asyncio.Semaphore(self.pool_trabajadores.max_trabajadores if self.pool_trabajadores else 1)
+        
+        async def con_limite(funcion: Callable[..., Any], *args) -> Any:
+            async with limite:
+                return await ejecutar_o_directo(self.pool_trabajadores, funcion, *args)
+        
+        if self._ruta_por_bloques(id_archivo) is None:
+            df = self.almacenamiento.obtener_dataframe(id_archivo, columnas=self._columnas_usadas(especificaciones))
+            if df is None:
+                raise ValueError(f"Archivo con ID {id_archivo} no encontrado")
+            
+            columnas_agrupacion = {
+                especificacion["eje_x"] for especificacion in especificaciones
+                if especificacion["tipo_grafico"] != "dispersion" and especificacion["eje_x"] in df.columns
+            }
+            await asyncio.gather(*(
+                con_limite(self.generador_graficos.preparar_indice_agrupacion, df, columna, id_archivo)
+                for columna in columnas_agrupacion
+            ), return_exceptions=True)
+        
+        unicas: Dict[Tuple, Dict[str, Any]] = {}
+        for especificacion in especificaciones:
+            unicas.setdefault(self._clave_especificacion(especificacion), especificacion)
+        
+        grupos: Dict[Tuple[str, str], List[Tuple]] = {}
+        for clave, especificacion in unicas.items():
+            grupos.setdefault((especificacion["eje_x"], especificacion["eje_y"]), []).append(clave)
+        
+        resultados: Dict[Tuple, Union[DatosGrafico, Exception]] = {}
+        
+        async def generar_grupo(claves: List[Tuple]) -> None:
+            async with limite:
+                for clave in claves:
+                    tipo_grafico, eje_x, eje_y, agregacion, opciones = clave
+                    try:
+                        resultados[clave] = await self.generar_datos_grafico_desde_archivo(
+                            id_archivo, tipo_grafico, eje_x, eje_y, unicas[clave].get("titulo"), agregacion, opciones
+                        )
+                    except Exception as e:
+                        resultados[clave] = e
+        
+        await asyncio.gather(*(generar_grupo(claves) for claves in grupos.values()))
+        
+        lote: List[Union[DatosGrafico, Exception]] = []
+        for especificacion in especificaciones:
+            resultado = resultados[self._clave_especificacion(especificacion)]
+            if not isinstance(resultado, Exception):
+                titulo = especificacion.get("titulo") or f"{especificacion['eje_y']} por {especificacion['eje_x']}"
+                resultado = self._con_titulo(resultado, titulo)
+            lote.append(resultado)
+        return lote
+    
+    def _clave_especificacion(self, especificacion: Dict[str, Any]) -> Tuple:
+        """Parámetros que determinan el resultado de un gráfico (el título no cuenta)"""
+        return (
+            especificacion["tipo_grafico"],
+            especificacion["eje_x"],
+            especificacion["eje_y"],
+            especificacion.get("agregacion") or "suma",
+            especificacion.get("opciones") or OpcionesGrafico()
         )
+    
+    async def precalcular_sugerencias(self, id_archivo: str, sugerencias: List[Dict[str, Any]]) -> int:
+        """
+        Calcula y cachea los gráficos sugeridos por la IA para un archivo.
         
-        # Guardar en storage
-        self.almacenamiento.guardar_grafico(datos_grafico.id_grafico, datos_grafico)
+        Se usan los mismos parámetros por defecto que /chart-data, así que las
+        peticiones posteriores del frontend son aciertos del cache. Las
+        sugerencias con tipo o columnas inválidas se descartan. Devuelve
+        cuántos gráficos quedaron cacheados.
+        """
+        df = self.almacenamiento.obtener_dataframe(id_archivo, columnas=self._columnas_usadas(
+            [sugerencia.get("parametros") or {} for sugerencia in sugerencias]
+        ))
+        if df is None:
+            return 0
         
-        return datos_grafico
+        especificaciones = []
+        for sugerencia in sugerencias:
+            parametros = sugerencia.get("parametros") or {}
+            eje_x, eje_y = parametros.get("eje_x"), parametros.get("eje_y")
+            if sugerencia.get("tipo_grafico") not in self.TIPOS_GRAFICO or eje_x not in df.columns:
+                continue
+            if eje_y not in df.columns and eje_y != "conteo":
+                continue
+            especificaciones.append({
+                "tipo_grafico": sugerencia["tipo_grafico"],
+                "eje_x": eje_x,
+                "eje_y": eje_y,
+                "titulo": sugerencia.get("titulo"),
+                "agregacion": parametros.get("agregacion") or "suma"
+            })
+        
+        if not especificaciones:
+            return 0
+        resultados = await self.generar_lote(id_archivo, especificaciones)
+        return sum(1 for resultado in resultados if not isinstance(resultado, Exception))
+    
+    def _columnas_usadas(self, especificaciones: List[Dict[str, Any]]) -> List[str]:
+        """Columnas de los ejes de varias especificaciones (las inexistentes las ignora el storage)"""
+        columnas = []
+        for especificacion in especificaciones:
+            columnas.extend(especificacion.get(eje) for eje in ("eje_x", "eje_y"))
+        return [columna for columna in dict.fromkeys(columnas) if isinstance(columna, str)]
+    
+    def _completar_datos(self, datos_grafico: DatosGrafico, opciones: OpcionesGrafico) -> None:
+        """Formatea los datos de un gráfico generado solo como tabla (queda en la entrada cacheada)"""
+        datos_grafico.datos = self.generador_graficos.formatear_datos(datos_grafico.tabla, opciones)
+    
+    def _con_titulo(self, datos_grafico: DatosGrafico, titulo: str) -> DatosGrafico:
+        """El título solo afecta a la configuración: se reutilizan los datos cacheados"""
+        if datos_grafico.configuracion.get("titulo") == titulo:
+            return datos_grafico
+        return replace(datos_grafico, configuracion={**datos_grafico.configuracion, "titulo": titulo})
     
     async def generar_datos_grafico(
         self,
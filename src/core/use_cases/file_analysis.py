@@ -3,11 +3,16 @@ Caso de uso para análisis de archivos
 """
 from typing import Optional, Dict, Any
 import pandas as pd
-import io
 from src.core.domain.entities import DatosArchivo, ResultadoAnalisis
-from src.core.domain.exceptions import ErrorProcesarArchivo, ErrorTipoArchivoNoSoportado
+from src.core.domain.value_objects import PerfilDatos
+from src.core.domain.exceptions import ErrorProcesarArchivo, ErrorTipoArchivoNoSoportado, ErrorCapacidadExcedida
 from src.core.services.ai_analysis import ServicioAnalisisIA
+from src.core.services.dataframe_reader import LectorDataFrame
+from src.core.services.data_profiler import PerfiladorDatos
+from src.core.services.serialization import dataframe_a_registros
 from src.infrastructure.external.interfaces import AIClientInterface
+from src.infrastructure.concurrency.worker_pool import PoolTrabajadores, obtener_pool_trabajadores
+from src.infrastructure.config.settings import obtener_configuracion
 from src.infrastructure.persistence.in_memory_storage import AlmacenamientoMemoria
 
 class CasoUsoAnalisisArchivo:
@@ -17,32 +22,48 @@ class CasoUsoAnalisisArchivo:
         self, 
         cliente_ia: AIClientInterface, 
         cliente_openai: Optional[AIClientInterface] = None,
-        almacenamiento: Optional[AlmacenamientoMemoria] = None
+        almacenamiento: Optional[AlmacenamientoMemoria] = None,
+        pool_trabajadores: Optional[PoolTrabajadores] = None
     ):
-        self.servicio_analisis_ia = ServicioAnalisisIA(cliente_ia)
+        self.pool_trabajadores = pool_trabajadores or obtener_pool_trabajadores()
+        self.servicio_analisis_ia = ServicioAnalisisIA(
+            cliente_ia,
+            self.pool_trabajadores,
+            timeout_llm_segundos=obtener_configuracion().timeout_llm_segundos
+        )
         self.cliente_openai = cliente_openai
         self.almacenamiento = almacenamiento or AlmacenamientoMemoria()
+        self.lector = LectorDataFrame()
+        self.perfilador = PerfiladorDatos()
     
     async def procesar_y_almacenar_archivo(
         self, 
         nombre_archivo: str, 
-        contenido: bytes,
-        dataframe: pd.DataFrame
+        tamano: int,
+        dataframe: pd.DataFrame,
+        huella_contenido: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Procesa archivo subido y lo almacena"""
+        """
+        Procesa archivo subido y lo almacena.
+        
+        El contenido crudo ya fue volcado a disco y parseado por la capa de
+        presentación, así que solo se registra su tamaño (no se duplican los bytes).
+        """
         try:
             # Crear entidad de archivo
-            datos_archivo = DatosArchivo.crear(
+            datos_archivo = DatosArchivo.crear_desde_disco(
                 nombre_archivo=nombre_archivo,
-                contenido=contenido,
-                tipo_archivo=self._obtener_tipo_archivo(nombre_archivo)
+                tamano=tamano,
+                tipo_archivo=self._obtener_tipo_archivo(nombre_archivo),
+                huella_contenido=huella_contenido
             )
             
             # Guardar archivo en storage
             self.almacenamiento.guardar_archivo(datos_archivo.id_archivo, datos_archivo)
             
-            # Guardar DataFrame en storage
-            self.almacenamiento.guardar_dataframe(datos_archivo.id_archivo, dataframe)
+            # Perfilar columnas una sola vez (fuera del event loop) y guardar junto al DataFrame
+            perfil = await self.pool_trabajadores.ejecutar(self.perfilador.perfilar, dataframe)
+            self.almacenamiento.guardar_dataframe(datos_archivo.id_archivo, dataframe, perfil)
             
             return {
                 "id_archivo": datos_archivo.id_archivo,
@@ -50,9 +71,32 @@ class CasoUsoAnalisisArchivo:
                 "tipo_archivo": datos_archivo.tipo_archivo
             }
             
+        except ErrorCapacidadExcedida:
+            raise
         except Exception as e:
             raise ErrorProcesarArchivo(f"Error procesando archivo: {str(e)}")
     
+    async def obtener_perfil(self, id_archivo: str, dataframe: Optional[pd.DataFrame] = None) -> Optional[PerfilDatos]:
+        """
+        Obtiene el perfil de columnas guardado al ingerir el archivo.
+        
+        Si no existe (p. ej. el DataFrame se recargó desde disco tras un
+        reinicio) se calcula una vez en el pool y se guarda.
+        """
+        perfil = self.almacenamiento.obtener_perfil(id_archivo)
+        if perfil is not None:
+            return perfil
+        
+        if dataframe is None:
+            # Recargarlo puede decodificar todo el cache de disco: fuera del event loop
+            dataframe = await self.pool_trabajadores.ejecutar(self.almacenamiento.obtener_dataframe, id_archivo)
+            if dataframe is None:
+                return None
+        
+        perfil = await self.pool_trabajadores.ejecutar(self.perfilador.perfilar, dataframe)
+        self.almacenamiento.guardar_perfil(id_archivo, perfil)
+        return perfil
+    
     async def procesar_archivo(self, nombre_archivo: str, contenido: bytes):
         """Procesa archivo subido (método legacy para compatibilidad)"""
         try:
@@ -63,15 +107,17 @@ class CasoUsoAnalisisArchivo:
                 tipo_archivo=self._obtener_tipo_archivo(nombre_archivo)
             )
             
-            # Convertir a DataFrame
-            df = self._contenido_a_dataframe(contenido, datos_archivo.tipo_archivo)
+            # Convertir a DataFrame (fuera del event loop)
+            df = await self.pool_trabajadores.ejecutar(
+                self._contenido_a_dataframe, contenido, datos_archivo.tipo_archivo
+            )
             
             # Guardar en storage
             self.almacenamiento.guardar_archivo(datos_archivo.id_archivo, datos_archivo)
             self.almacenamiento.guardar_dataframe(datos_archivo.id_archivo, df)
             
             # Generar preview
-            datos_vista_previa = df.head(10).to_dict('records')
+            datos_vista_previa = dataframe_a_registros(df.head(10))
             
             return {
                 "id_archivo": datos_archivo.id_archivo,
@@ -80,10 +126,16 @@ class CasoUsoAnalisisArchivo:
                 "forma": df.shape
             }
             
+        except ErrorCapacidadExcedida:
+            raise
         except Exception as e:
             raise ErrorProcesarArchivo(f"Error procesando archivo: {str(e)}")
     
-    async def analizar_archivo_con_ia(self, id_archivo: str) -> ResultadoAnalisis:
+    def buscar_archivo_duplicado(self, huella_contenido: str) -> Optional[str]:
+        """Retorna el id de un archivo ya almacenado con el mismo contenido, si existe"""
+        return self.almacenamiento.buscar_por_huella(huella_contenido)
+    
+    async def analizar_archivo_con_ia(self, id_archivo: str, reutilizar: bool = True) -> ResultadoAnalisis:
         """
         Analiza archivo usando IA.
         
@@ -96,16 +148,27 @@ class CasoUsoAnalisisArchivo:
         6. Identifica patrones y relaciones interesantes
         7. Sugiere 3-5 visualizaciones específicas
         8. Retorna JSON estructurado con sugerencias
+        
+        Si `reutilizar` es True y el archivo ya tiene un análisis completo
+        guardado (p. ej. una subida repetida del mismo contenido) se retorna
+        ese análisis sin volver a llamar al LLM. Los análisis parciales se
+        vuelven a intentar.
         """
         try:
-            # Recuperar DataFrame del storage
-            df = self.almacenamiento.obtener_dataframe(id_archivo)
+            if reutilizar:
+                analisis_previo = self.almacenamiento.obtener_analisis_de_archivo(id_archivo)
+                if analisis_previo is not None and analisis_previo.estado == "completado":
+                    return analisis_previo
+            
+            # Recuperar DataFrame del storage (puede recargarlo de disco: en el pool)
+            df = await self.pool_trabajadores.ejecutar(self.almacenamiento.obtener_dataframe, id_archivo)
             
             if df is None:
                 raise ValueError(f"Archivo con ID {id_archivo} no encontrado")
             
-            # Realizar análisis con IA
-            resultado_analisis = await self.servicio_analisis_ia.analizar_datos(df, "general")
+            # Realizar análisis con IA a partir del perfil ya calculado
+            perfil = await self.obtener_perfil(id_archivo, df)
+            resultado_analisis = await self.servicio_analisis_ia.analizar_datos(df, "general", perfil)
             
             # Actualizar id_archivo en el resultado
             resultado_analisis.id_archivo = id_archivo
@@ -115,7 +178,7 @@ class CasoUsoAnalisisArchivo:
             
             return resultado_analisis
             
-        except ValueError:
+        except (ValueError, ErrorCapacidadExcedida):
             raise
         except Exception as e:
             raise ErrorProcesarArchivo(f"Error en análisis: {str(e)}")
@@ -162,14 +225,7 @@ class CasoUsoAnalisisArchivo:
     def _contenido_a_dataframe(self, contenido: bytes, tipo_archivo: str) -> pd.DataFrame:
         """Convierte contenido de archivo a DataFrame"""
         try:
-            if tipo_archivo == 'csv':
-                return pd.read_csv(io.BytesIO(contenido))
-            elif tipo_archivo == 'excel':
-                return pd.read_excel(io.BytesIO(contenido))
-            elif tipo_archivo == 'json':
-                return pd.read_json(io.BytesIO(contenido))
-            else:
-                raise ErrorTipoArchivoNoSoportado(f"Tipo de archivo no soportado: {tipo_archivo}")
+            return self.lector.leer(contenido, tipo_archivo)
                 
         except Exception as e:
             raise ErrorProcesarArchivo(f"Error leyendo archivo: {str(e)}")
\ No newline at end of file
@@ -0,0 +1 @@
+# concurrency package
\ No newline at end of file
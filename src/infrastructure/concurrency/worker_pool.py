@@ -0,0 +1,98 @@
+"""
+Pool de trabajadores para tareas CPU-bound (parseo y perfilado con pandas)
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from src.core.domain.exceptions import ErrorCapacidadExcedida
+from src.infrastructure.config.settings import obtener_configuracion
+
+class PoolTrabajadores:
+    """
+    Ejecuta funciones bloqueantes fuera del event loop de asyncio.
+    
+    Usa un pool de hilos: pandas/NumPy liberan el GIL en el parseo y en la
+    mayoría de operaciones vectorizadas, y así se evita serializar DataFrames
+    entre procesos. La cola está acotada: si hay más de `max_pendientes`
+    tareas esperando, la nueva tarea se rechaza con ErrorCapacidadExcedida
+    en lugar de acumular trabajo sin límite.
+    """
+    
+    def __init__(self, max_trabajadores: int = 4, max_pendientes: int = 16):
+        self.max_trabajadores = max_trabajadores
+        self.max_pendientes = max_pendientes
+        self._ejecutor = ThreadPoolExecutor(
+            max_workers=max_trabajadores,
+            thread_name_prefix="pool-procesamiento"
+        )
+        self._cupos = threading.BoundedSemaphore(max_trabajadores + max_pendientes)
+        self._bloqueo = threading.Lock()
+        self._en_curso = 0
+        self._completadas = 0
+        self._rechazadas = 0
+    
+    async def ejecutar(self, funcion: Callable[..., Any], *args, **kwargs) -> Any:
+        """Ejecuta `funcion` en el pool y espera su resultado sin bloquear el event loop"""
+        if not self._cupos.acquire(blocking=False):
+            with self._bloqueo:
+                self._rechazadas += 1
+            raise ErrorCapacidadExcedida(
+                "El servidor está procesando demasiados archivos. Intenta de nuevo en unos segundos."
+            )
+        
+        with self._bloqueo:
+            self._en_curso += 1
+        
+        try:
+            futuro = self._ejecutor.submit(functools.partial(funcion, *args, **kwargs))
+        except Exception:
+            self._liberar_cupo(None)
+            raise
+        
+        # El cupo se libera cuando la tarea termina de verdad en el hilo,
+        # aunque la corrutina que la espera haya sido cancelada antes
+        futuro.add_done_callback(self._liberar_cupo)
+        return await asyncio.wrap_future(futuro)
+    
+    def _liberar_cupo(self, _futuro) -> None:
+        with self._bloqueo:
+            self._en_curso -= 1
+            self._completadas += 1
+        self._cupos.release()
+    
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Estadísticas de uso del pool"""
+        with self._bloqueo:
+            return {
+                "max_trabajadores": self.max_trabajadores,
+                "max_pendientes": self.max_pendientes,
+                "tareas_en_curso": self._en_curso,
+                "tareas_completadas": self._completadas,
+                "tareas_rechazadas": self._rechazadas
+            }
+    
+    def cerrar(self) -> None:
+        """Espera a que terminen las tareas en curso y libera los hilos"""
+        self._ejecutor.shutdown(wait=True)
+
+async def ejecutar_o_directo(pool: Optional[PoolTrabajadores], funcion: Callable[..., Any], *args) -> Any:
+    """Ejecuta trabajo de pandas en el pool (si hay) para no bloquear el event loop; sin pool, en línea"""
+    if pool is None:
+        return funcion(*args)
+    return await pool.ejecutar(funcion, *args)
+
+# Instancia global del pool
+_pool_trabajadores: Optional[PoolTrabajadores] = None
+
+def obtener_pool_trabajadores() -> PoolTrabajadores:
+    """Obtiene el pool de trabajadores compartido"""
+    global _pool_trabajadores
+    if _pool_trabajadores is None:
+        configuracion = obtener_configuracion()
+        _pool_trabajadores = PoolTrabajadores(
+            max_trabajadores=configuracion.max_trabajadores_procesamiento,
+            max_pendientes=configuracion.max_tareas_pendientes
+        )
+    return _pool_trabajadores
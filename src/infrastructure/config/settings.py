@@ -16,6 +16,14 @@ class Configuracion(BaseSettings):
     # Modelos IA
     groq_model: str = Field(default="llama-3.3-70b-versatile", alias="GROQ_MODEL")
     openai_model: str = Field(default="gpt-4-turbo-preview", alias="OPENAI_MODEL")
+    timeout_llm_segundos: float = Field(default=45.0, alias="LLM_TIMEOUT")
+    
+    # Cache de respuestas del LLM
+    cache_llm_habilitado: bool = Field(default=True, alias="LLM_CACHE_ENABLED")
+    cache_llm_ttl_segundos: int = 7 * 24 * 3600  # 7 días
+    cache_llm_max_memoria: int = 256
+    cache_llm_max_disco: int = 5000
+    directorio_cache_llm: str = "cache_datos/llm"
     
     # Configuración del servidor
     host: str = Field(default="0.0.0.0", alias="HOST")
@@ -30,7 +38,28 @@ class Configuracion(BaseSettings):
     
     # Archivos
     directorio_subidas: str = "uploads"
-    tamano_maximo_archivo: int = 10 * 1024 * 1024  # 10MB
+    tamano_maximo_archivo: int = 500 * 1024 * 1024  # 500MB
+    tamano_chunk_subida: int = 1024 * 1024  # 1MB por lectura del multipart
+    
+    # Almacenamiento en memoria (LRU con presupuesto en bytes)
+    presupuesto_memoria_mb: int = 1024
+    max_analisis_memoria: int = 500
+    max_graficos_memoria: int = 2000
+    max_graficos_cacheados: int = 500
+    max_tablas_agregadas: int = 500
+    precalcular_graficos_sugeridos: bool = True  # calcular en segundo plano las sugerencias de /upload
+    
+    # Cache parquet y agregación por bloques (DataFrames grandes no se cargan enteros)
+    filas_por_grupo_parquet: int = 250_000  # row group: unidad de lectura por bloques
+    umbral_agregacion_por_bloques_mb: int = 256  # a partir de este tamaño en memoria se agrega desde disco
+    cache_arrow_habilitado: bool = False  # nivel Arrow IPC sin comprimir, con memory map al recargar
+    umbral_cache_arrow_mb: int = 64  # DataFrames desde este tamaño usan el nivel Arrow en lugar de parquet
+    persistencia_asincrona: bool = True  # escribir el cache de disco en segundo plano (fuera de /upload)
+    timeout_cierre_persistencia_segundos: float = 60.0  # espera máxima al vaciar la cola al apagar
+    
+    # Procesamiento (pool de trabajadores para pandas)
+    max_trabajadores_procesamiento: int = 4
+    max_tareas_pendientes: int = 16
     
     # CORS
     origenes_cors: str = Field(
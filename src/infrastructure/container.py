@@ -3,6 +3,7 @@ Sugerencia: Container de Dependencias
 """
 from typing import Protocol
 from src.core.use_cases.file_analysis import CasoUsoAnalisisArchivo
+from src.infrastructure.external.cached_client import envolver_con_cache
 from src.infrastructure.external.groq_client import ClienteGroq
 from src.infrastructure.persistence.in_memory_storage import AlmacenamientoMemoria
 
@@ -12,7 +13,7 @@ class Contenedor:
     def __init__(self):
         # Infraestructura
         self._almacenamiento = AlmacenamientoMemoria()
-        self._cliente_ia = ClienteGroq()
+        self._cliente_ia = envolver_con_cache(ClienteGroq())
         
         # Casos de uso
         self._caso_uso_analisis_archivo = None
@@ -0,0 +1,232 @@
+"""
+Cache de respuestas del LLM (memoria + disco) para cualquier cliente de IA
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from src.infrastructure.external.interfaces import AIClientInterface
+from src.infrastructure.config.settings import obtener_configuracion
+
+class ClienteIACacheado(AIClientInterface):
+    """
+    Decorador de AIClientInterface que cachea las respuestas de `generar_analisis`.
+    
+    La clave es un hash de (modelo, prompt de sistema, prompt de usuario), así que
+    cambiar de modelo o de prompt invalida el cache de forma natural. Hay dos
+    niveles: un LRU en memoria y archivos JSON en disco que sobreviven a
+    reinicios. Ambos respetan el mismo TTL. Un acierto no toca la red, y las
+    consultas idénticas simultáneas comparten una sola llamada al LLM. Las
+    respuestas que el llamador no puede usar se olvidan con `invalidar_respuesta`.
+    """
+    
+    def __init__(
+        self,
+        cliente: AIClientInterface,
+        directorio: Optional[Path] = None,
+        ttl_segundos: int = 7 * 24 * 3600,
+        max_entradas_memoria: int = 256,
+        max_entradas_disco: int = 5000
+    ):
+        self.cliente = cliente
+        self.directorio = Path(directorio) if directorio is not None else None
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas_memoria = max_entradas_memoria
+        self.max_entradas_disco = max_entradas_disco
+        
+        self._memoria: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._bloqueo = threading.Lock()
+        self._entradas_disco = len(list(self.directorio.glob("*.json"))) if self._disco_disponible() else 0
+        
+        self._aciertos_memoria = 0
+        self._aciertos_disco = 0
+        self._fallos = 0
+    
+    @property
+    def modelo(self) -> str:
+        return self.cliente.modelo
+    
+    @property
+    def prompt_sistema(self) -> str:
+        return self.cliente.prompt_sistema
+    
+    async def generar_analisis(self, prompt: str) -> str:
+        """Retorna la respuesta cacheada o consulta al cliente envuelto"""
+        clave = self._clave(prompt)
+        
+        respuesta = self._leer_memoria(clave)
+        if respuesta is not None:
+            self._aciertos_memoria += 1
+            return respuesta
+        
+        entrada_disco = self._leer_disco(clave)
+        if entrada_disco is not None:
+            self._aciertos_disco += 1
+            creado_en, respuesta = entrada_disco
+            self._escribir_memoria(clave, respuesta, creado_en)
+            return respuesta
+        
+        # Si la misma consulta ya está en curso se espera su resultado
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            self._aciertos_memoria += 1
+            return await asyncio.shield(en_vuelo)
+        
+        self._fallos += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            respuesta = await self.cliente.generar_analisis(prompt)
+            futuro.set_result(respuesta)
+        except BaseException as e:
+            futuro.set_exception(e)
+            # Evita el aviso de "excepción nunca recuperada" si nadie más esperaba
+            futuro.exception()
+            raise
+        finally:
+            self._en_vuelo.pop(clave, None)
+        
+        self._escribir_memoria(clave, respuesta)
+        self._escribir_disco(clave, respuesta)
+        return respuesta
+    
+    async def generar_sugerencias_grafico(self, contexto_datos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Delegado al cliente envuelto"""
+        return await self.cliente.generar_sugerencias_grafico(contexto_datos)
+    
+    def invalidar_respuesta(self, prompt: str) -> None:
+        """
+        Olvida la respuesta cacheada de `prompt` en ambos niveles: el llamador
+        no pudo usarla (p. ej. JSON inválido) y la próxima consulta debe ir al LLM.
+        """
+        clave = self._clave(prompt)
+        with self._bloqueo:
+            self._memoria.pop(clave, None)
+            if self.directorio is not None:
+                try:
+                    (self.directorio / f"{clave}.json").unlink()
+                    self._entradas_disco = max(0, self._entradas_disco - 1)
+                except OSError:
+                    pass
+        self.cliente.invalidar_respuesta(prompt)
+    
+    def _clave(self, prompt: str) -> str:
+        material = json.dumps([self.modelo, self.prompt_sistema, prompt], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    def _vigente(self, creado_en: float) -> bool:
+        return time.time() - creado_en < self.ttl_segundos
+    
+    def _leer_memoria(self, clave: str) -> Optional[str]:
+        with self._bloqueo:
+            entrada = self._memoria.get(clave)
+            if entrada is None:
+                return None
+            creado_en, respuesta = entrada
+            if not self._vigente(creado_en):
+                del self._memoria[clave]
+                return None
+            self._memoria.move_to_end(clave)
+            return respuesta
+    
+    def _escribir_memoria(self, clave: str, respuesta: str, creado_en: Optional[float] = None) -> None:
+        with self._bloqueo:
+            self._memoria[clave] = (creado_en or time.time(), respuesta)
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_entradas_memoria:
+                self._memoria.popitem(last=False)
+    
+    def _disco_disponible(self) -> bool:
+        return self.directorio is not None and self.max_entradas_disco > 0 and self.directorio.exists()
+    
+    def _leer_disco(self, clave: str) -> Optional[Tuple[float, str]]:
+        if self.directorio is None:
+            return None
+        ruta = self.directorio / f"{clave}.json"
+        try:
+            with open(ruta, "r", encoding="utf-8") as origen:
+                entrada = json.load(origen)
+        except (OSError, ValueError):
+            return None
+        
+        creado_en = entrada.get("creado_en", 0)
+        if not self._vigente(creado_en) or entrada.get("respuesta") is None:
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+            return None
+        return creado_en, entrada["respuesta"]
+    
+    def _escribir_disco(self, clave: str, respuesta: str) -> None:
+        if self.directorio is None or self.max_entradas_disco <= 0:
+            return
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            ruta = self.directorio / f"{clave}.json"
+            ruta_temporal = ruta.with_suffix(".tmp")
+            with open(ruta_temporal, "w", encoding="utf-8") as destino:
+                json.dump({"creado_en": time.time(), "modelo": self.modelo, "respuesta": respuesta}, destino)
+            # Reemplazo atómico: un lector nunca ve un JSON a medio escribir
+            os.replace(ruta_temporal, ruta)
+            self._entradas_disco += 1
+            if self._entradas_disco > self.max_entradas_disco:
+                self._podar_disco()
+        except OSError as e:
+            print(f"[!] No se pudo guardar respuesta del LLM en cache: {e}")
+    
+    def _podar_disco(self) -> None:
+        """Elimina las entradas más antiguas hasta dejar un 10% de margen bajo el límite"""
+        archivos = sorted(self.directorio.glob("*.json"), key=lambda ruta: ruta.stat().st_mtime)
+        objetivo = int(self.max_entradas_disco * 0.9)
+        for ruta in archivos[:max(0, len(archivos) - objetivo)]:
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+        self._entradas_disco = min(len(archivos), objetivo)
+    
+    def limpiar(self) -> None:
+        """Vacía ambos niveles y deja el conteo de entradas en disco en cero"""
+        with self._bloqueo:
+            self._memoria.clear()
+            if self._disco_disponible():
+                for ruta in self.directorio.glob("*.json"):
+                    try:
+                        ruta.unlink()
+                    except OSError:
+                        pass
+            self._entradas_disco = 0
+    
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Métricas de aciertos del cache del LLM"""
+        consultas = self._aciertos_memoria + self._aciertos_disco + self._fallos
+        aciertos = self._aciertos_memoria + self._aciertos_disco
+        return {
+            "modelo": self.modelo,
+            "entradas_memoria": len(self._memoria),
+            "entradas_disco": self._entradas_disco,
+            "aciertos_memoria": self._aciertos_memoria,
+            "aciertos_disco": self._aciertos_disco,
+            "fallos": self._fallos,
+            "tasa_aciertos": round(aciertos / consultas, 4) if consultas else 0.0
+        }
+
+def envolver_con_cache(cliente: AIClientInterface) -> AIClientInterface:
+    """Envuelve un cliente de IA con el cache de respuestas si está habilitado en la configuración"""
+    configuracion = obtener_configuracion()
+    if not configuracion.cache_llm_habilitado:
+        return cliente
+    return ClienteIACacheado(
+        cliente,
+        directorio=configuracion.directorio_cache_llm,
+        ttl_segundos=configuracion.cache_llm_ttl_segundos,
+        max_entradas_memoria=configuracion.cache_llm_max_memoria,
+        max_entradas_disco=configuracion.cache_llm_max_disco
+    )
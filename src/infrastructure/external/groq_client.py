@@ -19,6 +19,27 @@ from src.infrastructure.config.settings import obtener_configuracion
 class ClienteGroq(AIClientInterface):
     """Cliente para interactuar con Groq AI (con fallback automático a OpenAI)"""
     
+    prompt_sistema = """Eres un analista de datos senior con más de 15 años de experiencia en Business Intelligence y visualización de datos. Tu especialidad es:
+    1. Identificar patrones ocultos y anomalías en grandes volúmenes de datos
+    2. Transformar datos complejos en insights accionables que impulsen decisiones de negocio
+    3. Diseñar visualizaciones efectivas adaptadas a diferentes audiencias y objetivos
+    4. Construir dashboards centrados en KPIs críticos y storytelling con datos
+    
+    Siempre respondes en formato JSON válido cuando se te solicita.
+Tus sugerencias son específicas, prácticas y fáciles de implementar.
+    EXPERTISE:
+    - Análisis exploratorio de datos (EDA)
+    - Storytelling con datos según perfil de usuario
+    - Identificación de correlaciones, tendencias y outliers
+    - Mejores prácticas en diseño de gráficos y dashboards
+    - Comunicación clara de resultados cuantitativos y cualitativos
+
+    ENFOQUE:
+    - Priorizas insights con mayor impacto en el negocio
+    - Proporcionas recomendaciones prácticas y pasos sugeridos
+    - Respondes siempre en formato JSON válido sin texto adicional
+    """
+    
     def __init__(self):
         configuracion = obtener_configuracion()
         self.usando_groq = False
@@ -61,26 +82,7 @@ class ClienteGroq(AIClientInterface):
                 messages=[
                     {
                         "role": "system",
-                        "content": """Eres un analista de datos senior con más de 15 años de experiencia en Business Intelligence y visualización de datos. Tu especialidad es:
-    1. Identificar patrones ocultos y anomalías en grandes volúmenes de datos
-    2. Transformar datos complejos en insights accionables que impulsen decisiones de negocio
-    3. Diseñar visualizaciones efectivas adaptadas a diferentes audiencias y objetivos
-    4. Construir dashboards centrados en KPIs críticos y storytelling con datos
-    
-    Siempre respondes en formato JSON válido cuando se te solicita.
-Tus sugerencias son específicas, prácticas y fáciles de implementar.
-    EXPERTISE:
-    - Análisis exploratorio de datos (EDA)
-    - Storytelling con datos según perfil de usuario
-    - Identificación de correlaciones, tendencias y outliers
-    - Mejores prácticas en diseño de gráficos y dashboards
-    - Comunicación clara de resultados cuantitativos y cualitativos
-
-    ENFOQUE:
-    - Priorizas insights con mayor impacto en el negocio
-    - Proporcionas recomendaciones prácticas y pasos sugeridos
-    - Respondes siempre en formato JSON válido sin texto adicional
-    """
+                        "content": self.prompt_sistema
                     },
                     {
                         "role": "user",
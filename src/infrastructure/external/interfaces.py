@@ -7,6 +7,10 @@ from typing import List, Dict, Any
 class AIClientInterface(ABC):
     """Interfaz para clientes de IA"""
     
+    # Identifican la configuración que determina la respuesta (usados como clave de cache)
+    modelo: str = ""
+    prompt_sistema: str = ""
+    
     @abstractmethod
     async def generar_analisis(self, prompt: str) -> str:
         """Genera análisis basado en prompt"""
@@ -16,6 +20,10 @@ class AIClientInterface(ABC):
     async def generar_sugerencias_grafico(self, contexto_datos: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Genera sugerencias de gráficos"""
         pass
+    
+    def invalidar_respuesta(self, prompt: str) -> None:
+        """Avisa de que la respuesta a `prompt` no se pudo usar (los clientes con cache la olvidan)"""
+        pass
 
 class InterfazAlmacenamiento(ABC):
     """Interfaz para almacenamiento"""
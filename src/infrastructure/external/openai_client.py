@@ -10,6 +10,8 @@ from src.infrastructure.config.settings import obtener_configuracion
 class ClienteOpenAI(AIClientInterface):
     """Cliente para interactuar con OpenAI"""
     
+    prompt_sistema = "Eres un analista de datos experto. Proporciona análisis claros, insights valiosos y recomendaciones prácticas basadas en los datos."
+    
     def __init__(self):
         configuracion = obtener_configuracion()
         self.cliente = AsyncOpenAI(api_key=configuracion.openai_api_key)
@@ -25,7 +27,7 @@ class ClienteOpenAI(AIClientInterface):
                 messages=[
                     {
                         "role": "system",
-                        "content": "Eres un analista de datos experto. Proporciona análisis claros, insights valiosos y recomendaciones prácticas basadas en los datos."
+                        "content": self.prompt_sistema
                     },
                     {
                         "role": "user",
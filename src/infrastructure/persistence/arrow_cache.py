@@ -0,0 +1,61 @@
+"""
+Nivel de cache en Arrow IPC (Feather v2) sin compresión, leído con memory map.
+
+A diferencia del parquet no hay que decodificar ni descomprimir al recargar:
+las columnas numéricas se convierten a pandas sin copia (vistas de solo
+lectura sobre el archivo mapeado), el sistema operativo comparte las páginas
+entre procesos y solo quedan residentes las columnas que se tocan.
+"""
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+import pandas as pd
+
+EXTENSION_ARROW = ".arrow"
+
+# pyarrow es opcional: sin él solo existe el nivel parquet
+PYARROW_DISPONIBLE = False
+try:
+    import pyarrow.feather as feather
+    PYARROW_DISPONIBLE = True
+except Exception:
+    feather = None
+
+
+def escribir_arrow_ipc(dataframe: pd.DataFrame, ruta: Path) -> None:
+    """
+    Escribe el DataFrame sin compresión y en un único lote: con varios lotes
+    cada columna queda troceada y to_pandas tendría que concatenarla (copia).
+    Se escribe a un temporal y se renombra, para no truncar un archivo que
+    otro lector tenga mapeado.
+    """
+    ruta_temporal = ruta.with_name(ruta.name + ".tmp")
+    try:
+        feather.write_feather(
+            dataframe,
+            str(ruta_temporal),
+            compression="uncompressed",
+            chunksize=max(len(dataframe), 1)
+        )
+        os.replace(ruta_temporal, ruta)
+    except BaseException:
+        ruta_temporal.unlink(missing_ok=True)
+        raise
+
+
+def leer_arrow_ipc(ruta: Path, columnas: Optional[List[str]] = None) -> pd.DataFrame:
+    """DataFrame sobre el archivo mapeado en memoria (solo las columnas pedidas)"""
+    tabla = feather.read_table(str(ruta), columns=columnas, memory_map=True)
+    # split_blocks evita consolidar columnas del mismo tipo en un bloque (copia)
+    return tabla.to_pandas(split_blocks=True)
+
+
+def leer_primeras_filas_arrow_ipc(ruta: Path, filas: int) -> Tuple[pd.DataFrame, int]:
+    """Primeras `filas` filas (slice sin copia del archivo mapeado) y el total de filas"""
+    tabla = feather.read_table(str(ruta), memory_map=True)
+    return tabla.slice(0, filas).to_pandas(split_blocks=True), tabla.num_rows
+
+
+def columnas_arrow_ipc(ruta: Path) -> List[str]:
+    """Nombres de columna del archivo, leyendo solo el esquema"""
+    return feather.read_table(str(ruta), memory_map=True).schema.names
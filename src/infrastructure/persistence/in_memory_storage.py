@@ -1,21 +1,143 @@
 """
 Almacenamiento híbrido: memoria + disco para persistencia
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import replace
+import os
+import threading
 import uuid
 import pandas as pd
 from pathlib import Path
 import pickle
 from src.core.domain.entities import DatosArchivo, ResultadoAnalisis, DatosGrafico
+from src.core.domain.value_objects import PerfilDatos
+from src.core.services.group_index import IndiceAgrupacion
+from src.infrastructure.config.settings import obtener_configuracion
+from src.infrastructure.persistence import arrow_cache
+from src.infrastructure.persistence.write_behind import (
+    EscritorDiferido, ESTADO_PENDIENTE, ESTADO_PERSISTIDO, ESTADO_ERROR
+)
+
+# Estimación de lo que ocupa cada valor de `datos` ya serializado (objeto
+# Python más su hueco en el dict o la lista), para contabilizar los gráficos
+BYTES_POR_VALOR_SERIALIZADO = 64
+
+# pyarrow es opcional: permite leer el esquema y las primeras filas del parquet sin cargar datos
+PYARROW_DISPONIBLE = False
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIBLE = True
+except Exception:
+    pa = None
+    pq = None
 
 class AlmacenamientoMemoria:
-    """Implementación de almacenamiento híbrido (memoria + disco)"""
+    """
+    Implementación de almacenamiento híbrido (memoria + disco).
+    
+    La memoria está acotada por un presupuesto en bytes: cada DataFrame cuenta
+    con su `memory_usage(deep=True)` y cada archivo con sus bytes crudos. Al
+    superar el presupuesto se desalojan los archivos menos usados recientemente
+    (LRU); sus DataFrames se recargan después desde el cache parquet en disco.
+    Análisis y gráficos se acotan por número de entradas.
+    
+    También guarda un cache de resultados de gráficos por parámetros
+    (id_archivo, tipo, ejes, agregación) que se invalida al eliminar el
+    archivo o limpiar el almacenamiento, las tablas con todas las
+    agregaciones por (id_archivo, eje_x, eje_y) y los índices de agrupación
+    factorizados por (id_archivo, columna), que cuentan para el presupuesto
+    y se descartan junto con el DataFrame. Resultados de gráficos y tablas
+    de agregados también cuentan para el presupuesto (con X de alta
+    cardinalidad tienen una fila por valor distinto) y son lo primero que se
+    desaloja: se recalculan sin volver a leer el disco.
+    
+    Los DataFrames desalojados pueden pedirse por columnas: solo se leen del
+    parquet las columnas pedidas y se guardan en un cache por columna (también
+    dentro del presupuesto), sin volver a materializar el DataFrame completo.
+    
+    Con `cache_arrow_habilitado`, los DataFrames desde `umbral_cache_arrow_mb`
+    se guardan en disco como Arrow IPC sin comprimir en lugar de parquet y se
+    recargan con memory map (ver arrow_cache).
     
-    def __init__(self, usar_cache_disco: bool = True):
-        self._archivos: Dict[str, DatosArchivo] = {}
-        self._dataframes: Dict[str, pd.DataFrame] = {}
-        self._analisis: Dict[str, ResultadoAnalisis] = {}
-        self._graficos: Dict[str, DatosGrafico] = {}
+    Con `persistencia_asincrona` la escritura a disco la hace un hilo de fondo
+    (EscritorDiferido). Cada DataFrame tiene un estado de durabilidad
+    (pendiente, persistido, error) y mientras no esté persistido no se
+    desaloja. Las escrituras van a un temporal que se renombra al terminar,
+    así que ningún lector ve un archivo a medio escribir.
+    """
+    
+    def __init__(
+        self,
+        usar_cache_disco: bool = True,
+        presupuesto_memoria_bytes: Optional[int] = None,
+        max_analisis: Optional[int] = None,
+        max_graficos: Optional[int] = None,
+        max_graficos_cacheados: Optional[int] = None,
+        max_tablas_agregadas: Optional[int] = None,
+        persistencia_asincrona: Optional[bool] = None
+    ):
+        configuracion = obtener_configuracion()
+        
+        self._archivos: "OrderedDict[str, DatosArchivo]" = OrderedDict()
+        self._dataframes: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._analisis: "OrderedDict[str, ResultadoAnalisis]" = OrderedDict()
+        self._graficos: "OrderedDict[str, DatosGrafico]" = OrderedDict()
+        self._perfiles: Dict[str, PerfilDatos] = {}
+        self._indices_agrupacion: Dict[str, Dict[str, IndiceAgrupacion]] = {}
+        
+        # Durabilidad del cache de disco por id_archivo; la versión descarta
+        # escrituras superadas por un guardado posterior o por la eliminación
+        self._estado_persistencia: Dict[str, str] = {}
+        self._versiones_persistencia: Dict[str, int] = {}
+        
+        # Columnas leídas del parquet sin cargar el DataFrame: id_archivo -> {columna: Serie}
+        self._columnas: "OrderedDict[str, Dict[str, pd.Series]]" = OrderedDict()
+        
+        # Deduplicación: huella del contenido -> id_archivo, id_archivo -> último análisis
+        self._indice_huellas: Dict[str, str] = {}
+        self._analisis_por_archivo: Dict[str, str] = {}
+        
+        # Cache de gráficos calculados: (id_archivo, tipo, eje_x, eje_y, agregacion) -> DatosGrafico
+        self._cache_graficos: "OrderedDict[Tuple, DatosGrafico]" = OrderedDict()
+        
+        # Tablas con todas las agregaciones por grupo: (id_archivo, eje_x, eje_y) -> DataFrame
+        self._tablas_agregadas: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        
+        # Contabilidad de memoria por id_archivo (DataFrame + bytes crudos) y por clave de cache
+        self._bytes_dataframes: Dict[str, int] = {}
+        self._bytes_archivos: Dict[str, int] = {}
+        self._bytes_indices: Dict[str, int] = {}
+        self._bytes_columnas: Dict[str, int] = {}
+        self._bytes_graficos_cacheados: Dict[Tuple, int] = {}
+        self._bytes_tablas_agregadas: Dict[Tuple, int] = {}
+        self._bytes_en_uso = 0
+        self.presupuesto_memoria_bytes = (
+            presupuesto_memoria_bytes if presupuesto_memoria_bytes is not None
+            else configuracion.presupuesto_memoria_mb * 1024 * 1024
+        )
+        self.max_analisis = max_analisis or configuracion.max_analisis_memoria
+        self.max_graficos = max_graficos or configuracion.max_graficos_memoria
+        self.max_graficos_cacheados = max_graficos_cacheados or configuracion.max_graficos_cacheados
+        self.max_tablas_agregadas = max_tablas_agregadas or configuracion.max_tablas_agregadas
+        self.filas_por_grupo_parquet = configuracion.filas_por_grupo_parquet
+        self.umbral_cache_arrow_bytes = (
+            configuracion.umbral_cache_arrow_mb * 1024 * 1024
+            if configuracion.cache_arrow_habilitado and arrow_cache.PYARROW_DISPONIBLE else None
+        )
+        
+        # Métricas del cache de DataFrames
+        self._aciertos = 0
+        self._fallos = 0
+        self._desalojos = 0
+        self._recargas_disco = 0
+        self._lecturas_columnas_disco = 0
+        self._aciertos_graficos = 0
+        self._fallos_graficos = 0
+        
+        # Las rutas y el pool de trabajadores acceden desde varios hilos
+        self._bloqueo = threading.RLock()
         
         # Configuración de cache en disco
         self.usar_cache_disco = usar_cache_disco
@@ -26,97 +148,650 @@ class AlmacenamientoMemoria:
             self.directorio_cache.mkdir(exist_ok=True)
             (self.directorio_cache / "dataframes").mkdir(exist_ok=True)
             (self.directorio_cache / "archivos").mkdir(exist_ok=True)
+        
+        # Escritura a disco en segundo plano
+        if persistencia_asincrona is None:
+            persistencia_asincrona = configuracion.persistencia_asincrona
+        self._escritor: Optional[EscritorDiferido] = None
+        if self.usar_cache_disco and persistencia_asincrona:
+            self._escritor = EscritorDiferido(nombre="persistencia-cache")
     
     def guardar_archivo(self, id_archivo: str, datos_archivo: DatosArchivo) -> str:
         """Guarda archivo en memoria"""
-        self._archivos[id_archivo] = datos_archivo
+        with self._bloqueo:
+            self._archivos[id_archivo] = datos_archivo
+            self._archivos.move_to_end(id_archivo)
+            if datos_archivo.huella_contenido:
+                self._indice_huellas[datos_archivo.huella_contenido] = id_archivo
+            self._registrar_bytes(self._bytes_archivos, id_archivo, len(datos_archivo.contenido))
+            self._desalojar_si_excede(proteger=id_archivo)
         return id_archivo
     
     def obtener_archivo(self, id_archivo: str) -> Optional[DatosArchivo]:
         """Obtiene archivo de memoria"""
-        return self._archivos.get(id_archivo)
+        with self._bloqueo:
+            return self._archivos.get(id_archivo)
     
-    def guardar_dataframe(self, id_archivo: str, dataframe: pd.DataFrame) -> None:
-        """Guarda DataFrame en memoria y opcionalmente en disco"""
-        # Guardar en memoria
-        self._dataframes[id_archivo] = dataframe
+    def buscar_por_huella(self, huella_contenido: str) -> Optional[str]:
+        """
+        Busca un archivo ya subido con el mismo contenido.
         
-        # Guardar en disco como cache (formato Parquet - más eficiente)
-        if self.usar_cache_disco:
-            ruta_cache = self.directorio_cache / "dataframes" / f"{id_archivo}.parquet"
+        Solo retorna el id si su DataFrame sigue disponible (en memoria o en
+        el cache de disco); si no, la huella se olvida.
+        """
+        with self._bloqueo:
+            id_archivo = self._indice_huellas.get(huella_contenido)
+            if id_archivo is None:
+                return None
+            if id_archivo in self._dataframes:
+                return id_archivo
+        
+        if self.usar_cache_disco and self._ruta_en_disco(id_archivo) is not None:
+            return id_archivo
+        
+        with self._bloqueo:
+            self._indice_huellas.pop(huella_contenido, None)
+        return None
+    
+    def guardar_dataframe(
+        self,
+        id_archivo: str,
+        dataframe: pd.DataFrame,
+        perfil: Optional[PerfilDatos] = None
+    ) -> None:
+        """
+        Guarda DataFrame en memoria y opcionalmente en disco.
+        
+        Si se pasa el perfil de columnas se guarda junto al DataFrame y se usa
+        su uso de memoria para la contabilidad del LRU (evita recalcularlo).
+        Con persistencia asíncrona retorna sin esperar a la escritura en disco.
+        """
+        if perfil is not None:
+            with self._bloqueo:
+                self._perfiles[id_archivo] = perfil
+        
+        if not self.usar_cache_disco:
+            self._cachear_dataframe(id_archivo, dataframe)
+            return
+        
+        with self._bloqueo:
+            version = self._versiones_persistencia.get(id_archivo, 0) + 1
+            self._versiones_persistencia[id_archivo] = version
+            self._estado_persistencia[id_archivo] = ESTADO_PENDIENTE
+        
+        # En memoria antes que en disco: pendiente de persistir no se desaloja
+        self._cachear_dataframe(id_archivo, dataframe)
+        
+        # Guardar en disco como cache (Parquet, o Arrow IPC si es grande y está habilitado)
+        if self._escritor is not None:
+            self._escritor.encolar(
+                id_archivo, lambda: self._persistir(id_archivo, dataframe, perfil, version)
+            )
+        else:
+            self._persistir(id_archivo, dataframe, perfil, version)
+    
+    def _persistir(
+        self,
+        id_archivo: str,
+        dataframe: pd.DataFrame,
+        perfil: Optional[PerfilDatos],
+        version: int
+    ) -> None:
+        """Escribe el DataFrame en disco y actualiza su estado de durabilidad"""
+        with self._bloqueo:
+            if self._versiones_persistencia.get(id_archivo) != version:
+                # Superado por un guardado posterior o eliminado mientras esperaba
+                return
+        
+        try:
+            self._escribir_cache_disco(id_archivo, dataframe, perfil)
+            estado = ESTADO_PERSISTIDO
+        except Exception as e:
+            print(f"[!] No se pudo guardar DataFrame en cache: {e}")
+            estado = ESTADO_ERROR
+        
+        with self._bloqueo:
+            eliminado = id_archivo not in self._versiones_persistencia
+            if self._versiones_persistencia.get(id_archivo) == version:
+                self._estado_persistencia[id_archivo] = estado
+                # Ya es desalojable: recuperar el presupuesto si se había excedido
+                self._desalojar_si_excede()
+        
+        if eliminado:
+            # El archivo se eliminó durante la escritura: no dejar el cache huérfano
+            self._eliminar_cache_disco(id_archivo)
+    
+    def estado_persistencia(self, id_archivo: str) -> Optional[str]:
+        """Estado de durabilidad del DataFrame en disco (pendiente, persistido, error)"""
+        with self._bloqueo:
+            return self._estado_persistencia.get(id_archivo)
+    
+    def vaciar_persistencia(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todas las escrituras pendientes lleguen a disco"""
+        if self._escritor is None:
+            return True
+        return self._escritor.vaciar(timeout)
+    
+    def cerrar(self, timeout: Optional[float] = None) -> bool:
+        """Vacía la cola de escritura y detiene su hilo (al apagar la aplicación)"""
+        if self._escritor is None:
+            return True
+        vaciado = self._escritor.cerrar(timeout)
+        if not vaciado:
+            print("[!] Quedaron DataFrames sin persistir al cerrar el almacenamiento")
+        return vaciado
+    
+    def _escribir_cache_disco(
+        self,
+        id_archivo: str,
+        dataframe: pd.DataFrame,
+        perfil: Optional[PerfilDatos] = None
+    ) -> None:
+        """
+        Escribe el DataFrame en el nivel de disco que le corresponde por
+        tamaño. Lanza la excepción si no se pudo escribir en ningún formato.
+        """
+        usar_arrow = False
+        if self.umbral_cache_arrow_bytes is not None:
+            tamano = perfil.uso_memoria if perfil is not None else int(dataframe.memory_usage(deep=True).sum())
+            usar_arrow = tamano >= self.umbral_cache_arrow_bytes
+        
+        if usar_arrow:
             try:
-                dataframe.to_parquet(ruta_cache, index=False)
+                arrow_cache.escribir_arrow_ipc(dataframe, self._ruta_arrow(id_archivo))
+                self._ruta_parquet(id_archivo).unlink(missing_ok=True)
+                return
             except Exception as e:
-                print(f"[!] No se pudo guardar DataFrame en cache: {e}")
+                print(f"[!] No se pudo guardar DataFrame en cache Arrow, se usa parquet: {e}")
+        
+        ruta_cache = self._ruta_parquet(id_archivo)
+        ruta_temporal = ruta_cache.with_name(ruta_cache.name + ".tmp")
+        try:
+            # Row groups acotados: la agregación por bloques lee uno cada vez
+            dataframe.to_parquet(ruta_temporal, index=False, row_group_size=self.filas_por_grupo_parquet)
+            os.replace(ruta_temporal, ruta_cache)
+        except BaseException:
+            ruta_temporal.unlink(missing_ok=True)
+            raise
+        self._ruta_arrow(id_archivo).unlink(missing_ok=True)
+    
+    def guardar_perfil(self, id_archivo: str, perfil: PerfilDatos) -> None:
+        """Guarda el perfil de columnas de un DataFrame"""
+        with self._bloqueo:
+            self._perfiles[id_archivo] = perfil
+    
+    def obtener_perfil(self, id_archivo: str) -> Optional[PerfilDatos]:
+        """Obtiene el perfil de columnas calculado al ingerir el archivo"""
+        with self._bloqueo:
+            return self._perfiles.get(id_archivo)
     
-    def obtener_dataframe(self, id_archivo: str) -> Optional[pd.DataFrame]:
-        """Obtiene DataFrame de memoria o disco"""
+    def obtener_dataframe(self, id_archivo: str, columnas: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Obtiene DataFrame de memoria o disco.
+        
+        Con `columnas`, si el DataFrame no está en memoria solo se leen esas
+        columnas del parquet (las que no existan se ignoran) y se cachean por
+        columna. Si está en memoria se devuelve completo: ya contiene las
+        pedidas y así se evita copiar.
+        """
         # Intentar desde memoria primero
-        if id_archivo in self._dataframes:
-            return self._dataframes[id_archivo]
+        with self._bloqueo:
+            if id_archivo in self._dataframes:
+                self._aciertos += 1
+                self._dataframes.move_to_end(id_archivo)
+                return self._dataframes[id_archivo]
+            if columnas is None:
+                self._fallos += 1
+        
+        if columnas is not None:
+            return self._obtener_columnas(id_archivo, columnas)
         
         # Si no está en memoria, intentar cargar desde disco
         if self.usar_cache_disco:
-            ruta_cache = self.directorio_cache / "dataframes" / f"{id_archivo}.parquet"
-            if ruta_cache.exists():
+            ruta_cache = self._ruta_en_disco(id_archivo)
+            if ruta_cache is not None:
                 try:
-                    df = pd.read_parquet(ruta_cache)
+                    df = self._leer_cache_disco(ruta_cache)
                     # Guardar en memoria para próxima vez
-                    self._dataframes[id_archivo] = df
+                    with self._bloqueo:
+                        self._recargas_disco += 1
+                    self._cachear_dataframe(id_archivo, df)
                     return df
                 except Exception as e:
                     print(f"[!] Error al cargar DataFrame desde cache: {e}")
         
         return None
     
+    def obtener_primeras_filas(self, id_archivo: str, filas: int) -> Optional[Tuple[pd.DataFrame, int]]:
+        """
+        Primeras `filas` filas del DataFrame y su total de filas, sin cargarlo.
+        
+        Si está en memoria se usa su head; si no, del cache de disco solo se
+        leen los primeros row groups (parquet) o un slice del archivo mapeado
+        (Arrow IPC). Lo leído no se cachea: una vista previa no debe desalojar
+        al resto del LRU. Lee de disco: llamarlo desde el pool de trabajadores.
+        """
+        with self._bloqueo:
+            dataframe = self._dataframes.get(id_archivo)
+            if dataframe is not None:
+                self._aciertos += 1
+                self._dataframes.move_to_end(id_archivo)
+                return dataframe.head(filas), len(dataframe)
+        
+        ruta_cache = self._ruta_en_disco(id_archivo) if self.usar_cache_disco else None
+        if ruta_cache is None:
+            return None
+        try:
+            if ruta_cache.suffix == arrow_cache.EXTENSION_ARROW:
+                return arrow_cache.leer_primeras_filas_arrow_ipc(ruta_cache, filas)
+            if PYARROW_DISPONIBLE:
+                archivo = pq.ParquetFile(ruta_cache)
+                lotes, leidas = [], 0
+                for lote in archivo.iter_batches(batch_size=filas):
+                    lotes.append(lote)
+                    leidas += lote.num_rows
+                    if leidas >= filas:
+                        break
+                # Con el esquema del archivo se conservan los metadatos de pandas (tipos, zonas horarias)
+                tabla = pa.Table.from_batches(lotes, schema=archivo.schema_arrow).slice(0, filas)
+                return tabla.to_pandas(), archivo.metadata.num_rows
+            dataframe = pd.read_parquet(ruta_cache)
+            return dataframe.head(filas), len(dataframe)
+        except Exception as e:
+            print(f"[!] Error al leer la vista previa desde cache: {e}")
+            return None
+    
+    def _obtener_columnas(self, id_archivo: str, columnas: List[str]) -> Optional[pd.DataFrame]:
+        """DataFrame con las columnas pedidas, del cache por columna o leídas del disco"""
+        ruta_cache = self._ruta_en_disco(id_archivo) if self.usar_cache_disco else None
+        if ruta_cache is None:
+            with self._bloqueo:
+                self._fallos += 1
+            return None
+        
+        existentes = self._columnas_en_disco(id_archivo, ruta_cache)
+        pedidas = list(dict.fromkeys(columna for columna in columnas if columna in existentes))
+        
+        with self._bloqueo:
+            cacheadas = self._columnas.get(id_archivo, {})
+            faltantes = [columna for columna in pedidas if columna not in cacheadas]
+            if not faltantes:
+                self._aciertos += 1
+                self._columnas.move_to_end(id_archivo)
+            else:
+                self._fallos += 1
+        
+        if faltantes:
+            try:
+                leidas = self._leer_cache_disco(ruta_cache, faltantes)
+            except Exception as e:
+                print(f"[!] Error al cargar columnas desde cache: {e}")
+                return None
+            with self._bloqueo:
+                self._lecturas_columnas_disco += 1
+                cacheadas = self._columnas.setdefault(id_archivo, {})
+                for columna in faltantes:
+                    cacheadas.setdefault(columna, leidas[columna])
+                self._columnas.move_to_end(id_archivo)
+                tamano = sum(int(serie.memory_usage(deep=True)) for serie in cacheadas.values())
+                self._registrar_bytes(self._bytes_columnas, id_archivo, tamano)
+                self._desalojar_si_excede(proteger=id_archivo)
+                # Copia local: el desalojo de otro hilo no afecta a esta petición
+                cacheadas = dict(cacheadas)
+        
+        return pd.concat([cacheadas[columna] for columna in pedidas], axis=1) if pedidas else pd.DataFrame()
+    
+    def _columnas_en_disco(self, id_archivo: str, ruta_cache: Path) -> List[str]:
+        """Nombres de columna en disco: del perfil, o del esquema sin leer datos"""
+        perfil = self.obtener_perfil(id_archivo)
+        if perfil is not None:
+            return perfil.nombres_columnas
+        if ruta_cache.suffix == arrow_cache.EXTENSION_ARROW:
+            return arrow_cache.columnas_arrow_ipc(ruta_cache)
+        if PYARROW_DISPONIBLE:
+            return pq.read_schema(ruta_cache).names
+        return list(pd.read_parquet(ruta_cache).columns)
+    
+    def _leer_cache_disco(self, ruta_cache: Path, columnas: Optional[List[str]] = None) -> pd.DataFrame:
+        """Lee el cache de disco según su formato (Arrow IPC con memory map o parquet)"""
+        if ruta_cache.suffix == arrow_cache.EXTENSION_ARROW:
+            return arrow_cache.leer_arrow_ipc(ruta_cache, columnas)
+        return pd.read_parquet(ruta_cache, columns=columnas)
+    
+    def ruta_lectura_por_bloques(self, id_archivo: str, umbral_bytes: int) -> Optional[Path]:
+        """
+        Ruta del cache parquet si conviene agregar desde disco en lugar de
+        cargar el DataFrame: no está en memoria y su tamaño (del perfil o, sin
+        él, el del archivo en disco) alcanza `umbral_bytes`. None si no, y
+        también en el nivel Arrow: con memory map cargarlo ya es barato.
+        """
+        if not self.usar_cache_disco:
+            return None
+        with self._bloqueo:
+            if id_archivo in self._dataframes:
+                return None
+            perfil = self._perfiles.get(id_archivo)
+        
+        ruta_cache = self._ruta_parquet(id_archivo)
+        try:
+            tamano = perfil.uso_memoria if perfil is not None else ruta_cache.stat().st_size
+        except OSError:
+            return None
+        if tamano < umbral_bytes or not ruta_cache.exists():
+            return None
+        return ruta_cache
+    
+    def _cachear_dataframe(self, id_archivo: str, dataframe: pd.DataFrame) -> None:
+        """Registra el DataFrame en el LRU y desaloja si se supera el presupuesto"""
+        perfil = self.obtener_perfil(id_archivo)
+        if perfil is not None and perfil.filas == len(dataframe):
+            tamano = perfil.uso_memoria
+        else:
+            tamano = int(dataframe.memory_usage(deep=True).sum())
+        with self._bloqueo:
+            anterior = self._dataframes.get(id_archivo)
+            if anterior is not None and anterior is not dataframe:
+                # Índices y agregados se refieren al contenido del DataFrame anterior
+                self._indices_agrupacion.pop(id_archivo, None)
+                self._liberar_bytes(self._bytes_indices, id_archivo)
+                self._invalidar_graficos_cacheados(id_archivo)
+            # Con el DataFrame completo en memoria las columnas sueltas sobran
+            self._columnas.pop(id_archivo, None)
+            self._liberar_bytes(self._bytes_columnas, id_archivo)
+            self._dataframes[id_archivo] = dataframe
+            self._dataframes.move_to_end(id_archivo)
+            self._registrar_bytes(self._bytes_dataframes, id_archivo, tamano)
+            self._desalojar_si_excede(proteger=id_archivo)
+    
+    def obtener_indice_agrupacion(self, id_archivo: str, columna: str) -> Optional[IndiceAgrupacion]:
+        """Obtiene el índice factorizado de una columna, si ya se calculó"""
+        with self._bloqueo:
+            return self._indices_agrupacion.get(id_archivo, {}).get(columna)
+    
+    def guardar_indice_agrupacion(self, id_archivo: str, columna: str, indice: IndiceAgrupacion) -> None:
+        """Guarda el índice factorizado de una columna junto al DataFrame en memoria"""
+        with self._bloqueo:
+            if id_archivo not in self._dataframes and id_archivo not in self._columnas:
+                # Sin datos en memoria el índice se recalcula al recargarlos
+                return
+            indices = self._indices_agrupacion.setdefault(id_archivo, {})
+            indices[columna] = indice
+            tamano = sum(indice_columna.uso_memoria for indice_columna in indices.values())
+            self._registrar_bytes(self._bytes_indices, id_archivo, tamano)
+            self._desalojar_si_excede(proteger=id_archivo)
+    
+    def _registrar_bytes(self, contabilidad: Dict[Any, int], clave: Any, tamano: int) -> None:
+        self._bytes_en_uso += tamano - contabilidad.get(clave, 0)
+        contabilidad[clave] = tamano
+    
+    def _liberar_bytes(self, contabilidad: Dict[Any, int], clave: Any) -> None:
+        self._bytes_en_uso -= contabilidad.pop(clave, 0)
+    
+    def _desalojar_si_excede(self, proteger: Optional[str] = None) -> None:
+        """
+        Vuelve al presupuesto desalojando primero resultados de gráficos y
+        tablas de agregados (LRU) y después los DataFrames menos usados
+        recientemente. El id recién guardado nunca se desaloja, aunque por sí
+        solo supere el presupuesto, ni los que aún no están persistidos en
+        disco (solo existen en memoria): de esos solo se liberan los bytes
+        crudos del archivo subido.
+        """
+        while self._bytes_en_uso > self.presupuesto_memoria_bytes:
+            if self._cache_graficos:
+                self._descartar_grafico_cacheado(next(iter(self._cache_graficos)))
+                continue
+            if self._tablas_agregadas:
+                self._descartar_tabla_agregada(next(iter(self._tablas_agregadas)))
+                continue
+            candidato = next(
+                (
+                    id_lru for id_lru in self._dataframes
+                    if id_lru != proteger
+                    and self._estado_persistencia.get(id_lru) not in (ESTADO_PENDIENTE, ESTADO_ERROR)
+                ),
+                None
+            )
+            if candidato is None:
+                candidato = next((id_lru for id_lru in self._columnas if id_lru != proteger), None)
+            if candidato is not None:
+                self._desalojar(candidato)
+                continue
+            # Quedan bytes crudos de archivos cuyo DataFrame no se puede desalojar
+            candidato = next(
+                (id_lru for id_lru, tamano in self._bytes_archivos.items() if id_lru != proteger and tamano > 0),
+                None
+            )
+            if candidato is None:
+                break
+            self._liberar_contenido(candidato)
+    
+    def _desalojar(self, id_archivo: str) -> None:
+        """Libera el DataFrame, sus columnas y los bytes crudos del archivo (los metadatos se conservan)"""
+        if self._dataframes.pop(id_archivo, None) is not None:
+            self._desalojos += 1
+        self._liberar_bytes(self._bytes_dataframes, id_archivo)
+        self._columnas.pop(id_archivo, None)
+        self._liberar_bytes(self._bytes_columnas, id_archivo)
+        self._indices_agrupacion.pop(id_archivo, None)
+        self._liberar_bytes(self._bytes_indices, id_archivo)
+        self._liberar_contenido(id_archivo)
+    
+    def _liberar_contenido(self, id_archivo: str) -> None:
+        """Libera solo los bytes crudos del archivo subido (el DataFrame, si lo hay, se conserva)"""
+        datos_archivo = self._archivos.get(id_archivo)
+        if datos_archivo is not None and datos_archivo.contenido:
+            self._archivos[id_archivo] = replace(datos_archivo, contenido=b"")
+        self._liberar_bytes(self._bytes_archivos, id_archivo)
+    
+    def _ruta_parquet(self, id_archivo: str) -> Path:
+        return self.directorio_cache / "dataframes" / f"{id_archivo}.parquet"
+    
+    def _ruta_arrow(self, id_archivo: str) -> Path:
+        return self.directorio_cache / "dataframes" / f"{id_archivo}{arrow_cache.EXTENSION_ARROW}"
+    
+    def _ruta_en_disco(self, id_archivo: str) -> Optional[Path]:
+        """Archivo de cache existente del DataFrame (Arrow IPC o parquet)"""
+        for ruta in (self._ruta_arrow(id_archivo), self._ruta_parquet(id_archivo)):
+            if ruta.exists():
+                return ruta
+        return None
+    
     def guardar_analisis(self, id_analisis: str, analisis: ResultadoAnalisis) -> None:
         """Guarda resultado de análisis"""
-        self._analisis[id_analisis] = analisis
+        with self._bloqueo:
+            self._analisis[id_analisis] = analisis
+            self._analisis.move_to_end(id_analisis)
+            if analisis.id_archivo:
+                self._analisis_por_archivo[analisis.id_archivo] = id_analisis
+            while len(self._analisis) > self.max_analisis:
+                self._analisis.popitem(last=False)
     
     def obtener_analisis(self, id_analisis: str) -> Optional[ResultadoAnalisis]:
         """Obtiene resultado de análisis"""
-        return self._analisis.get(id_analisis)
+        with self._bloqueo:
+            analisis = self._analisis.get(id_analisis)
+            if analisis is not None:
+                self._analisis.move_to_end(id_analisis)
+            return analisis
+    
+    def obtener_analisis_de_archivo(self, id_archivo: str) -> Optional[ResultadoAnalisis]:
+        """Obtiene el último análisis guardado para un archivo"""
+        with self._bloqueo:
+            id_analisis = self._analisis_por_archivo.get(id_archivo)
+        return self.obtener_analisis(id_analisis) if id_analisis else None
     
     def guardar_grafico(self, id_grafico: str, datos_grafico: DatosGrafico) -> None:
         """Guarda datos de gráfico"""
-        self._graficos[id_grafico] = datos_grafico
+        with self._bloqueo:
+            self._graficos[id_grafico] = datos_grafico
+            self._graficos.move_to_end(id_grafico)
+            while len(self._graficos) > self.max_graficos:
+                self._graficos.popitem(last=False)
     
     def obtener_grafico(self, id_grafico: str) -> Optional[DatosGrafico]:
         """Obtiene datos de gráfico"""
-        return self._graficos.get(id_grafico)
+        with self._bloqueo:
+            grafico = self._graficos.get(id_grafico)
+            if grafico is not None:
+                self._graficos.move_to_end(id_grafico)
+            return grafico
+    
+    def obtener_grafico_cacheado(self, clave: Tuple) -> Optional[DatosGrafico]:
+        """Obtiene un gráfico ya calculado para los mismos parámetros (clave[0] es el id_archivo)"""
+        with self._bloqueo:
+            grafico = self._cache_graficos.get(clave)
+            if grafico is None:
+                self._fallos_graficos += 1
+                return None
+            self._aciertos_graficos += 1
+            self._cache_graficos.move_to_end(clave)
+            return grafico
+    
+    def guardar_grafico_cacheado(self, clave: Tuple, datos_grafico: DatosGrafico) -> None:
+        """
+        Guarda un gráfico calculado en el cache por parámetros. Volver a
+        guardarlo (p. ej. tras formatear sus datos) actualiza lo que ocupa.
+        """
+        tamano = self._tamano_grafico(datos_grafico)
+        with self._bloqueo:
+            self._cache_graficos[clave] = datos_grafico
+            self._cache_graficos.move_to_end(clave)
+            self._registrar_bytes(self._bytes_graficos_cacheados, clave, tamano)
+            while len(self._cache_graficos) > self.max_graficos_cacheados:
+                self._descartar_grafico_cacheado(next(iter(self._cache_graficos)))
+            self._desalojar_si_excede()
+    
+    def _tamano_grafico(self, datos_grafico: DatosGrafico) -> int:
+        """Bytes de la tabla resultado más una estimación de los datos ya serializados"""
+        tamano = 0
+        if datos_grafico.tabla is not None:
+            tamano += int(datos_grafico.tabla.memory_usage(deep=True).sum())
+        datos = datos_grafico.datos
+        if isinstance(datos, dict):
+            valores = sum(len(columna) for columna in datos.values())
+        elif datos:
+            valores = len(datos) * (len(datos[0]) + 1)
+        else:
+            valores = 0
+        return tamano + valores * BYTES_POR_VALOR_SERIALIZADO
+    
+    def _descartar_grafico_cacheado(self, clave: Tuple) -> None:
+        self._cache_graficos.pop(clave, None)
+        self._liberar_bytes(self._bytes_graficos_cacheados, clave)
+    
+    def _descartar_tabla_agregada(self, clave: Tuple) -> None:
+        self._tablas_agregadas.pop(clave, None)
+        self._liberar_bytes(self._bytes_tablas_agregadas, clave)
+    
+    def _invalidar_graficos_cacheados(self, id_archivo: str) -> None:
+        for clave in [clave for clave in self._cache_graficos if clave[0] == id_archivo]:
+            self._descartar_grafico_cacheado(clave)
+        for clave in [clave for clave in self._tablas_agregadas if clave[0] == id_archivo]:
+            self._descartar_tabla_agregada(clave)
+    
+    def obtener_tabla_agregada(self, clave: Tuple) -> Optional[pd.DataFrame]:
+        """Obtiene la tabla con todas las agregaciones de (id_archivo, eje_x, eje_y)"""
+        with self._bloqueo:
+            tabla = self._tablas_agregadas.get(clave)
+            if tabla is not None:
+                self._tablas_agregadas.move_to_end(clave)
+            return tabla
+    
+    def guardar_tabla_agregada(self, clave: Tuple, tabla: pd.DataFrame) -> None:
+        """
+        Guarda la tabla de agregaciones (una fila por grupo: con X de alta
+        cardinalidad puede ser casi tan larga como el DataFrame), contando
+        su memoria en el presupuesto.
+        """
+        tamano = int(tabla.memory_usage(deep=True).sum())
+        with self._bloqueo:
+            self._tablas_agregadas[clave] = tabla
+            self._tablas_agregadas.move_to_end(clave)
+            self._registrar_bytes(self._bytes_tablas_agregadas, clave, tamano)
+            while len(self._tablas_agregadas) > self.max_tablas_agregadas:
+                self._descartar_tabla_agregada(next(iter(self._tablas_agregadas)))
+            self._desalojar_si_excede()
     
     def eliminar_archivo(self, id_archivo: str) -> bool:
         """Elimina archivo y datos asociados de memoria y disco"""
         eliminado = False
         
-        if id_archivo in self._archivos:
-            del self._archivos[id_archivo]
-            eliminado = True
-        
-        if id_archivo in self._dataframes:
-            del self._dataframes[id_archivo]
+        with self._bloqueo:
+            if id_archivo in self._archivos:
+                huella = self._archivos.pop(id_archivo).huella_contenido
+                if huella and self._indice_huellas.get(huella) == id_archivo:
+                    del self._indice_huellas[huella]
+                eliminado = True
+            
+            self._analisis_por_archivo.pop(id_archivo, None)
+            self._perfiles.pop(id_archivo, None)
+            self._invalidar_graficos_cacheados(id_archivo)
+            self._versiones_persistencia.pop(id_archivo, None)
+            self._estado_persistencia.pop(id_archivo, None)
+            
+            if id_archivo in self._dataframes:
+                del self._dataframes[id_archivo]
+            self._columnas.pop(id_archivo, None)
+            
+            self._indices_agrupacion.pop(id_archivo, None)
+            self._liberar_bytes(self._bytes_dataframes, id_archivo)
+            self._liberar_bytes(self._bytes_columnas, id_archivo)
+            self._liberar_bytes(self._bytes_archivos, id_archivo)
+            self._liberar_bytes(self._bytes_indices, id_archivo)
         
-        # Eliminar cache del disco
+        # Eliminar cache del disco (y la escritura pendiente, si aún no empezó)
+        if self._escritor is not None:
+            self._escritor.cancelar(id_archivo)
         if self.usar_cache_disco:
-            ruta_cache = self.directorio_cache / "dataframes" / f"{id_archivo}.parquet"
+            self._eliminar_cache_disco(id_archivo)
+        
+        return eliminado
+    
+    def _eliminar_cache_disco(self, id_archivo: str) -> None:
+        for ruta_cache in (self._ruta_parquet(id_archivo), self._ruta_arrow(id_archivo)):
             if ruta_cache.exists():
                 try:
                     ruta_cache.unlink()
                 except Exception as e:
                     print(f"[!] Error al eliminar cache: {e}")
-        
-        return eliminado
     
     def listar_archivos(self) -> list:
         """Lista todos los archivos almacenados"""
-        return list(self._archivos.keys())
+        with self._bloqueo:
+            return list(self._archivos.keys())
     
-    def limpiar_todo(self) -> None:
-        """Limpia todo el almacenamiento (memoria y disco)"""
-        self._archivos.clear()
-        self._dataframes.clear()
-        self._analisis.clear()
-        self._graficos.clear()
+    def limpiar_todo(self, timeout: Optional[float] = None) -> None:
+        """
+        Limpia todo el almacenamiento (memoria y disco). `timeout` acota la
+        espera a la escritura en curso antes de borrar el directorio.
+        """
+        with self._bloqueo:
+            self._archivos.clear()
+            self._dataframes.clear()
+            self._analisis.clear()
+            self._graficos.clear()
+            self._indice_huellas.clear()
+            self._analisis_por_archivo.clear()
+            self._perfiles.clear()
+            self._cache_graficos.clear()
+            self._tablas_agregadas.clear()
+            self._bytes_graficos_cacheados.clear()
+            self._bytes_tablas_agregadas.clear()
+            self._bytes_archivos.clear()
+            self._bytes_dataframes.clear()
+            self._indices_agrupacion.clear()
+            self._bytes_indices.clear()
+            self._columnas.clear()
+            self._bytes_columnas.clear()
+            self._versiones_persistencia.clear()
+            self._estado_persistencia.clear()
+            self._bytes_en_uso = 0
+        
+        if self._escritor is not None:
+            # Descartar lo encolado y esperar a la escritura en curso antes de borrar el directorio
+            self._escritor.cancelar_todo()
+            if not self._escritor.vaciar(timeout):
+                print("[!] Una escritura seguía en curso al limpiar el cache de disco")
         
         # Limpiar cache del disco
         if self.usar_cache_disco:
@@ -132,19 +807,53 @@ class AlmacenamientoMemoria:
     
     def obtener_estadisticas_cache(self) -> Dict[str, Any]:
         """Obtiene estadísticas del cache"""
-        stats = {
-            "archivos_memoria": len(self._archivos),
-            "dataframes_memoria": len(self._dataframes),
-            "analisis_memoria": len(self._analisis),
-            "graficos_memoria": len(self._graficos)
-        }
+        with self._bloqueo:
+            consultas = self._aciertos + self._fallos
+            consultas_graficos = self._aciertos_graficos + self._fallos_graficos
+            stats = {
+                "archivos_memoria": len(self._archivos),
+                "dataframes_memoria": len(self._dataframes),
+                "analisis_memoria": len(self._analisis),
+                "graficos_memoria": len(self._graficos),
+                "memoria_usada_mb": round(self._bytes_en_uso / (1024 * 1024), 2),
+                "presupuesto_memoria_mb": round(self.presupuesto_memoria_bytes / (1024 * 1024), 2),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "desalojos": self._desalojos,
+                "recargas_disco": self._recargas_disco,
+                "columnas_memoria": sum(len(columnas) for columnas in self._columnas.values()),
+                "lecturas_columnas_disco": self._lecturas_columnas_disco,
+                "persistencia_pendiente": sum(
+                    1 for estado in self._estado_persistencia.values() if estado == ESTADO_PENDIENTE
+                ),
+                "persistencia_errores": sum(
+                    1 for estado in self._estado_persistencia.values() if estado == ESTADO_ERROR
+                ),
+                "tasa_aciertos": round(self._aciertos / consultas, 4) if consultas else 0.0,
+                "indices_agrupacion": sum(len(indices) for indices in self._indices_agrupacion.values()),
+                "tablas_agregadas": len(self._tablas_agregadas),
+                "tablas_agregadas_mb": round(sum(self._bytes_tablas_agregadas.values()) / (1024 * 1024), 2),
+                "graficos_cacheados": len(self._cache_graficos),
+                "graficos_cacheados_mb": round(sum(self._bytes_graficos_cacheados.values()) / (1024 * 1024), 2),
+                "aciertos_graficos": self._aciertos_graficos,
+                "fallos_graficos": self._fallos_graficos,
+                "tasa_aciertos_graficos": (
+                    round(self._aciertos_graficos / consultas_graficos, 4) if consultas_graficos else 0.0
+                )
+            }
+        
+        if self._escritor is not None:
+            stats.update(self._escritor.obtener_estadisticas())
         
         if self.usar_cache_disco and self.directorio_cache.exists():
             dir_df = self.directorio_cache / "dataframes"
-            stats["dataframes_disco"] = len(list(dir_df.glob("*.parquet"))) if dir_df.exists() else 0
+            archivos_parquet = list(dir_df.glob("*.parquet")) if dir_df.exists() else []
+            archivos_arrow = list(dir_df.glob(f"*{arrow_cache.EXTENSION_ARROW}")) if dir_df.exists() else []
+            stats["dataframes_disco"] = len(archivos_parquet) + len(archivos_arrow)
+            stats["dataframes_arrow"] = len(archivos_arrow)
             
             # Calcular tamaño total del cache
-            tamano_total = sum(f.stat().st_size for f in dir_df.glob("*.parquet")) if dir_df.exists() else 0
+            tamano_total = sum(f.stat().st_size for f in archivos_parquet + archivos_arrow)
             stats["tamano_cache_mb"] = round(tamano_total / (1024 * 1024), 2)
         
-        return stats
\ No newline at end of file
+        return stats
@@ -0,0 +1,95 @@
+"""
+Escritura diferida (write-behind): un hilo de fondo persiste en disco lo que
+las peticiones dejan en memoria, sin que el cliente espere a la compresión
+ni a la escritura.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Estado de durabilidad de cada entrada
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_PERSISTIDO = "persistido"
+ESTADO_ERROR = "error"
+
+
+class EscritorDiferido:
+    """
+    Cola de trabajos de escritura atendida por un único hilo.
+
+    Los trabajos se identifican por clave: si se encola otra escritura de la
+    misma clave antes de que empiece la anterior, se reemplaza (solo importa
+    la última versión). Los errores son responsabilidad del trabajo; el hilo
+    solo los registra para no detenerse.
+    """
+
+    def __init__(self, nombre: str = "escritor-diferido"):
+        self._pendientes: "OrderedDict[str, Callable[[], None]]" = OrderedDict()
+        self._condicion = threading.Condition()
+        self._en_curso: Optional[str] = None
+        self._cerrado = False
+        self._completadas = 0
+        self._hilo = threading.Thread(target=self._atender, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def encolar(self, clave: str, trabajo: Callable[[], None]) -> None:
+        """Encola (o reemplaza) la escritura de `clave`"""
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El escritor diferido está cerrado")
+            self._pendientes.pop(clave, None)
+            self._pendientes[clave] = trabajo
+            self._condicion.notify_all()
+
+    def cancelar(self, clave: str) -> None:
+        """Descarta la escritura de `clave` si aún no empezó"""
+        with self._condicion:
+            self._pendientes.pop(clave, None)
+            self._condicion.notify_all()
+
+    def cancelar_todo(self) -> None:
+        """Descarta todas las escrituras que aún no empezaron"""
+        with self._condicion:
+            self._pendientes.clear()
+            self._condicion.notify_all()
+
+    def vaciar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que la cola quede vacía y sin escrituras en curso (False si vence el timeout)"""
+        with self._condicion:
+            return self._condicion.wait_for(
+                lambda: not self._pendientes and self._en_curso is None, timeout=timeout
+            )
+
+    def cerrar(self, timeout: Optional[float] = None) -> bool:
+        """Termina las escrituras pendientes y detiene el hilo"""
+        vaciado = self.vaciar(timeout)
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        self._hilo.join(timeout)
+        return vaciado
+
+    def obtener_estadisticas(self) -> Dict[str, int]:
+        with self._condicion:
+            return {
+                "escrituras_pendientes": len(self._pendientes) + (self._en_curso is not None),
+                "escrituras_completadas": self._completadas
+            }
+
+    def _atender(self) -> None:
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: self._pendientes or self._cerrado)
+                if not self._pendientes:
+                    return
+                clave, trabajo = self._pendientes.popitem(last=False)
+                self._en_curso = clave
+            try:
+                trabajo()
+            except Exception as e:
+                print(f"[!] Error en escritura diferida de {clave}: {e}")
+            finally:
+                with self._condicion:
+                    self._en_curso = None
+                    self._completadas += 1
+                    self._condicion.notify_all()
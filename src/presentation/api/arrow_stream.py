@@ -0,0 +1,60 @@
+"""
+Respuestas binarias en formato Apache Arrow IPC (stream).
+
+Si el cliente envía `Accept: application/vnd.apache.arrow.stream` las tablas
+resultado se codifican directamente con pyarrow, sin pasar por diccionarios
+de Python ni por sanitize_for_json.
+"""
+import json
+from typing import Any, Dict, Optional
+import pandas as pd
+from fastapi import Request, Response
+
+TIPO_MEDIO_ARROW = "application/vnd.apache.arrow.stream"
+
+PYARROW_DISPONIBLE = False
+try:
+    import pyarrow as pa
+    PYARROW_DISPONIBLE = True
+except Exception:
+    pa = None
+
+
+def acepta_arrow(request: Request) -> bool:
+    """True si el cliente pidió un stream Arrow y pyarrow está disponible (si no, se responde JSON)"""
+    return PYARROW_DISPONIBLE and TIPO_MEDIO_ARROW in request.headers.get("accept", "")
+
+
+def _tabla_arrow(df: pd.DataFrame) -> "pa.Table":
+    """Convierte el DataFrame a tabla Arrow; columnas objeto mixtas pasan a texto"""
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        columnas_objeto = df.select_dtypes(include="object").columns
+        df = df.astype({columna: "string" for columna in columnas_objeto})
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def dataframe_a_arrow_ipc(df: pd.DataFrame, metadatos: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Codifica el DataFrame como stream Arrow IPC.
+
+    Los metadatos (configuración, totales, etc.) viajan en el esquema como
+    JSON bajo claves de texto, para que el cliente los lea sin otro request.
+    """
+    tabla = _tabla_arrow(df)
+    if metadatos:
+        esquema_meta = dict(tabla.schema.metadata or {})
+        for clave, valor in metadatos.items():
+            esquema_meta[clave.encode()] = json.dumps(valor, default=str).encode()
+        tabla = tabla.replace_schema_metadata(esquema_meta)
+
+    sumidero = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sumidero.getvalue().to_pybytes()
+
+
+def respuesta_arrow(df: pd.DataFrame, metadatos: Optional[Dict[str, Any]] = None) -> Response:
+    """Respuesta HTTP con el DataFrame codificado como stream Arrow IPC"""
+    return Response(content=dataframe_a_arrow_ipc(df, metadatos), media_type=TIPO_MEDIO_ARROW)
@@ -1,9 +1,15 @@
 """
 Dependencias compartidas para la aplicación
 """
+from typing import Any, Dict
 from src.infrastructure.persistence.in_memory_storage import AlmacenamientoMemoria
+from src.infrastructure.external.interfaces import AIClientInterface
+from src.infrastructure.external.cached_client import ClienteIACacheado, envolver_con_cache
 from src.infrastructure.external.groq_client import ClienteGroq
 from src.infrastructure.external.openai_client import ClienteOpenAI
+from src.infrastructure.concurrency.worker_pool import obtener_pool_trabajadores
+from src.core.services.chart_data_generator import GeneradorDatosGrafico
+from src.core.use_cases.chart_data import CasoUsoDatosGrafico
 
 # Singleton compartido entre todos los routers
 almacenamiento_compartido = AlmacenamientoMemoria()
@@ -11,17 +17,43 @@ almacenamiento_compartido = AlmacenamientoMemoria()
 # Lazy initialization para evitar errores en import time
 _cliente_groq = None
 _cliente_openai = None
+_caso_uso_datos_grafico = None
 
-def obtener_cliente_groq() -> ClienteGroq:
+def obtener_cliente_groq() -> AIClientInterface:
     """Obtiene o crea el cliente Groq compartido"""
     global _cliente_groq
     if _cliente_groq is None:
-        _cliente_groq = ClienteGroq()
+        _cliente_groq = envolver_con_cache(ClienteGroq())
     return _cliente_groq
 
-def obtener_cliente_openai() -> ClienteOpenAI:
+def obtener_cliente_openai() -> AIClientInterface:
     """Obtiene o crea el cliente OpenAI compartido"""
     global _cliente_openai
     if _cliente_openai is None:
-        _cliente_openai = ClienteOpenAI()
+        _cliente_openai = envolver_con_cache(ClienteOpenAI())
     return _cliente_openai
+
+def obtener_caso_uso_datos_grafico() -> CasoUsoDatosGrafico:
+    """Caso de uso de gráficos compartido por /chart-data y el precálculo tras /upload"""
+    global _caso_uso_datos_grafico
+    if _caso_uso_datos_grafico is None:
+        _caso_uso_datos_grafico = CasoUsoDatosGrafico(
+            GeneradorDatosGrafico(almacenamiento_compartido),
+            almacenamiento_compartido,
+            obtener_pool_trabajadores()
+        )
+    return _caso_uso_datos_grafico
+
+def obtener_estadisticas_cache_llm() -> Dict[str, Any]:
+    """Métricas de los caches de LLM ya inicializados"""
+    return {
+        nombre: cliente.obtener_estadisticas()
+        for nombre, cliente in (("groq", _cliente_groq), ("openai", _cliente_openai))
+        if isinstance(cliente, ClienteIACacheado)
+    }
+
+def limpiar_cache_llm() -> None:
+    """Vacía los caches de LLM ya inicializados (memoria y disco)"""
+    for cliente in (_cliente_groq, _cliente_openai):
+        if isinstance(cliente, ClienteIACacheado):
+            cliente.limpiar()
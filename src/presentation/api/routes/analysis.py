@@ -1,22 +1,112 @@
 """
 Rutas para análisis de archivos
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import List, Dict, Any
-import pandas as pd
-import io
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, BackgroundTasks
+from typing import List, Dict, Any, Tuple
+from pathlib import Path
+import hashlib
+import os
+import tempfile
 import traceback
+import aiofiles
+import pandas as pd
+from src.core.domain.exceptions import ErrorCapacidadExcedida
+from src.core.domain.value_objects import PerfilDatos
+from src.core.services.dataframe_reader import LectorDataFrame
+from src.core.services.serialization import dataframe_a_registros
 from src.core.use_cases.file_analysis import CasoUsoAnalisisArchivo
-from src.presentation.api.dependencies import almacenamiento_compartido
+from src.infrastructure.concurrency.worker_pool import obtener_pool_trabajadores
+from src.infrastructure.config.settings import Configuracion, obtener_configuracion
+from src.presentation.api.dependencies import almacenamiento_compartido, obtener_caso_uso_datos_grafico
 from src.presentation.api.utils import sanitize_for_json
+from src.presentation.api.arrow_stream import acepta_arrow, respuesta_arrow
 
 router = APIRouter()
 
 # Los clientes AI se inicializan bajo demanda (lazy)
 caso_uso_analisis_archivo = None
 
+lector_dataframe = LectorDataFrame()
+
+# Filas de la vista previa que devuelve /upload
+FILAS_VISTA_PREVIA = 10
+
+async def _volcar_subida_a_disco(file: UploadFile, configuracion: Configuracion) -> Tuple[str, int, str]:
+    """
+    Copia el cuerpo multipart a un archivo temporal leyendo por bloques.
+    
+    Nunca se mantiene el archivo completo en memoria: cada bloque se escribe
+    a disco y se descarta. Si se supera el tamaño máximo se aborta la copia
+    y se elimina el temporal. De paso se calcula la huella SHA-256 del
+    contenido, usada para detectar subidas repetidas.
+    """
+    directorio = Path(configuracion.directorio_subidas)
+    directorio.mkdir(parents=True, exist_ok=True)
+    
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=directorio, suffix=Path(file.filename).suffix.lower())
+    os.close(descriptor)
+    
+    tamano_maximo = configuracion.tamano_maximo_archivo
+    tamano = 0
+    huella = hashlib.sha256()
+    try:
+        async with aiofiles.open(ruta_temporal, "wb") as destino:
+            while True:
+                bloque = await file.read(configuracion.tamano_chunk_subida)
+                if not bloque:
+                    break
+                tamano += len(bloque)
+                if tamano > tamano_maximo:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Archivo demasiado grande. Máximo {tamano_maximo // (1024 * 1024)}MB permitido."
+                    )
+                huella.update(bloque)
+                await destino.write(bloque)
+    except BaseException:
+        _eliminar_temporal(ruta_temporal)
+        raise
+    
+    return ruta_temporal, tamano, huella.hexdigest()
+
+def _eliminar_temporal(ruta: str) -> None:
+    """Elimina un archivo temporal de subida ignorando errores"""
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
+
+def _leer_dataframe_desde_ruta(ruta: str, nombre_archivo: str) -> pd.DataFrame:
+    """Parsea el archivo volcado a disco según su extensión"""
+    return lector_dataframe.leer(ruta, LectorDataFrame.tipo_desde_nombre(nombre_archivo))
+
+def _resumir_dataframe(df: pd.DataFrame, perfil: PerfilDatos) -> Dict[str, Any]:
+    """
+    Arma metadatos, vista previa y estadísticas a partir del perfil ya
+    calculado. `df` solo aporta la vista previa: basta con sus primeras filas.
+    """
+    return {
+        "metadatos": {
+            "filas": perfil.filas,
+            "columnas": len(perfil.columnas),
+            "nombres_columnas": perfil.nombres_columnas,
+            "tipos_columnas": perfil.tipos_datos(),
+            "conteo_nulos": perfil.conteo_nulos(),
+            "uso_memoria_mb": round(perfil.uso_memoria / (1024 * 1024), 2)
+        },
+        "vista_previa": dataframe_a_registros(df.head(FILAS_VISTA_PREVIA)),
+        "estadisticas_resumen": perfil.estadisticas()
+    }
+
+async def _precalcular_graficos_sugeridos(id_archivo: str, sugerencias: List[Dict[str, Any]]) -> None:
+    """Tarea en segundo plano: deja en cache los gráficos sugeridos por la IA"""
+    try:
+        await obtener_caso_uso_datos_grafico().precalcular_sugerencias(id_archivo, sugerencias)
+    except Exception as e:
+        print(f"[!] No se pudieron precalcular los gráficos sugeridos: {e}")
+
 @router.post("/upload")
-async def subir_y_analizar_archivo(file: UploadFile = File(...)):
+async def subir_y_analizar_archivo(tareas_fondo: BackgroundTasks, file: UploadFile = File(...)):
     """
     🎯 ENDPOINT PRINCIPAL: Carga de archivo + Análisis con IA
     
@@ -24,8 +114,8 @@ async def subir_y_analizar_archivo(file: UploadFile = File(...)):
     
     Funcionalidad:
     1. Recibe archivo (CSV, Excel, JSON)
-    2. Valida tipo y tamaño (máx 10MB)
-    3. Procesa con pandas
+    2. Valida tipo y tamaño (configurable, ver tamano_maximo_archivo)
+    3. Vuelca el archivo a disco por bloques y lo procesa con pandas
     4. Extrae schema: columnas, tipos de datos, describe(), info()
     5. Envía contexto al LLM (Groq) que actúa como analista de datos experto
     6. Retorna 3-5 sugerencias de visualización en JSON estructurado
@@ -39,6 +129,9 @@ async def subir_y_analizar_archivo(file: UploadFile = File(...)):
       - tipo_grafico: barras, lineas, pastel, dispersion, area
       - parametros: {eje_x, eje_y, agregacion}
       - insight: Análisis del patrón detectado
+    
+    Tras responder, los gráficos sugeridos se calculan en segundo plano y quedan
+    en cache para las llamadas a /chart-data (ver precalcular_graficos_sugeridos).
     """
     global caso_uso_analisis_archivo
     
@@ -51,10 +144,10 @@ async def subir_y_analizar_archivo(file: UploadFile = File(...)):
             almacenamiento_compartido
         )
     
+    configuracion = obtener_configuracion()
+    pool_trabajadores = obtener_pool_trabajadores()
+    
     try:
-        # Leer contenido del archivo
-        contenido = await file.read()
-        
         # Validar tipo de archivo
         if not file.filename.endswith(('.csv', '.xlsx', '.xls', '.json')):
             raise HTTPException(
@@ -62,67 +155,84 @@ async def subir_y_analizar_archivo(file: UploadFile = File(...)):
                 detail="Tipo de archivo no soportado. Use CSV, Excel o JSON."
             )
         
-        # Validar tamaño (máximo 10MB)
-        if len(contenido) > 10 * 1024 * 1024:
-            raise HTTPException(
-                status_code=400,
-                detail="Archivo demasiado grande. Máximo 10MB permitido."
-            )
+        # Volcar el archivo a disco por bloques (valida el tamaño sobre la marcha)
+        ruta_temporal, tamano, huella_contenido = await _volcar_subida_a_disco(file, configuracion)
         
-        # Procesar archivo con pandas
-        try:
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(contenido))
-            elif file.filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(io.BytesIO(contenido))
-            elif file.filename.endswith('.json'):
-                df = pd.read_json(io.BytesIO(contenido))
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Error al leer archivo: {str(e)}"
+        # Si el mismo contenido ya fue subido se reutilizan su perfil y su análisis:
+        # del DataFrame solo se leen las filas de la vista previa (en el pool)
+        id_archivo = caso_uso_analisis_archivo.buscar_archivo_duplicado(huella_contenido)
+        primeras_filas = None
+        if id_archivo:
+            primeras_filas = await pool_trabajadores.ejecutar(
+                almacenamiento_compartido.obtener_primeras_filas, id_archivo, FILAS_VISTA_PREVIA
             )
+        reutilizado = primeras_filas is not None
         
-        # Procesar archivo y guardar en storage
-        resultado = await caso_uso_analisis_archivo.procesar_y_almacenar_archivo(
-            nombre_archivo=file.filename,
-            contenido=contenido,
-            dataframe=df
-        )
-        
-        id_archivo = resultado["id_archivo"]
+        if reutilizado:
+            _eliminar_temporal(ruta_temporal)
+            df = primeras_filas[0]
+        else:
+            # Procesar archivo con pandas directamente desde disco (en el pool, fuera del event loop)
+            try:
+                df = await pool_trabajadores.ejecutar(_leer_dataframe_desde_ruta, ruta_temporal, file.filename)
+            except ErrorCapacidadExcedida:
+                raise
+            except Exception as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Error al leer archivo: {str(e)}"
+                )
+            finally:
+                _eliminar_temporal(ruta_temporal)
+            
+            # Procesar archivo y guardar en storage
+            resultado = await caso_uso_analisis_archivo.procesar_y_almacenar_archivo(
+                nombre_archivo=file.filename,
+                tamano=tamano,
+                dataframe=df,
+                huella_contenido=huella_contenido
+            )
+            
+            id_archivo = resultado["id_archivo"]
         
         # 🤖 ANÁLISIS CON IA - Automático después de subir
         resultado_analisis = await caso_uso_analisis_archivo.analizar_archivo_con_ia(id_archivo)
         
+        # Metadatos y estadísticas salen del perfil calculado al ingerir
+        perfil = await caso_uso_analisis_archivo.obtener_perfil(id_archivo, None if reutilizado else df)
+        resumen_datos = _resumir_dataframe(df, perfil)
+        
         # Combinar información del archivo + análisis de IA
         respuesta = {
             "id_archivo": id_archivo,
             "nombre_archivo": file.filename,
             "estado": "analizado",
-            "metadatos": {
-                "filas": len(df),
-                "columnas": len(df.columns),
-                "nombres_columnas": list(df.columns),
-                "tipos_columnas": df.dtypes.astype(str).to_dict(),
-                "conteo_nulos": df.isnull().sum().to_dict(),
-                "uso_memoria_mb": round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
-            },
-            "vista_previa": df.head(10).to_dict('records'),
-            "estadisticas_resumen": df.describe().to_dict() if len(df.select_dtypes(include='number').columns) > 0 else {},
-            "analisis": {
+            "reutilizado": reutilizado,
+            # La vista previa ya sale limpia de dataframe_a_registros; solo se
+            # sanitizan los diccionarios pequeños (convertir NaN/Inf y tipos numpy)
+            "metadatos": sanitize_for_json(resumen_datos["metadatos"]),
+            "vista_previa": resumen_datos["vista_previa"],
+            "estadisticas_resumen": sanitize_for_json(resumen_datos["estadisticas_resumen"]),
+            "analisis": sanitize_for_json({
+                "estado": resultado_analisis.estado,
                 "resumen": resultado_analisis.resumen,
                 "insights": resultado_analisis.insights,
                 "sugerencias_graficos": resultado_analisis.sugerencias_graficos
-            }
+            })
         }
+        
+        # Dejar calculados en segundo plano los gráficos que el frontend pedirá a continuación
+        if configuracion.precalcular_graficos_sugeridos and resultado_analisis.sugerencias_graficos:
+            tareas_fondo.add_task(
+                _precalcular_graficos_sugeridos, id_archivo, resultado_analisis.sugerencias_graficos
+            )
 
-        # Sanitizar la respuesta (convertir NaN/Inf y tipos numpy/pandas)
-        respuesta = sanitize_for_json(respuesta)
         return respuesta
 
     except HTTPException:
         raise
+    except ErrorCapacidadExcedida as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         # Imprimir traceback completo para debugging
         print("\n" + "="*80)
@@ -130,4 +240,41 @@ async def subir_y_analizar_archivo(file: UploadFile = File(...)):
         print("="*80)
         traceback.print_exc()
         print("="*80 + "\n")
-        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
+
+
+@router.get("/preview/{id_archivo}")
+async def obtener_vista_previa(
+    id_archivo: str,
+    request: Request,
+    filas: int = Query(100, ge=1, le=10000)
+):
+    """
+    Devuelve las primeras `filas` filas de un archivo ya subido.
+    
+    Con `Accept: application/vnd.apache.arrow.stream` la respuesta es un
+    stream Arrow IPC construido directamente desde el DataFrame; si no, JSON.
+    Si el DataFrame no está en memoria solo se leen del cache de disco las
+    filas pedidas (en el pool de trabajadores), sin cargarlo entero.
+    """
+    try:
+        primeras_filas = await obtener_pool_trabajadores().ejecutar(
+            almacenamiento_compartido.obtener_primeras_filas, id_archivo, filas
+        )
+    except ErrorCapacidadExcedida as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if primeras_filas is None:
+        raise HTTPException(status_code=404, detail=f"Archivo con ID {id_archivo} no encontrado")
+    
+    vista, total_filas = primeras_filas
+    metadatos = {"total_filas": total_filas, "filas": len(vista)}
+    
+    if acepta_arrow(request):
+        return respuesta_arrow(vista, {"id_archivo": id_archivo, "metadatos": metadatos})
+    
+    return {
+        "id_archivo": id_archivo,
+        "columnas": [str(columna) for columna in vista.columns],
+        "metadatos": metadatos,
+        "datos": dataframe_a_registros(vista)
+    }
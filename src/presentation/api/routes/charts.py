@@ -1,63 +1,142 @@
 """
 Rutas para generación de gráficos
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, Dict, Any
 import traceback
-from src.core.use_cases.chart_data import CasoUsoDatosGrafico
-from src.core.services.chart_data_generator import GeneradorDatosGrafico
-from src.presentation.api.dependencies import almacenamiento_compartido
+from src.core.domain.entities import DatosGrafico
+from src.core.domain.exceptions import ErrorCapacidadExcedida
+from src.core.domain.value_objects import OpcionesGrafico
+from src.presentation.api.dependencies import obtener_caso_uso_datos_grafico
 from src.presentation.api.utils import sanitize_for_json
+from src.presentation.api.arrow_stream import acepta_arrow, respuesta_arrow
 
 router = APIRouter()
 
-# Usar lazy initialization para evitar errores en import time
-caso_uso_datos_grafico = None
-
-class SolicitudParametrosGrafico(BaseModel):
-    """Modelo para request de parámetros de gráfico"""
-    id_archivo: str
+class EspecificacionGrafico(BaseModel):
+    """Parámetros de un gráfico (sin el archivo): unidad de /chart-data y /chart-data/batch"""
     tipo_grafico: str
     eje_x: str
     eje_y: str
     titulo: Optional[str] = None
     agregacion: str = "suma"  # suma, promedio, conteo, minimo, maximo
+    formato: str = "registros"  # registros, columnar
+    max_puntos: Optional[int] = None  # presupuesto LTTB para lineas/area, muestra en dispersion
+    modo_dispersion: str = "muestra"  # muestra, densidad
+    celdas_densidad: int = 50  # celdas por eje en modo densidad
+    top_barras: int = 20  # grupos mostrados en barras
+    top_pastel: int = 10  # grupos mostrados en pastel
+    incluir_otros: bool = True  # resumir el resto en metadatos["grupo_otros"]
+    remuestreo: str = "ninguno"  # X de fecha en lineas/area: ninguno, auto, dia, semana, mes, trimestre
+
+class SolicitudParametrosGrafico(EspecificacionGrafico):
+    """Modelo para request de parámetros de gráfico"""
+    id_archivo: str
+
+class SolicitudLoteGraficos(BaseModel):
+    """Varios gráficos de un mismo archivo en una sola petición"""
+    id_archivo: str
+    graficos: List[EspecificacionGrafico]
+
+def _opciones_grafico(especificacion: EspecificacionGrafico) -> OpcionesGrafico:
+    """Opciones de salida validadas (ValueError si alguna no es válida)"""
+    return OpcionesGrafico(
+        formato=especificacion.formato,
+        max_puntos=especificacion.max_puntos,
+        modo_dispersion=especificacion.modo_dispersion,
+        celdas_densidad=especificacion.celdas_densidad,
+        top_barras=especificacion.top_barras,
+        top_pastel=especificacion.top_pastel,
+        incluir_otros=especificacion.incluir_otros,
+        remuestreo=especificacion.remuestreo
+    )
+
+def _respuesta_grafico(resultado: DatosGrafico, especificacion: EspecificacionGrafico) -> Dict[str, Any]:
+    """Payload JSON de un gráfico generado"""
+    return {
+        "id_grafico": resultado.id_grafico,
+        "tipo_grafico": resultado.tipo_grafico,
+        "titulo": especificacion.titulo or f"{especificacion.eje_y} por {especificacion.eje_x}",
+        # Los datos ya vienen limpios (NaN/Inf y tipos numpy) desde
+        # dataframe_a_registros; solo se sanitizan los diccionarios pequeños
+        "datos": resultado.datos,
+        "configuracion": sanitize_for_json(resultado.configuracion),
+        "metadatos": sanitize_for_json(resultado.metadatos)
+    }
 
 @router.post("/chart-data")
-async def obtener_datos_grafico_post(solicitud: SolicitudParametrosGrafico):
+async def obtener_datos_grafico_post(solicitud: SolicitudParametrosGrafico, request: Request):
     """
     🎯 SEGUNDO ENDPOINT (POST): Generación de datos agregados para gráficos
     
     Recibe los parámetros de una sugerencia del análisis de IA en el body JSON
     y retorna los datos ya procesados, agregados y optimizados para visualización.
+    Con `Accept: application/vnd.apache.arrow.stream` responde la tabla
+    resultado como stream Arrow IPC en lugar de JSON.
     """
-    global caso_uso_datos_grafico
+    return await _procesar_solicitud_grafico(solicitud, binario_arrow=acepta_arrow(request))
+
+@router.post("/chart-data/batch")
+async def obtener_lote_graficos(solicitud: SolicitudLoteGraficos):
+    """
+    Genera todos los gráficos de un dashboard en una sola petición.
     
-    # Inicialización lazy
-    if caso_uso_datos_grafico is None:
-        generador_graficos = GeneradorDatosGrafico(almacenamiento_compartido)
-        caso_uso_datos_grafico = CasoUsoDatosGrafico(generador_graficos, almacenamiento_compartido)
+    Recibe el id_archivo y la lista de especificaciones (mismos campos que
+    /chart-data, típicamente las sugerencias_graficos de /upload). El archivo
+    se busca una vez, los índices de agrupación se comparten entre gráficos
+    con el mismo eje X y los gráficos se calculan en paralelo en el pool de
+    trabajadores.
     
-    return await _procesar_solicitud_grafico(
-        id_archivo=solicitud.id_archivo,
-        tipo_grafico=solicitud.tipo_grafico,
-        eje_x=solicitud.eje_x,
-        eje_y=solicitud.eje_y,
-        titulo=solicitud.titulo,
-        agregacion=solicitud.agregacion
-    )
+    Output: un elemento por especificación, en el mismo orden, con
+    estado "ok" y el payload de /chart-data, o estado "error" y el detalle.
+    Un gráfico inválido no hace fallar al resto.
+    """
+    caso_uso = obtener_caso_uso_datos_grafico()
+    
+    resultados: List[Optional[Dict[str, Any]]] = [None] * len(solicitud.graficos)
+    validas = []
+    for posicion, especificacion in enumerate(solicitud.graficos):
+        try:
+            opciones = _opciones_grafico(especificacion)
+        except ValueError as e:
+            resultados[posicion] = {"estado": "error", "detalle": str(e)}
+            continue
+        validas.append((posicion, especificacion, {
+            "tipo_grafico": especificacion.tipo_grafico,
+            "eje_x": especificacion.eje_x,
+            "eje_y": especificacion.eje_y,
+            "titulo": especificacion.titulo,
+            "agregacion": especificacion.agregacion,
+            "opciones": opciones
+        }))
+    
+    try:
+        generados = await caso_uso.generar_lote(
+            solicitud.id_archivo, [parametros for _, _, parametros in validas]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    for (posicion, especificacion, _), resultado in zip(validas, generados):
+        if isinstance(resultado, Exception):
+            resultados[posicion] = {"estado": "error", "detalle": str(resultado)}
+        else:
+            resultados[posicion] = {"estado": "ok", **_respuesta_grafico(resultado, especificacion)}
+    
+    return {
+        "id_archivo": solicitud.id_archivo,
+        "total": len(resultados),
+        "errores": sum(1 for resultado in resultados if resultado["estado"] == "error"),
+        "graficos": resultados
+    }
 
 async def _procesar_solicitud_grafico(
-    id_archivo: str,
-    tipo_grafico: str,
-    eje_x: str,
-    eje_y: str,
-    titulo: Optional[str] = None,
-    agregacion: str = "suma"
+    solicitud: SolicitudParametrosGrafico,
+    binario_arrow: bool = False
 ):
     """
-    Función común para procesar requests de gráficos (POST y GET)
+    Función común para procesar requests de gráficos
     
     Input (viene de sugerencias_graficos del endpoint /upload):
     - id_archivo: ID del archivo analizado
@@ -66,44 +145,61 @@ async def _procesar_solicitud_grafico(
     - eje_y: Columna para eje Y  
     - agregacion: suma, promedio, conteo, minimo, maximo
     - titulo: Título del gráfico (opcional)
+    - formato: registros ([{x, y}, ...], por defecto) o columnar ({"x": [...], "y": [...]})
+    - max_puntos: Presupuesto de puntos para líneas/área, reducidos con LTTB (opcional),
+      y tamaño de la muestra en dispersión (1000 por defecto)
+    - modo_dispersion: muestra (estratificada, conserva atípicos) o densidad (conteos por celda 2D)
+    - celdas_densidad: Celdas por eje en modo densidad (50 por defecto)
+    - top_barras / top_pastel: Grupos mostrados en barras (20) y pastel (10)
+    - incluir_otros: Resumir los grupos restantes en metadatos["grupo_otros"] (por defecto sí)
     
     Output (listo para biblioteca de gráficos frontend):
     - datos: Array de datos agregados y optimizados
-      * Barras: Top 20 categorías más relevantes
-      * Pastel: Top 10 categorías
-      * Dispersión: Máximo 1000 puntos
-      * Líneas/Area: Series completas ordenadas por X
+      * Barras: Top 20 categorías más relevantes (top_barras); el resto en metadatos["grupo_otros"]
+      * Pastel: Top 10 categorías (top_pastel), porcentajes sobre el total (el resto, en grupo_otros)
+      * Dispersión: Máximo 1000 puntos (o max_puntos), o celdas con conteo en modo densidad
+      * Líneas/Area: Series completas ordenadas por X (o reducidas a max_puntos con LTTB)
     - configuracion: Configuración sugerida del gráfico
     - metadatos: Información adicional (total_puntos, tipo_agregacion, etc)
     
     ❌ NO envía datos crudos completos
     ✅ Solo envía datos necesarios y agregados
     """
+    caso_uso = obtener_caso_uso_datos_grafico()
+    
+    try:
+        opciones = _opciones_grafico(solicitud)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         # Generar datos del gráfico con agregación y optimización
-        resultado = await caso_uso_datos_grafico.generar_datos_grafico_desde_archivo(
-            id_archivo=id_archivo,
-            tipo_grafico=tipo_grafico,
-            eje_x=eje_x,
-            eje_y=eje_y,
-            titulo=titulo,
-            agregacion=agregacion
+        resultado = await caso_uso.generar_datos_grafico_desde_archivo(
+            id_archivo=solicitud.id_archivo,
+            tipo_grafico=solicitud.tipo_grafico,
+            eje_x=solicitud.eje_x,
+            eje_y=solicitud.eje_y,
+            titulo=solicitud.titulo,
+            agregacion=solicitud.agregacion,
+            opciones=opciones,
+            # Con Arrow la tabla se codifica directamente: no se arman registros
+            serializar=not binario_arrow
         )
         
-        respuesta = {
-            "id_grafico": resultado.id_grafico,
-            "tipo_grafico": resultado.tipo_grafico,
-            "titulo": titulo or f"{eje_y} por {eje_x}",
-            "datos": resultado.datos,
-            "configuracion": resultado.configuracion,
-            "metadatos": resultado.metadatos
-        }
-
-        # Sanitizar respuesta para evitar NaN/Inf en la serialización JSON
-        return sanitize_for_json(respuesta)
+        if binario_arrow and resultado.tabla is not None:
+            # Las filas van directo de la tabla a Arrow, sin dicts ni sanitize_for_json
+            return respuesta_arrow(resultado.tabla, {
+                "id_grafico": resultado.id_grafico,
+                "configuracion": resultado.configuracion,
+                "metadatos": resultado.metadatos
+            })
+        
+        return _respuesta_grafico(resultado, solicitud)
         
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ErrorCapacidadExcedida as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         # Imprimir traceback completo para debugging
         print("\n" + "="*80)
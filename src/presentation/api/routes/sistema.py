@@ -2,7 +2,13 @@
 Rutas para información del sistema y cache
 """
 from fastapi import APIRouter
-from src.presentation.api.dependencies import almacenamiento_compartido
+from fastapi.concurrency import run_in_threadpool
+from src.infrastructure.config.settings import obtener_configuracion
+from src.presentation.api.dependencies import (
+    almacenamiento_compartido,
+    limpiar_cache_llm,
+    obtener_estadisticas_cache_llm
+)
 
 router = APIRouter()
 
@@ -22,12 +28,14 @@ async def obtener_estadisticas_cache():
     - dataframes_memoria: Cantidad de DataFrames en memoria RAM
     - dataframes_disco: Cantidad de DataFrames en cache de disco
     - tamano_cache_mb: Tamaño total del cache en MB
+    - cache_llm: Aciertos/fallos del cache de respuestas del LLM por proveedor
     """
     stats = almacenamiento_compartido.obtener_estadisticas_cache()
     
     return {
         "estado": "ok",
         "estadisticas": stats,
+        "cache_llm": obtener_estadisticas_cache_llm(),
         "mensaje": f"Cache activo con {stats.get('dataframes_memoria', 0)} DataFrames en memoria"
     }
 
@@ -36,7 +44,8 @@ async def limpiar_cache():
     """
     🗑️ Endpoint de utilidad: Limpiar todo el cache
     
-    Elimina todos los datos almacenados en memoria y disco.
+    Elimina todos los datos almacenados en memoria y disco, incluido el
+    cache de respuestas del LLM.
     ⚠️ PRECAUCIÓN: Esta acción no se puede deshacer.
     
     Úsalo para:
@@ -44,7 +53,12 @@ async def limpiar_cache():
     - Resetear el sistema durante desarrollo
     - Limpiar datos de prueba
     """
-    almacenamiento_compartido.limpiar_todo()
+    # Espera a la escritura en curso y borra el disco: fuera del event loop
+    await run_in_threadpool(
+        almacenamiento_compartido.limpiar_todo,
+        obtener_configuracion().timeout_cierre_persistencia_segundos
+    )
+    limpiar_cache_llm()
     
     return {
         "estado": "ok",
@@ -4,6 +4,11 @@ Utilities para presentación: sanitización de objetos antes de serializar a JSO
 
 Convierte valores no finitos (NaN, Inf) a None y normaliza tipos de numpy/pandas
 a tipos nativos de Python para evitar errores de serialización JSON.
+
+Para payloads derivados de DataFrames (vista previa, datos de gráficos) usar
+src.core.services.serialization.dataframe_a_registros, que limpia columna a
+columna de forma vectorizada; sanitize_for_json queda para diccionarios
+pequeños y anidados.
 """
 from typing import Any
 import math
@@ -3,8 +3,11 @@ FastAPI Application Factory
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.presentation.api.routes import analysis, charts
+from src.presentation.api.routes import analysis, charts, sistema
 from src.presentation.api.middleware.cors import configurar_cors
+from src.infrastructure.concurrency.worker_pool import obtener_pool_trabajadores
+from src.infrastructure.config.settings import obtener_configuracion
+from src.presentation.api.dependencies import almacenamiento_compartido
 
 def crear_app() -> FastAPI:
     """
@@ -22,6 +25,8 @@ def crear_app() -> FastAPI:
     # Incluir rutas SIN prefijo (legacy/compatibilidad)
     app.include_router(analysis.router, tags=["subida"])
     app.include_router(charts.router, tags=["graficos"])
+    # Utilidades de cache: estadísticas (incluido el cache del LLM) y limpieza
+    app.include_router(sistema.router, tags=["sistema"])
     
     # Nota: no incluimos aquí el router con prefijo /api/analisis porque el usuario
     # pidió mantener solo los endpoints originales y evitar rutas adicionales.
@@ -34,4 +39,10 @@ def crear_app() -> FastAPI:
     async def verificar_salud():
         return {"estado": "saludable"}
     
+    @app.on_event("shutdown")
+    async def cerrar_recursos():
+        obtener_pool_trabajadores().cerrar()
+        # Llevar a disco los DataFrames que aún esperan en la cola de escritura
+        almacenamiento_compartido.cerrar(obtener_configuracion().timeout_cierre_persistencia_segundos)
+    
     return app
\ No newline at end of file